@@ -34,6 +34,9 @@ CSV_GAMES_FILE_PATH = os.path.join(
     PROJECT_ROOT, "data", "input", "nhl-202324-asplayed.csv"
 )
 
+# Location on disk to store processed snapshots (parsed games, rated teams)
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "cache")
+
 # Request timeouts
 REQUEST_CONNECT_TIMEOUT = 3
 REQUEST_READ_TIMEOUT = 15
@@ -7,14 +7,32 @@ Created on Fri Feb 10 13:26:27 2023
 from argparse import ArgumentParser
 
 from nhlrank.argparser.funcs import (
+    parser_func_backtest,
+    parser_func_compare_configs,
     parser_func_download,
     parser_func_match_ups,
+    parser_func_playoffs,
     parser_func_projections,
     parser_func_standings,
+    parser_func_standings_series,
     parser_func_team_details,
     parser_func_teams,
+    parser_func_tune,
 )
-from nhlrank.models import Team
+from nhlrank.argparser.types import (
+    date_iso,
+    duration,
+    file_path,
+    game_number_or_date,
+    parameter_grid,
+    positive_float,
+    positive_int,
+    rating_config,
+)
+from nhlrank.rating import OTL_MODELS, RATING_PERIODS
+from nhlrank.stats import StatsTable
+from nhlrank.timeseries import SERIES_FORMATS
+from nhlrank.tune import PARAMETER_GRIDS, SEARCHES
 
 
 def build_subcommands(arg_parser: ArgumentParser) -> None:
@@ -27,6 +45,45 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         action="store_true",
         help="skip fetching CSV download; use cached copy",
     )
+    arg_parser.add_argument(
+        "--rating-period",
+        dest="rating_period",
+        choices=RATING_PERIODS,
+        help="rate all games in a period (day, week) at once, instead of one by one",
+    )
+    arg_parser.add_argument(
+        "--otl-model",
+        dest="otl_model",
+        help="choose how overtime losses affect ratings, default: geometric",
+        choices=OTL_MODELS,
+    )
+    arg_parser.add_argument(
+        "--otl-factor",
+        dest="otl_factor",
+        help="choose how much overtime losses affect ratings, default: 0.5"
+        " (geometric: the loser scores 1/3)",
+        type=positive_float,
+    )
+    arg_parser.add_argument(
+        "--tau",
+        dest="tau",
+        type=positive_float,
+        help="Glicko 2 system constant, how fast ratings can swing",
+    )
+    arg_parser.add_argument(
+        "--rd",
+        dest="rd",
+        type=positive_float,
+        help="initial rating deviation (RD) for every team",
+    )
+    arg_parser.add_argument(
+        "--home-ice",
+        dest="home_ice",
+        metavar="POINTS",
+        type=float,
+        help="rating points added to the home team when predicting games (odds,"
+        " projections, simulations & backtest), default: 0",
+    )
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Download sub-parser
@@ -35,6 +92,12 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         "fetch", help="Download the latest CSV for NHL games"
     )
     subparser_download.set_defaults(func=parser_func_download)
+    subparser_download.add_argument(
+        "--exit-code",
+        dest="exit_code",
+        action="store_true",
+        help="exit with status 1 if the CSV changed, 0 if not (like git diff)",
+    )
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Teams sub-parser
@@ -89,6 +152,8 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
     )
     # TODO: is this by full name or abbreviation?  Enforce it and add choices?
     subparser_team.add_argument(dest="team", type=str, help="show details for a team")
+    add_as_of_argument(subparser_team)
+    add_window_arguments(subparser_team)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Standings sub-parser
@@ -104,22 +169,8 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         dest="sort_column",
         type=str,
         help="sort by specific column",
-        choices=[
-            x
-            for x in vars(Team) | vars(Team("Dallas Stars"))
-            if not x.startswith("_")
-            and x
-            not in {
-                "add_game",
-                "name",
-                "rating_str",
-                "ratings",
-                "opponent_ratings",
-                "last_10_str_list",
-            }
-        ],
-    )
-    # TODO: support range of values, e.g. --from 10 --to 20 (games ago)
+        choices=StatsTable.SORT_COLUMNS,
+    )
     # TODO: make this a sub_argument to the `-t` argument; it's only valid in that scope
     subparser_standings.add_argument(
         "--last",
@@ -130,6 +181,27 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         help="number of previous games to show rating trend for",
         choices=range(1, 82 + 1),
     )
+    subparser_standings.add_argument(
+        "--rolling",
+        dest="num_games_rolling",
+        metavar="NUM",
+        type=positive_int,
+        help="show the rating trend as an N-game rolling average",
+    )
+    subparser_standings.add_argument(
+        "-n",
+        dest="n_sims",
+        metavar="NUM",
+        type=positive_int,
+        help="simulate NUM seasons for the team's playoff odds (with -t), e.g. 10000",
+    )
+    subparser_standings.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        help="seed the simulations, default: derived from the CSV (same odds until"
+        " it changes)",
+    )
     subparser_standings.add_argument(
         "--next",
         dest="num_games_next",
@@ -139,19 +211,6 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         help="number of future games to show predictions for",
         choices=range(1, 82 + 1),
     )
-    # FIXME: implement this in the core functions.  Move to top-level parser.
-    subparser_standings.add_argument(
-        "--otl-model",
-        dest="otl_model",
-        help="choose how overtime losses affect ratings, default: geometric",
-        choices=("tie", "geometric", "inflationary"),
-    )
-    subparser_standings.add_argument(
-        "--otl-factor",
-        dest="otl_factor",
-        help="choose how much overtime losses affect ratings, default: 1/3",
-        type=float,
-    )
     subparser_standings.add_argument(
         "-g",
         dest="group_standings_by",
@@ -160,6 +219,8 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
     )
 
     subparser_standings.set_defaults(func=parser_func_standings)
+    add_as_of_argument(subparser_standings)
+    add_window_arguments(subparser_standings)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Projection sub-parser
@@ -174,8 +235,131 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
     subparser_projection.add_argument(
         "-t", dest="team", type=str, help="show details for a team"
     )
+    add_simulation_arguments(subparser_projection)
+    add_as_of_argument(subparser_projection)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Playoff sub-parser
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    subparser_playoff = subparsers.add_parser(
+        "playoff", help="playoff bracket, odds to win each round (and the Cup)"
+    )
+    subparser_playoff.set_defaults(func=parser_func_playoffs)
+    add_simulation_arguments(subparser_playoff)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Series (daily standings) sub-parser
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    subparser_series = subparsers.add_parser(
+        "series", help="export each team's standings & rating on every game day"
+    )
+    subparser_series.set_defaults(func=parser_func_standings_series)
+    subparser_series.add_argument(
+        "-f",
+        dest="output_format",
+        choices=SERIES_FORMATS,
+        default="csv",
+        help="output format, default: csv",
+    )
+    subparser_series.add_argument(
+        "-o",
+        dest="output_path",
+        metavar="FILE",
+        type=str,
+        help="write to a file, default: stdout",
+    )
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Compare (rating configs) sub-parser
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    subparser_compare = subparsers.add_parser(
+        "compare", help="compare ratings under several rating configs (one replay)"
+    )
+    subparser_compare.set_defaults(func=parser_func_compare_configs)
+    subparser_compare.add_argument(
+        nargs="*",
+        dest="configs",
+        metavar="CONFIG",
+        type=rating_config,
+        help="MODEL[:FACTOR[:TAU[:RD]]], e.g. tie geometric:0.4 inflationary:0.5:0.3,"
+        " default: each OTL model",
+    )
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Backtest sub-parser
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    subparser_backtest = subparsers.add_parser(
+        "backtest", help="score the ratings' predictions of past games (log-loss)"
+    )
+    subparser_backtest.set_defaults(func=parser_func_backtest)
+    subparser_backtest.add_argument(
+        "-o",
+        dest="predictions_path",
+        metavar="FILE",
+        type=str,
+        help="write each game's prediction & result to a CSV file",
+    )
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Tune sub-parser
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    subparser_tune = subparsers.add_parser(
+        "tune", help="search the rating parameters for the lowest backtest log-loss"
+    )
+    subparser_tune.set_defaults(func=parser_func_tune)
+    subparser_tune.add_argument(
+        nargs="*",
+        dest="csv_paths",
+        metavar="CSV",
+        type=file_path,
+        help="season CSV files to score on, default: the current season",
+    )
+    subparser_tune.add_argument(
+        "-s",
+        dest="search",
+        choices=SEARCHES,
+        default="grid",
+        help="search strategy, default: grid",
+    )
+    subparser_tune.add_argument(
+        "-p",
+        dest="grids",
+        metavar="NAME=V1,V2,...",
+        type=parameter_grid,
+        action="append",
+        help="values to search for a parameter (repeatable), or a range for random"
+        f" search, NAME in {tuple(PARAMETER_GRIDS)}",
+    )
+    subparser_tune.add_argument(
+        "-n",
+        dest="n_candidates",
+        metavar="NUM",
+        type=positive_int,
+        default=100,
+        help="number of candidates for random search, default: 100",
+    )
+    subparser_tune.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        help="seed the random search, for reproducible candidates",
+    )
+    subparser_tune.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="NUM",
+        type=positive_int,
+        default=1,
+        help="score candidates on multiple processes, default: 1",
+    )
+    subparser_tune.add_argument(
+        "-o",
+        dest="surface_path",
+        metavar="FILE",
+        type=str,
+        help="write every candidate's log-loss (the loss surface) to a CSV file",
+    )
 
-    # TODO: parsers for playoff
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Match-up sub-parser
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -189,3 +373,74 @@ def build_subcommands(arg_parser: ArgumentParser) -> None:
         type=str,
         help="show details for a team (optionally compare against other teams)",
     )
+
+
+def add_as_of_argument(subparser: ArgumentParser) -> None:
+    """Option to look back at the season as of a past date (shared by sub-parsers)"""
+    subparser.add_argument(
+        "--as-of",
+        dest="as_of",
+        metavar="DATE",
+        type=date_iso,
+        help="as of the end of a date (its games included), e.g. 2023-12-31",
+    )
+
+
+def add_window_arguments(subparser: ArgumentParser) -> None:
+    """Options for a range of games, e.g. --from 10 --to 20 (shared by sub-parsers)"""
+    subparser.add_argument(
+        "--from",
+        dest="game_first",
+        metavar="GAME",
+        type=game_number_or_date,
+        help="from a team's N-th game (1 for its first), or a date (included)",
+    )
+    subparser.add_argument(
+        "--to",
+        dest="game_last",
+        metavar="GAME",
+        type=game_number_or_date,
+        help="to a team's N-th game, or a date (included)",
+    )
+
+
+def add_simulation_arguments(subparser: ArgumentParser) -> None:
+    """Options for the Monte Carlo season simulations (shared by sub-parsers)"""
+    subparser.add_argument(
+        "-n",
+        dest="n_sims",
+        metavar="NUM",
+        type=positive_int,
+        default=100000,
+        help="number of seasons to simulate for playoff odds (the maximum, with"
+        " --precision or --time-budget), default: 100000",
+    )
+    subparser.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        help="seed the simulations, default: derived from the CSV (same odds until"
+        " it changes)",
+    )
+    subparser.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="NUM",
+        type=positive_int,
+        default=1,
+        help="simulate on multiple processes (reproducible per seed & NUM), default: 1",
+    )
+    subparser.add_argument(
+        "--precision",
+        dest="precision",
+        metavar="TOL",
+        type=positive_float,
+        help="stop once every team's playoff odds are within ± TOL, e.g. 0.005",
+    )
+    subparser.add_argument(
+        "--time-budget",
+        dest="time_budget",
+        metavar="TIME",
+        type=duration,
+        help="stop simulating after this long, e.g. 2s, 500ms, 1m",
+    )
@@ -5,30 +5,79 @@ Created on Fri Feb 10 13:26:28 2023
 @author: shane
 """
 import argparse
-from typing import Any
 
+from nhlrank import CSV_GAMES_FILE_PATH, snapshot
+from nhlrank.asof import season_as_of
 from nhlrank.core import (
+    Season,
+    build_games,
+    func_backtest,
+    func_compare_configs,
+    func_playoffs,
     func_projections,
     func_standings,
+    func_standings_series,
     func_team_details,
     func_teams_list,
-    process_csv,
+    func_tune,
+    load_season,
+    read_csv_rows,
     sub_func_standings_team_details,
 )
 from nhlrank.models import Game, Team
 from nhlrank.models.helpers import get_team_name
-from nhlrank.sheetutils import cache_csv_games_file, get_google_sheet
+from nhlrank.rating import OTL_MODELS, GameArrays, RatingConfig
+from nhlrank.sheetutils import fetch_csv_games_file
+from nhlrank.tune import PARAMETER_GRIDS, tune
 from nhlrank.utils import print_title
 
 
+def rating_config_args(args: argparse.Namespace) -> RatingConfig:
+    """Rating config from the top-level options (defaults for any not given)"""
+    default = RatingConfig()
+    return RatingConfig(
+        tau=default.tau if args.tau is None else args.tau,
+        phi=default.phi if args.rd is None else args.rd,
+        otl_model=args.otl_model or default.otl_model,
+        otl_factor=default.otl_factor if args.otl_factor is None else args.otl_factor,
+        home_ice=default.home_ice if args.home_ice is None else args.home_ice,
+    )
+
+
+def simulation_seed(args: argparse.Namespace) -> int:
+    """
+    --seed, or else one derived from the CSV's content hash, so the simulated odds
+    only change when the games do (e.g. the hourly output isn't re-committed)
+    """
+    if args.seed is not None:
+        return int(args.seed)
+    return int(snapshot.csv_file_hash(CSV_GAMES_FILE_PATH)[:16], 16)
+
+
+def load_season_args(args: argparse.Namespace) -> Season:
+    """
+    load_season(), with the rating config & period from the top-level options
+    (and as of a past date, for the sub-parsers with --as-of)
+    """
+    season = load_season(
+        config=rating_config_args(args), rating_period=args.rating_period
+    )
+    if getattr(args, "as_of", None):
+        return season_as_of(season, args.as_of)
+    return season
+
+
 def parser_func_download(
-    **kwargs: dict[str, Any]  # pylint: disable=unused-argument
-) -> tuple[int, None]:
+    args: argparse.Namespace,
+) -> tuple[int, bool]:
     """Default function for download parser"""
-    cache_csv_games_file(
-        _csv_bytes_output=get_google_sheet(),
-    )
-    return 0, None
+    changed = fetch_csv_games_file()
+    print("CSV file changed" if changed else "CSV file is unchanged")
+
+    # Lets scripts skip re-generating output, e.g. `./sp fetch --exit-code || ...`
+    if args.exit_code and changed:
+        return 1, changed
+    return 0, changed
 
 
 def parser_func_teams(
@@ -37,7 +86,7 @@ def parser_func_teams(
     """Default function for teams parser, prints all teams and their abbreviations"""
 
     # Load the teams from main CSV file
-    _, teams = process_csv()
+    _, teams, *_ = load_season_args(args)
 
     # Print them out
     func_teams_list(
@@ -56,7 +105,7 @@ def parser_func_team_details(
     """Default function for team parser"""
 
     # Load games and teams from main CSV file
-    games, teams = process_csv()
+    games, teams, ledger, schedule = load_season_args(args)
 
     # Print out team details/summary
     func_team_details(
@@ -65,6 +114,11 @@ def parser_func_team_details(
         team_name=args.team,
         num_games_last=args.num_games_last,
         num_games_next=args.num_games_next,
+        ledger=ledger,
+        schedule=schedule,
+        game_first=args.game_first,
+        game_last=args.game_last,
+        home_ice=rating_config_args(args).home_ice,
     )
 
     return 0, (games, teams)
@@ -77,12 +131,10 @@ def parser_func_standings(
 
     # FIXME: make this into an annotation function?  Easy to reuse & test that way?
     if not args.skip_dl:  # pragma: no cover
-        cache_csv_games_file(
-            _csv_bytes_output=get_google_sheet(),
-        )
+        fetch_csv_games_file()
 
     # Build games and team objects
-    games, teams = process_csv()
+    games, teams, ledger, schedule = load_season_args(args)
 
     # Print standings
     # TODO: skip this if only printing team details
@@ -92,6 +144,9 @@ def parser_func_standings(
         col_sort_by=args.sort_column.lower() if args.sort_column else str(),
         # reverse=args.reverse,
         group_standings_by=args.group_standings_by,
+        ledger=ledger,
+        game_first=args.game_first,
+        game_last=args.game_last,
     )
 
     # Optionally print team details
@@ -103,6 +158,14 @@ def parser_func_standings(
             teams=teams,
             num_games_last=args.num_games_last,
             num_games_next=args.num_games_next,
+            ledger=ledger,
+            schedule=schedule,
+            game_first=args.game_first,
+            game_last=args.game_last,
+            num_games_rolling=args.num_games_rolling,
+            n_sims=args.n_sims,
+            seed=simulation_seed(args),
+            home_ice=rating_config_args(args).home_ice,
         )
         # func_up_coming_games()
 
@@ -113,18 +176,36 @@ def parser_func_standings(
     return 0, (games, teams)
 
 
+def parser_func_standings_series(
+    args: argparse.Namespace,
+) -> tuple[int, tuple[list[Game], dict[str, Team]]]:
+    """Default function for series parser"""
+
+    if not args.skip_dl:  # pragma: no cover
+        fetch_csv_games_file()
+
+    games, teams, ledger, _ = load_season_args(args)
+
+    func_standings_series(
+        teams=teams,
+        ledger=ledger,
+        output_path=args.output_path,
+        output_format=args.output_format,
+    )
+
+    return 0, (games, teams)
+
+
 def parser_func_projections(
     args: argparse.Namespace,
 ) -> tuple[int, tuple[list[Game], dict[str, Team]]]:
     """Default function for projection parser"""
 
     if not args.skip_dl:  # pragma: no cover
-        cache_csv_games_file(
-            _csv_bytes_output=get_google_sheet(),
-        )
+        fetch_csv_games_file()
 
     # Build games and team objects
-    games, teams = process_csv()
+    games, teams, *_ = load_season_args(args)
 
     # Print projections
     func_projections(
@@ -132,6 +213,12 @@ def parser_func_projections(
         teams=teams,
         # col_sort_by=args.sort_column.lower() if args.sort_column else str(),
         # group_projections_by=args.group_projections_by,
+        n_sims=args.n_sims,
+        seed=simulation_seed(args),
+        workers=args.workers,
+        precision=args.precision,
+        time_budget=args.time_budget,
+        home_ice=rating_config_args(args).home_ice,
     )
 
     # TODO: Optionally print team details, e.g. list of game outcomes
@@ -139,18 +226,126 @@ def parser_func_projections(
     return 0, (games, teams)
 
 
+def parser_func_playoffs(
+    args: argparse.Namespace,
+) -> tuple[int, tuple[list[Game], dict[str, Team]]]:
+    """Default function for playoff parser"""
+
+    if not args.skip_dl:  # pragma: no cover
+        fetch_csv_games_file()
+
+    # Build games and team objects
+    games, teams, *_ = load_season_args(args)
+
+    # Print first round & playoff odds
+    func_playoffs(
+        games=games,
+        teams=teams,
+        n_sims=args.n_sims,
+        seed=simulation_seed(args),
+        workers=args.workers,
+        precision=args.precision,
+        time_budget=args.time_budget,
+        home_ice=rating_config_args(args).home_ice,
+    )
+
+    return 0, (games, teams)
+
+
+def parser_func_compare_configs(
+    args: argparse.Namespace,
+) -> tuple[int, tuple[list[Game], dict[str, Team]]]:
+    """Default function for compare parser"""
+
+    if not args.skip_dl:  # pragma: no cover
+        fetch_csv_games_file()
+
+    # Build games and team objects
+    games, teams, *_ = load_season_args(args)
+
+    # Each OTL model (with the other options) by default
+    configs = args.configs or [
+        rating_config_args(args)._replace(otl_model=x) for x in OTL_MODELS
+    ]
+    func_compare_configs(
+        games=games,
+        teams=teams,
+        configs=configs,
+        rating_period=args.rating_period,
+    )
+
+    return 0, (games, teams)
+
+
+def parser_func_backtest(
+    args: argparse.Namespace,
+) -> tuple[int, list[Game]]:
+    """Default function for backtest parser"""
+
+    if not args.skip_dl:  # pragma: no cover
+        fetch_csv_games_file()
+
+    # The backtest scores the pre-game ratings & odds already in the ledger
+    games, _, ledger, _ = load_season_args(args)
+
+    func_backtest(
+        games=games,
+        ledger=ledger,
+        config=rating_config_args(args),
+        predictions_path=args.predictions_path,
+    )
+
+    return 0, games
+
+
+def parser_func_tune(
+    args: argparse.Namespace,
+) -> tuple[int, dict[RatingConfig, float]]:
+    """Default function for tune parser"""
+
+    if not args.csv_paths:
+        if not args.skip_dl:  # pragma: no cover
+            fetch_csv_games_file()
+        args.csv_paths = [CSV_GAMES_FILE_PATH]
+
+    # Parsed once, and shared by every candidate
+    seasons = [
+        GameArrays.from_games(build_games(read_csv_rows(x)), args.rating_period)
+        for x in args.csv_paths
+    ]
+    grids = {**PARAMETER_GRIDS, **dict(args.grids or [])}
+    base = rating_config_args(args)
+
+    surface = tune(
+        seasons,
+        base=base,
+        search=args.search,
+        grids=grids,
+        n_candidates=args.n_candidates,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    func_tune(
+        surface,
+        base=base,
+        n_games=sum(len(x) for x in seasons),
+        grids=grids,
+        surface_path=args.surface_path,
+    )
+
+    return 0, surface
+
+
 def parser_func_match_ups(
     args: argparse.Namespace,
 ) -> tuple[int, tuple[list[Game], dict[str, Team]]]:
     """Default function for match ups parser"""
 
     if not args.skip_dl:  # pragma: no cover
-        cache_csv_games_file(
-            _csv_bytes_output=get_google_sheet(),
-        )
+        fetch_csv_games_file()
 
     # Build games and team objects
-    games, teams = process_csv()
+    games, teams, *_ = load_season_args(args)
 
     # Decide which teams to print match ups for
     if args.teams:
@@ -6,7 +6,13 @@ Created on Mon May 31 09:19:00 2021 -0400
 Custom types for argparse validation
 """
 import argparse
+import math
 import os
+import re
+from datetime import date
+
+from nhlrank.rating import OTL_MODELS, RatingConfig
+from nhlrank.tune import PARAMETER_GRIDS
 
 
 def file_path(path_in: str) -> str:
@@ -21,3 +27,100 @@ def file_or_dir_path(path_in: str) -> str:
     if os.path.exists(path_in):
         return path_in
     raise argparse.ArgumentTypeError(f'FileNotFoundError: "{path_in}"')
+
+
+def positive_int(value: str) -> int:
+    """Returns the value as an integer if it's at least 1, else raises argparse error"""
+    try:
+        _int = int(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}"') from err
+    if _int < 1:
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}" (must be >= 1)')
+    return _int
+
+
+def positive_float(value: str) -> float:
+    """Returns the value as a float if it's above 0, else raises argparse error"""
+    try:
+        _float = float(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}"') from err
+    if _float <= 0 or math.isnan(_float):
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}" (must be > 0)')
+    return _float
+
+
+def date_iso(value: str) -> date:
+    """Returns a date from YYYY-MM-DD, else raises argparse error"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f'ValueError: "{value}" (YYYY-MM-DD, e.g. 2023-12-31)'
+        ) from err
+
+
+def game_number_or_date(value: str) -> int | date:
+    """Returns a game number (1 for the first) or a date (YYYY-MM-DD)"""
+    if value.isdigit():
+        return positive_int(value)
+    return date_iso(value)
+
+
+def duration(value: str) -> float:
+    """Returns a duration (e.g. 2s, 500ms, 1m, or plain seconds) in seconds"""
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0}
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?|\.\d+)\s*(ms|s|m)?\s*", value.lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}" (e.g. 2s, 500ms)')
+    return float(match.group(1)) * units[match.group(2) or "s"]
+
+
+def rating_config(value: str) -> RatingConfig:
+    """
+    Returns a rating config from "MODEL[:FACTOR[:TAU[:RD]]]", e.g. "tie",
+    "geometric:0.4", or "inflationary:0.5:0.3:300" (omitted values are the defaults,
+    the given ones must be above 0, see positive_float)
+    """
+    model, *numbers = value.split(":")
+    if model not in OTL_MODELS or len(numbers) > 3:
+        raise argparse.ArgumentTypeError(
+            f'ValueError: "{value}" (MODEL[:FACTOR[:TAU[:RD]]], MODEL in {OTL_MODELS})'
+        )
+    try:
+        numbers_float = [positive_float(x) for x in numbers]
+    except argparse.ArgumentTypeError as err:
+        raise argparse.ArgumentTypeError(f'{err}, in "{value}"') from err
+
+    # Omitted values are the defaults
+    default = RatingConfig()
+    n_given = len(numbers_float)
+    otl_factor, tau, phi = (
+        *numbers_float,
+        *(default.otl_factor, default.tau, default.phi)[n_given:],
+    )
+    return RatingConfig(tau=tau, phi=phi, otl_model=model, otl_factor=otl_factor)
+
+
+def parameter_grid(value: str) -> tuple[str, tuple[float, ...]]:
+    """
+    Returns a parameter's values to search, from "NAME=V1,V2,..." (each above 0,
+    except for home_ice)
+    """
+    name, _, values = value.partition("=")
+    if name not in PARAMETER_GRIDS or not values:
+        raise argparse.ArgumentTypeError(
+            f'ValueError: "{value}" (NAME=V1,V2,..., NAME in {tuple(PARAMETER_GRIDS)})'
+        )
+    try:
+        return name, tuple(
+            sorted(
+                float(x) if name == "home_ice" else positive_float(x)
+                for x in values.split(",")
+            )
+        )
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f'ValueError: "{value}"') from err
+    except argparse.ArgumentTypeError as err:
+        raise argparse.ArgumentTypeError(f'{err}, in "{value}"') from err
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:12:40 2026
+
+@author: shane
+The season as of a past date, e.g. the standings & ratings on Dec 31, looked up
+from the ledger's running totals & the rating histories (bisection, no re-rating).
+"""
+import copy
+from datetime import date
+
+from nhlrank.core import Season
+from nhlrank.ledger import Ledger
+from nhlrank.models import Game, Team
+from nhlrank.schedule import ScheduleIndex
+
+
+def team_as_of(team: Team, ledger: Ledger, date_at: date, game_index: int) -> Team:
+    """
+    Copy of a team, as of the end of a date (game_index being the last game played
+    by then, league-wide), in O(log games)
+    """
+    n_games = ledger.team_games_as_of(team.id, date_at)
+    totals = ledger.team_totals(team.id, n_games)
+
+    team_as_of_date = Team(team.name)
+    team_as_of_date.games_played = n_games
+    team_as_of_date.wins = totals["wins"]
+    team_as_of_date.losses = totals["losses"]
+    team_as_of_date.losses_ot = totals["losses_ot"]
+    team_as_of_date.regulation_wins = totals["regulation_wins"]
+    team_as_of_date.regulation_overtime_wins = totals["regulation_overtime_wins"]
+    team_as_of_date.goals_for = totals["goals_for"]
+    team_as_of_date.goals_against = totals["goals_against"]
+    team_as_of_date.record_home = [
+        totals["home_wins"],
+        totals["home_losses"],
+        totals["home_losses_ot"],
+    ]
+    team_as_of_date.record_away = [
+        totals["away_wins"],
+        totals["away_losses"],
+        totals["away_losses_ot"],
+    ]
+    team_as_of_date.shootout = [totals["shootout_wins"], totals["shootout_losses"]]
+
+    team_as_of_date.set_outcomes(team.game_outcomes[:n_games])
+
+    # Rating histories, up to the date's last game
+    team_as_of_date.ratings = team.ratings.until(game_index)
+    team_as_of_date.ratings_home = team.ratings_home.until(game_index)
+    team_as_of_date.ratings_away = team.ratings_away.until(game_index)
+    team_as_of_date.opponent_ratings = team.opponent_ratings.until(game_index)
+    team_as_of_date.opponent_ratings_by_outcome = {
+        outcome: ratings.until(game_index)
+        for outcome, ratings in team.opponent_ratings_by_outcome.items()
+    }
+
+    return team_as_of_date
+
+
+def games_as_of(games: list[Game], game_index: int) -> list[Game]:
+    """The games, with any played after game_index back to scheduled"""
+    return [
+        (
+            game
+            if game.index <= game_index or not game.is_completed
+            else Game(
+                game.date,
+                game.time,
+                game.team_away,
+                game.team_home,
+                0,
+                0,
+                "Scheduled",
+                game.index,
+            )
+        )
+        for game in games
+    ]
+
+
+def season_as_of(season: Season, date_at: date) -> Season:
+    """
+    The season as of the end of a date (its games included): standings, ratings,
+    ledger & schedule, with the later games unplayed (e.g. to project from there).
+    With a rating period, the ratings are from the last period rated by then.
+    """
+    n_rows = season.ledger.n_rows_as_of(date_at)
+    game_index = int(season.ledger.game_indexes[n_rows - 1]) if n_rows else -1
+
+    ledger = copy.deepcopy(season.ledger)
+    ledger.truncate(game_index + 1)
+
+    games = games_as_of(season.games, game_index)
+    return Season(
+        games=games,
+        teams={
+            name: team_as_of(team, season.ledger, date_at, game_index)
+            for name, team in season.teams.items()
+        },
+        ledger=ledger,
+        schedule=ScheduleIndex(games),
+    )
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:26:50 2026
+
+@author: shane
+Walk-forward (prequential) backtest: every completed game is predicted from the
+ratings before it (kept in the ledger), so each prediction only sees the past.
+"""
+import contextlib
+import csv
+import math
+
+from nhlrank.ledger import Ledger
+from nhlrank.models import Game
+
+# Calibration buckets, by the favorite's odds (0.50-0.55, ..., 0.95-1.00)
+N_BUCKETS = 10
+
+# Keeps log(0) out of the log-loss, for (near) certain predictions
+ODDS_EPSILON = 1e-15
+
+# Per-game prediction file columns
+PREDICTION_HEADERS = [
+    "date",
+    "away",
+    "home",
+    "odds_home",
+    "home_won",
+    "overtime",
+    "log_loss",
+    "brier",
+]
+
+
+class Scores:
+    """Running prediction scores (constant work & memory per game)"""
+
+    def __init__(self) -> None:
+        self.n_games = 0
+        self.log_loss_sum = 0.0
+        self.brier_sum = 0.0
+        self.correct = 0.0
+
+        # Per bucket: games, sum of the favorite's odds, and the favorite's wins
+        self.bucket_games = [0] * N_BUCKETS
+        self.bucket_odds = [0.0] * N_BUCKETS
+        self.bucket_wins = [0] * N_BUCKETS
+
+    def add(self, odds: float, won: bool) -> tuple[float, float]:
+        """Adds a prediction (odds of a win) & its result, returns its scores"""
+        _odds = min(max(odds, ODDS_EPSILON), 1 - ODDS_EPSILON)
+        log_loss = -math.log(_odds if won else 1 - _odds)
+        brier = (odds - won) ** 2
+
+        self.n_games += 1
+        self.log_loss_sum += log_loss
+        self.brier_sum += brier
+        # A coin flip (exactly 50%) is half right either way
+        self.correct += 0.5 if odds == 0.5 else float((odds > 0.5) == won)
+
+        odds_favorite, favorite_won = (
+            (odds, won) if odds >= 0.5 else (1 - odds, not won)
+        )
+        i = min(int((odds_favorite - 0.5) * 2 * N_BUCKETS), N_BUCKETS - 1)
+        self.bucket_games[i] += 1
+        self.bucket_odds[i] += odds_favorite
+        self.bucket_wins[i] += favorite_won
+        return log_loss, brier
+
+    @property
+    def log_loss(self) -> float:
+        """Average log-loss (lower is better, 0.693 is a coin flip)"""
+        return self.log_loss_sum / self.n_games if self.n_games else math.nan
+
+    @property
+    def brier(self) -> float:
+        """Average Brier score (lower is better, 0.25 is a coin flip)"""
+        return self.brier_sum / self.n_games if self.n_games else math.nan
+
+    @property
+    def accuracy(self) -> float:
+        """Share of games the favorite won"""
+        return self.correct / self.n_games if self.n_games else math.nan
+
+    def calibration(self) -> list[tuple[float, float, float, int]]:
+        """(bucket low, predicted, actual, games) for each non-empty bucket"""
+        return [
+            (0.5 + i / (2 * N_BUCKETS), odds_sum / n, wins / n, n)
+            for i, (n, odds_sum, wins) in enumerate(
+                zip(self.bucket_games, self.bucket_odds, self.bucket_wins)
+            )
+            if n
+        ]
+
+
+class Backtest:
+    """Scores overall, by month, and by venue (is the home or away team favored)"""
+
+    def __init__(self) -> None:
+        self.overall = Scores()
+        self.by_month: dict[str, Scores] = {}
+        self.by_venue = {"Home favored": Scores(), "Away favored": Scores()}
+
+    def add(self, game: Game, odds_home: float) -> tuple[float, float]:
+        """Adds a game's prediction (home team's odds of winning) & result"""
+        home_won = game.score_home > game.score_away
+        month = game.date.strftime("%Y-%m")
+        if month not in self.by_month:
+            self.by_month[month] = Scores()
+
+        self.by_month[month].add(odds_home, home_won)
+        self.by_venue["Home favored" if odds_home >= 0.5 else "Away favored"].add(
+            odds_home, home_won
+        )
+        return self.overall.add(odds_home, home_won)
+
+
+def backtest(
+    games: list[Game],
+    ledger: Ledger,
+    home_ice: float = 0.0,
+    predictions_path: str | None = None,
+) -> Backtest:
+    """
+    Scores each completed game's prediction (the home team's odds, same as
+    game_odds() but unrounded, plus home_ice) from its pre-game ratings, as recorded
+    in the ledger during the replay, in a single pass.
+    Optionally streams one row per game to a CSV file of predictions.
+    """
+    result = Backtest()
+
+    with contextlib.ExitStack() as stack:
+        writer = None
+        if predictions_path:
+            writer = csv.writer(
+                stack.enter_context(
+                    open(predictions_path, "w", encoding="utf-8", newline="")
+                )
+            )
+            writer.writerow(PREDICTION_HEADERS)
+
+        for game_index, odds_home in zip(
+            ledger.game_indexes.tolist(), ledger.predictions(home_ice).tolist()
+        ):
+            game = games[game_index]
+            log_loss, brier = result.add(game, odds_home)
+            if writer:
+                writer.writerow(
+                    [
+                        game.date,
+                        game.team_away,
+                        game.team_home,
+                        round(odds_home, 4),
+                        int(game.score_home > game.score_away),
+                        int(game.is_overtime),
+                        round(log_loss, 4),
+                        round(brier, 4),
+                    ]
+                )
+
+    return result
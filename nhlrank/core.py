@@ -6,67 +6,122 @@ Created on Fri Feb 10 13:37:46 2023
 """
 import csv
 from datetime import date
+from typing import NamedTuple
 
 import asciichartpy
+import numpy as np
 from tabulate import tabulate
 
-from nhlrank import CLI_CONFIG, CSV_GAMES_FILE_PATH, constants, standings
-from nhlrank.glicko2 import glicko2
-from nhlrank.models import Game, Team
+from nhlrank import (
+    CLI_CONFIG,
+    CSV_GAMES_FILE_PATH,
+    backtest,
+    constants,
+    points,
+    simulate,
+    snapshot,
+    standings,
+    tiebreak,
+    timeseries,
+    tune,
+)
+from nhlrank.ledger import Ledger
+from nhlrank.models import TEAM_NAMES, Game, Outcome, Team
 from nhlrank.models.helpers import (
     expected_outcome_str,
-    game_odds,
     get_team_name,
     mutual_record,
+    playoff_contenders,
 )
-from nhlrank.utils import get_or_create_team_by_name, print_subtitle, print_title
-
-
-def process_csv() -> tuple[list[Game], dict[str, Team]]:
+from nhlrank.odds import get_odds_matrix
+from nhlrank.rating import GameArrays, RatingConfig, get_rating_engine, replay_configs
+from nhlrank.replay import replay_games, replay_periods
+from nhlrank.schedule import ScheduleIndex
+from nhlrank.stats import StatsTable
+from nhlrank.utils import print_subtitle, print_title
+from nhlrank.window import GameOrDate, WindowIndex, window_str
+
+
+class Season(NamedTuple):
+    """Everything processed from a season's CSV"""
+
+    games: list[Game]
+    teams: dict[str, Team]
+    ledger: Ledger
+    schedule: ScheduleIndex
+
+
+def process_csv(
+    csv_file_path: str = CSV_GAMES_FILE_PATH,
+    use_snapshot: bool = True,
+    config: RatingConfig = RatingConfig(),
+    rating_period: str | None = None,
+) -> tuple[list[Game], dict[str, Team]]:
     """
     Main function for reading the CSV data into the NHLRank program
     https://shanemcd.org/2023/08/23/2023-24-nhl-schedule-and-results-in-excel-xlsx-and-csv-formats/
+
+    Returns the games & teams, see load_season() (which has the ledger too).
     """
+    season = load_season(csv_file_path, use_snapshot, config, rating_period)
+    return season.games, season.teams
 
-    with open(CSV_GAMES_FILE_PATH, "r", encoding="utf-8") as _file:
-        reader = csv.reader(_file)
-        rows = list(reader)
-        _ = rows.pop(0)  # remove headers
 
-    games = [
-        Game(
-            date_at=date.fromisoformat(row[0]),
-            time_at=row[1],
-            team_away=row[3],
-            team_home=row[5],
-            score_away=int(row[4]) if row[4] else 0,
-            score_home=int(row[6]) if row[6] else 0,
-            outcome=row[7],
-        )
-        for row in rows
-    ]
+def load_season(
+    csv_file_path: str = CSV_GAMES_FILE_PATH,
+    use_snapshot: bool = True,
+    config: RatingConfig = RatingConfig(),
+    rating_period: str | None = None,
+) -> Season:
+    """
+    Reads & rates the CSV, with a ledger of every game's ratings (see ledger.Ledger).
 
-    # TODO: Validate games
-    # for game in games:
+    The processed games, teams & ledger are cached in a snapshot keyed by the CSV's
+    content hash (and package version), so unchanged input is only replayed once.
+    When the CSV has changed (e.g. last night's games were added), rating resumes
+    from the snapshot's last checkpoint before the first added or corrected row.
+
+    Games are rated one by one, or with a rating_period ("day", "week"), all of a
+    period's games at once (see replay_periods).
+    """
+
+    csv_hash = snapshot.csv_file_hash(csv_file_path)
+    rating_key = snapshot.make_rating_key(config, rating_period)
+    _snapshot = (
+        snapshot.load_snapshot(csv_hash, csv_file_path, True, rating_key)
+        if use_snapshot
+        else None
+    )
+
+    if _snapshot and _snapshot.csv_hash == csv_hash:
+        games, teams, ledger = _snapshot.games, _snapshot.teams, _snapshot.ledger
+    else:
+        rows = read_csv_rows(csv_file_path)
+        games = build_games(rows)
+
+        # Resume from the latest checkpoint that's still valid, or start fresh
+        if _snapshot:
+            start, teams, checkpoints, ledger = _snapshot.resume_point(rows)
+        else:
+            start, teams, checkpoints, ledger = 0, {}, [], Ledger()
+        if CLI_CONFIG.debug:
+            print(f"Rating games from row {start} of {len(rows)}")
 
-    # Build teams
-    teams: dict[str, Team] = {}
-    for game in games:
-        # Create team if it doesn't exist
-        # NOTE: 117
-        if game.team_home not in teams:
-            teams[game.team_home] = Team(game.team_home)
-        if game.team_away not in teams:
-            teams[game.team_away] = Team(game.team_away)
-
-        # Update players stats and ratings
-        update_team_ratings(teams, game)
-
-    # Check n_teams is 32
-    if len(teams) != 32:
-        for team in sorted(teams.keys()):
-            print(team)
-        raise ValueError(f"Do we still expect 32 teams?  We got: {len(teams)}.")
+        engine = get_rating_engine(config)
+        if rating_period:
+            replay_periods(
+                games, teams, rating_period, start, checkpoints, engine, ledger
+            )
+        else:
+            replay_games(games, teams, start, checkpoints, engine, ledger)
+
+        if use_snapshot:
+            snapshot.save_snapshot(
+                snapshot.Snapshot(
+                    csv_hash, rows, games, teams, checkpoints, rating_key, ledger
+                ),
+                csv_file_path,
+            )
 
     # Show games (DEBUG)
     if CLI_CONFIG.debug:
@@ -80,98 +135,38 @@ def process_csv() -> tuple[list[Game], dict[str, Team]]:
         print()
         print(f"Total number of games played: {n_games_completed} out of {len(games)}")
 
-    return games, teams
-
+    return Season(games, teams, ledger, ScheduleIndex(games))
 
-def update_team_ratings(teams: dict[str, Team], game: Game) -> None:
-    """Update two teams' stats, based on a game outcome"""
 
-    def rate_game(team_winner: Team, team_loser: Team) -> None:
-        """
-        Helper method for updating two teams' Glicko ratings, based on a game outcome
-        """
-        # Update wins, losses, OT losses; Goals for, against; Other basic standings
-        team_winner.add_game(game)
-        team_loser.add_game(game)
+def read_csv_rows(csv_file_path: str = CSV_GAMES_FILE_PATH) -> list[list[str]]:
+    """Reads the raw rows of the CSV file (without the headers)"""
+    with open(csv_file_path, "r", encoding="utf-8") as _file:
+        reader = csv.reader(_file)
+        rows = list(reader)
+        _ = rows.pop(0)  # remove headers
+    return rows
 
-        if CLI_CONFIG.debug:
-            print(
-                f"{team_winner.name} ({team_winner.rating_str})"
-                f" vs {team_loser.name} ({team_loser.rating_str}) — [{game.outcome}]"
-            )
 
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Update ratings
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # TODO: add support for different OTL models, e.g. geometric, inflationary
-        # TODO: add support for different OTL factors, e.g. 0.5, 0.4, 0.3
-        # TODO: weight overtime wins lower for teams in conference, or division
-        _new_rating_team_winner, _new_rating_team_loser = glicko.rate_1vs1(
-            team_winner.rating,
-            team_loser.rating,
-            overtime=game.outcome in game.OT_OUTCOMES,
+def build_games(rows: list[list[str]]) -> list[Game]:
+    """Builds the Game objects from raw CSV rows"""
+    games = [
+        Game(
+            date_at=date.fromisoformat(row[0]),
+            time_at=row[1],
+            team_away=row[3],
+            team_home=row[5],
+            score_away=int(row[4]) if row[4] else 0,
+            score_home=int(row[6]) if row[6] else 0,
+            outcome=row[7],
+            index=i,
         )
-        if game.team_home == team_winner.name:
-            _new_rating_team_home, _new_rating_team_away = glicko.rate_1vs1(
-                team_winner.rating_home,
-                team_loser.rating_away,
-                overtime=game.outcome in game.OT_OUTCOMES,
-            )
-        else:
-            _new_rating_team_away, _new_rating_team_home = glicko.rate_1vs1(
-                team_winner.rating_away,
-                team_loser.rating_home,
-                overtime=game.outcome in game.OT_OUTCOMES,
-            )
-
-        if CLI_CONFIG.debug:
-            # Show the rating changes
-            print(
-                f"{team_winner.name} {round(team_winner.rating.mu)} ->"
-                f" {round(_new_rating_team_winner.mu)}"
-                f" vs {team_loser.name} {round(team_loser.rating.mu)} ->"
-                f" {round(_new_rating_team_loser.mu)} ({game.outcome})"
-            )
-
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Add new ratings to lists
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # TODO: take average of before and after opponent ratings?  Group by W/L/OTL?
-        team_winner.opponent_ratings.append(team_loser.rating)
-        team_winner.opponent_ratings_by_outcome["W"].append(team_loser.rating)
-        team_loser.opponent_ratings.append(team_winner.rating)
-        if game.outcome in game.OT_OUTCOMES:
-            team_loser.opponent_ratings_by_outcome["OTL"].append(team_winner.rating)
-        else:
-            team_loser.opponent_ratings_by_outcome["L"].append(team_winner.rating)
-        # ~~~~~~~~~~~~
-        # Main ratings
-        # ~~~~~~~~~~~~
-        team_winner.ratings.append(_new_rating_team_winner)
-        team_loser.ratings.append(_new_rating_team_loser)
-        # Home/away ratings
-        if game.team_home == team_winner.name:
-            team_winner.ratings_home.append(_new_rating_team_home)
-            team_loser.ratings_away.append(_new_rating_team_away)
-        else:
-            team_winner.ratings_away.append(_new_rating_team_away)
-            team_loser.ratings_home.append(_new_rating_team_home)
-
-    # Create the rating engine
-    glicko = glicko2.Glicko2()
+        for i, row in enumerate(rows)
+    ]
 
-    # Get teams, or create them if they don't exist
-    # TODO: is this already done in the process_csv() function?  Where should this be?
-    #  see "NOTE: 117" above
-    team_away = get_or_create_team_by_name(teams, game.team_away)
-    team_home = get_or_create_team_by_name(teams, game.team_home)
+    # TODO: Validate games
+    # for game in games:
 
-    # Run the nested helper method
-    if game.is_completed:
-        if game.score_away > game.score_home:
-            rate_game(team_winner=team_away, team_loser=team_home)
-        else:
-            rate_game(team_winner=team_home, team_loser=team_away)
+    return games
 
 
 def func_teams_list(
@@ -232,11 +227,20 @@ def func_team_details(
     team_name: str,
     num_games_last: int,
     num_games_next: int,
+    ledger: Ledger | None = None,
+    schedule: ScheduleIndex | None = None,
+    game_first: GameOrDate | None = None,
+    game_last: GameOrDate | None = None,
+    home_ice: float = 0.0,
 ) -> None:
     """
     Team details function used by team sub-parser.
     Prints off stats and recent trends for a given team.
+    With a range of games (game numbers or dates, needs the ledger), shows those
+    instead of the last N, with the record, goals & average ratings over them.
+    Upcoming games' odds have home_ice rating points added to the home team.
     """
+    schedule = schedule or ScheduleIndex(games)
 
     # Get team name if abbreviation is passed
     team_name = (
@@ -248,34 +252,54 @@ def func_team_details(
     # Get the team
     team = teams[team_name]
 
-    # Get their games
-    team_games = [
-        game for game in games if team_name in {game.team_away, game.team_home}
-    ]
-
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Simulate rest of season (for this team)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    games_remaining = [
-        game
-        for game in games
-        if not game.is_completed and team_name in {game.team_away, game.team_home}
-    ]
+    games_remaining = schedule.games_upcoming(team.id)
+    odds = get_odds_matrix(teams, home_ice)
     wins_projected = team.wins + 0.5 * team.losses_ot
     for game in games_remaining:
-        wins_projected += game_odds(team, teams[game.opponent(team_name)])
+        wins_projected += odds.odds_game(team.id, game)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Print of stats and details for games already played by this team
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    games_played = [game for game in team_games if game.is_completed]
-    print_title(f"Games played: {len(games_played)} (showing last {num_games_last})")
+    # NOTE: --last 0 shows them all, a range of games (--from/--to) overrides it
+    n_games_played = len(schedule.completed(team.id))
+    is_window = game_first is not None or game_last is not None
+    if is_window:
+        if ledger is None:
+            raise ValueError("Team details over a range of games need the ledger")
+        windows = WindowIndex(ledger)
+        start, stop = windows.bounds(team.id, game_first, game_last)
+        games_played_last_n = [
+            schedule.games[i] for i in schedule.completed(team.id)[start:stop].tolist()
+        ]
+        showing = window_str(game_first, game_last)
+    else:
+        games_played_last_n = schedule.games_completed(team.id, num_games_last or None)
+        start = n_games_played - len(games_played_last_n)
+        showing = f"last {num_games_last}"
+    print_title(f"Games played: {n_games_played} (showing {showing})")
     table_series_games_played = []
 
-    for game in games_played[-num_games_last:]:
+    # Ratings going into (and coming out of) each game, and the odds
+    # NOTE: the ledger has a team's games in order (one a day, so dates must match)
+    if ledger is not None:
+        stop = start + len(games_played_last_n)
+        rows = ledger.team_rows(team.id)[start:stop]
+        if ledger.dates[rows].tolist() != [
+            x.date.toordinal() for x in games_played_last_n
+        ]:
+            raise ValueError("The ledger's rows don't match the games shown")
+        ratings_pre = ledger.team_ratings(team.id, post=False)[:, Ledger.MU]
+        ratings_post = ledger.team_ratings(team.id)[:, Ledger.MU]
+        odds_pre = ledger.team_odds(team.id)
+
+    for number, game in enumerate(games_played_last_n, start=start):
         # Decide the outcome (not simple, apparently)
-        is_home = game.team_home == team_name
-        is_overtime = game.outcome in game.OT_OUTCOMES
+        is_home = game.id_home == team.id
+        is_overtime = game.is_overtime
         if game.score_away > game.score_home:
             if is_home:
                 _win = "OTL" if is_overtime else "L"
@@ -295,28 +319,41 @@ def func_team_details(
                 if is_home
                 else f"{game.score_away} - {game.score_home}",
                 game.team_away if is_home else game.team_home,
-                # TODO: store rating for each game, and show it here
-                "Home" if game.team_home == team_name else str(),
+                "Home" if game.id_home == team.id else str(),
                 _win,
-                game.outcome if game.outcome != "Regulation" else str(),
+                game.outcome if game.outcome_code is not Outcome.REGULATION else str(),
+                *(
+                    (
+                        round(float(odds_pre[number]), 2),
+                        round(ratings_pre[number]),
+                        round(ratings_post[number]),
+                    )
+                    if ledger is not None
+                    else ()
+                ),
             )
         )
     print(
         tabulate(
             table_series_games_played,
-            headers=["Date", "Us", "Score", "Opponent", "Arena", "Win", "Outcome"],
+            headers=["Date", "Us", "Score", "Opponent", "Arena", "Win", "Outcome"]
+            + (["Odds", "Rate", "After"] if ledger is not None else []),
         )
     )
-    print_subtitle(f"Last {sum(team.last_n(num_games_last))} games")
-    print(f"Record: {team.last_n_str(num_games_last)}")
-    goals_for_last_n = sum(
-        game.score_home if game.team_home == team_name else game.score_away
-        for game in games_played[-num_games_last:]
-    )
-    goals_against_last_n = sum(
-        game.score_away if game.team_home == team_name else game.score_home
-        for game in games_played[-num_games_last:]
-    )
+    if is_window:
+        print_subtitle(f"Games {start + 1} to {stop}" if stop > start else "No games")
+        print(
+            f"Record: {'-'.join(str(x) for x in windows.record(team.id, start, stop))}"
+        )
+        goals_for_last_n, goals_against_last_n = windows.goals(team.id, start, stop)
+    else:
+        print_subtitle(f"Last {sum(team.last_n(num_games_last))} games")
+        print(f"Record: {team.last_n_str(num_games_last)}")
+        goals_for_last_n, goals_against_last_n = (
+            schedule.goals_last_n(team.id, num_games_last)
+            if num_games_last
+            else schedule.goals(team.id)
+        )
     # TODO: get stats/data from NHL API on shots on vs. shots against
     goals_diff_last_n = goals_for_last_n - goals_against_last_n
     print(
@@ -324,6 +361,11 @@ def func_team_details(
         f"    Goals against: {goals_against_last_n}"
         f"    ({'+' if goals_diff_last_n > 0 else ''}{goals_diff_last_n})"
     )
+    if is_window:
+        print(
+            f"Avg rating: {windows.rating_avg(team.id, start, stop) or '-'}"
+            f"    Avg opp: {windows.avg_opp(team.id, start, stop)}"
+        )
     print_subtitle("Season totals")
     goal_differential = team.goals_for - team.goals_against
     print(
@@ -336,20 +378,19 @@ def func_team_details(
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Print off odds, date, and arena for upcoming games for this team
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    games_upcoming = [game for game in team_games if not game.is_completed]
     print_title(
-        f"Upcoming games: {len(games_upcoming)} (showing next {num_games_next})"
+        f"Upcoming games: {len(games_remaining)} (showing next {num_games_next})"
     )
     table_series_upcoming_games = [
         (
             game.time,
             game.date,
             game.opponent(team_name),
-            "Home" if game.team_home == team_name else str(),
-            game_odds(team, teams[game.opponent(team_name)]),
-            expected_outcome_str(game_odds(team, teams[game.opponent(team_name)])),
+            "Home" if game.id_home == team.id else str(),
+            odds.odds_game(team.id, game),
+            expected_outcome_str(odds.odds_game(team.id, game)),
         )
-        for game in games_upcoming[:num_games_next]
+        for game in games_remaining[:num_games_next]
     ]
     print(
         f"Projection: {round(wins_projected)}-{round(82 - wins_projected)}"
@@ -369,15 +410,50 @@ def func_team_details(
         )
     )
 
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Exact distribution of final points (over all the remaining games)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    distribution = points.team_points_distribution(
+        games, teams, team, schedule, home_ice
+    )
+    print_subtitle("Final points (exact distribution)")
+    print(
+        f"Mean: {round(distribution.mean, 1)}    Percentiles: "
+        + "  ".join(
+            f"{round(100 * q)}%: {distribution.percentile(q)}"
+            for q in (0.05, 0.25, 0.5, 0.75, 0.95)
+        )
+    )
+    print()
+
+    # Histogram, trimmed to the likely range (central 99%)
+    odds_max = distribution.probabilities.max()
+    table_series_points = [
+        (
+            _points,
+            f"{round(100 * _odds, 1)}%",
+            f"{round(100 * distribution.odds_at_least(_points), 1)}%",
+            "#" * round(40 * _odds / odds_max),
+        )
+        for _points, _odds in zip(distribution.points, distribution.probabilities)
+        if distribution.percentile(0.005) <= _points <= distribution.percentile(0.995)
+    ]
+    print(tabulate(table_series_points, headers=["Pts", "Odds", "At least", ""]))
+
 
 def func_standings(
     games: list[Game],
     teams: dict[str, Team],
     col_sort_by: str = str(),
     group_standings_by: str = str(),
+    ledger: Ledger | None = None,
+    game_first: GameOrDate | None = None,
+    game_last: GameOrDate | None = None,
 ) -> None:
     """
     Standings function used by standings sub-parser.
+    With a range of games (game numbers or dates, needs the ledger), the standings
+    over just those games, ordered by points & tiebreakers 1-4 (no head-to-head).
     """
 
     # Basic stats
@@ -387,33 +463,33 @@ def func_standings(
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Either sort by default, or by a given column
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    if not col_sort_by:
-        # NHL default sorting (playoff contenders)
-        target_list = sorted(
-            teams.values(),
-            key=lambda x: (
-                x.points,
-                # https://www.espn.com/nhl/news/story?page=nhl/tiebreakers
-                -x.games_played,
-                x.wins,
-                # TODO: need to add points earned in mutual games here, for tiebreak
-                x.goals_for - x.goals_against,
-            ),
-            reverse=True,
+    is_window = game_first is not None or game_last is not None
+    if is_window:
+        if ledger is None:
+            raise ValueError("Standings over a range of games need the ledger")
+        table = StatsTable(teams.values()).over_window(
+            WindowIndex(ledger), game_first, game_last
+        )
+        table = table.sorted_by(
+            col_sort_by
+            or tiebreak.tiebreak_keys(*(table[x] for x in tiebreak.KEY_STATS))
+        )
+    elif not col_sort_by:
+        # NHL default sorting (playoff contenders), with the full tiebreakers
+        table = StatsTable(
+            tiebreak.standings_order(teams.values(), tiebreak.HeadToHeadTable(games))
         )
     else:
         # Sort by custom column
-        target_list = sorted(
-            teams.values(),
-            key=lambda x: getattr(x, col_sort_by),
-            reverse=True,
-        )
+        table = StatsTable(teams.values()).sorted_by(col_sort_by)
 
     print_title(
         f"Standings — {n_games_completed} games"
         f" (~{round(season_completion * 100, 1)}% done or"
         f" {round(82 * season_completion, 1)} GP)"
     )
+    if is_window:
+        print(f"Over {window_str(game_first, game_last)}")
     if col_sort_by:
         print(f"Sorted by: {col_sort_by}")
 
@@ -421,23 +497,47 @@ def func_standings(
     # Group by division (if requested)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     if group_standings_by == "wildcard":
-        standings.standings_by_wildcard(teams=target_list)
+        standings.standings_by_wildcard(table)
     elif group_standings_by == "div":
-        standings.standings_by_division(teams=target_list)
+        standings.standings_by_division(table)
     elif group_standings_by == "conf":
-        standings.standings_by_conference(teams=target_list)
+        standings.standings_by_conference(table)
     else:
         # Group by entire league by default
-        standings.standings_all(teams=target_list)
+        standings.standings_all(table)
+
+
+def func_standings_series(
+    teams: dict[str, Team],
+    ledger: Ledger,
+    output_path: str | None = None,
+    output_format: str = "csv",
+) -> None:
+    """
+    Standings series function used by series sub-parser: each team's standings,
+    rating & division rank on every game day (to stdout, without a path).
+    """
+    n_rows = timeseries.write_series(
+        timeseries.standings_series(teams, ledger), output_path, output_format
+    )
+    if output_path:
+        print(f"Standings series ({n_rows} rows) written to: {output_path}")
 
 
 def func_projections(
     games: list[Game],
     teams: dict[str, Team],
     # group_projections_by: str = str(),
+    n_sims: int = 100000,
+    seed: int | None = None,
+    workers: int = 1,
+    precision: float | None = None,
+    time_budget: float | None = None,
+    home_ice: float = 0.0,
 ) -> None:
     """
     Projections function used by projections sub-parser.
+    The remaining games' odds have home_ice rating points added to the home team.
     """
     # Get remaining games
     games_remaining = [game for game in games if not game.is_completed]
@@ -453,21 +553,298 @@ def func_projections(
         team.simulated_record = team.wins + 0.5 * team.losses_ot
 
     # Simulate remaining future games, add expected score to team's simulated record
-    for game_remaining in games_remaining:
-        odds = game_odds(
-            teams[game_remaining.team_away], teams[game_remaining.team_home]
+    # NOTE: np.add.at() accumulates in game order, same as adding them one by one
+    odds = get_odds_matrix(teams, home_ice)
+    ids = np.array(
+        [(x.id_away, x.id_home) for x in games_remaining], dtype=np.intp
+    ).reshape(-1, 2)
+    odds_away = np.round(odds.on_road[ids[:, 0], ids[:, 1]], 2)
+    simulated_records = np.zeros(len(TEAM_NAMES))
+    for team in teams.values():
+        simulated_records[team.id] = team.simulated_record
+    np.add.at(
+        simulated_records,
+        ids.ravel(),
+        np.column_stack((odds_away, 1 - odds_away)).ravel(),
+    )
+    for team in teams.values():
+        team.simulated_record = float(simulated_records[team.id])
+
+    # NHL default sorting (playoff contenders), ties on the projected record broken
+    # by the current standings (same sorter as `func_standings`, above)
+    standings_rank = {
+        team.id: i
+        for i, team in enumerate(
+            tiebreak.standings_order(teams.values(), tiebreak.HeadToHeadTable(games))
         )
-        teams[game_remaining.team_away].simulated_record += odds
-        teams[game_remaining.team_home].simulated_record += 1 - odds
+    }
+    target_list = sorted(
+        teams.values(), key=lambda x: (-x.simulated_record, standings_rank[x.id])
+    )
+
+    # Monte Carlo simulation of the remaining games (playoff odds)
+    simulation = simulate.simulate_season(
+        games,
+        teams,
+        n_sims=n_sims,
+        seed=seed,
+        workers=workers,
+        precision=precision,
+        time_budget=time_budget,
+        home_ice=home_ice,
+    )
+    print(
+        f"Playoff odds from {simulation.n_sims} simulated seasons"
+        f" (±{round(100 * float(simulation.error_playoffs.max()), 2)}% or better,"
+        " 95% confidence)"
+    )
+
+    table = StatsTable(target_list)
+    standings.standings_by_wildcard(
+        table, output_type="projections", simulation=simulation
+    )
+
+    print_subtitle("Playoff seed odds (%)")
+    standings.projections_seeds(table, simulation)
+
 
+def func_playoffs(
+    games: list[Game],
+    teams: dict[str, Team],
+    n_sims: int = 100000,
+    seed: int | None = None,
+    workers: int = 1,
+    precision: float | None = None,
+    time_budget: float | None = None,
+    home_ice: float = 0.0,
+) -> None:
+    """
+    Playoffs function used by playoff sub-parser.
+    Prints the first round (if the season ended today) with each series' odds,
+    then the simulated odds of winning each round, and the Cup.
+    Home ice (rating points) applies to the simulated regular season games, the
+    series odds already come from the home/away ratings.
+    """
     # NHL default sorting (playoff contenders)
-    target_list = sorted(
-        teams.values(),
-        # FIXME: this should be the same default sorter as `func_standings`, above
-        key=lambda x: x.simulated_record,
-        reverse=True,
+    target_list = tiebreak.standings_order(
+        teams.values(), tiebreak.HeadToHeadTable(games)
+    )
+    odds = get_odds_matrix(teams, home_ice)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # First round match-ups, best-of-7 (exact) odds
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    print_title("First round (if the season ended today)")
+    table_series_first_round = []
+    for conf, contenders in playoff_contenders(target_list).items():
+        divs = [div for div in contenders if div != "Wildcard"]
+        wildcards = contenders["Wildcard"][:2]
+
+        # The better division winner plays the 2nd wildcard
+        leaders = sorted((contenders[div][0] for div in divs), key=target_list.index)
+        wildcard_by_div = {
+            div: wildcards[1] if contenders[div][0] is leaders[0] else wildcards[0]
+            for div in divs
+        }
+
+        for div in divs:
+            for team_home, team_road in (
+                (contenders[div][0], wildcard_by_div[div]),
+                (contenders[div][1], contenders[div][2]),
+            ):
+                table_series_first_round.append(
+                    (
+                        conf,
+                        div,
+                        team_home.name,
+                        team_road.name,
+                        round(odds.series[team_home.id, team_road.id], 2),
+                    )
+                )
+    print(
+        tabulate(
+            table_series_first_round,
+            headers=["Conference", "Division", "Home ice", "Opponent", "Odds"],
+        )
+    )
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Simulate the rest of the season & the playoffs
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    simulation = simulate.simulate_season(
+        games,
+        teams,
+        n_sims=n_sims,
+        seed=seed,
+        workers=workers,
+        precision=precision,
+        time_budget=time_budget,
+        home_ice=home_ice,
+    )
+    print_title("Playoff odds (%), by round")
+    print(f"From {simulation.n_sims} simulated seasons & brackets")
+    standings.playoffs_rounds(StatsTable(target_list), simulation)
+
+
+def func_compare_configs(
+    games: list[Game],
+    teams: dict[str, Team],
+    configs: list[RatingConfig],
+    rating_period: str | None = None,
+) -> None:
+    """
+    Compares rating configs side by side (from one replay, see replay_configs).
+    """
+    game_arrays = GameArrays.from_games(games, rating_period)
+    ratings = replay_configs(game_arrays, configs)[:, 0, :, 0]
+    n_games_completed = len([x for x in games if x.is_completed])
+
+    print_title(f"Rating configs — {n_games_completed} games")
+    table_configs = [
+        (
+            i + 1,
+            config.otl_model,
+            config.otl_factor,
+            config.tau,
+            config.phi,
+            round(float(np.std(_ratings))),
+            TEAM_NAMES[int(np.argmax(_ratings))],
+        )
+        for i, (config, _ratings) in enumerate(zip(configs, ratings))
+    ]
+    print(
+        tabulate(
+            table_configs,
+            headers=["#", "OTL model", "OTL factor", "Tau", "RD", "Spread", "Top"],
+        )
+    )
+
+    # Ratings, sorted by the first config
+    print_subtitle("Ratings")
+    ranks = np.argsort(np.argsort(-ratings, axis=1), axis=1) + 1
+    table_ratings = [
+        (
+            team.name,
+            team.points,
+            *(round(float(x)) for x in ratings[:, team.id]),
+            f"{ranks[:, team.id].min()}-{ranks[:, team.id].max()}",
+        )
+        for team in sorted(teams.values(), key=lambda x: -ratings[0, x.id])
+    ]
+    print(
+        tabulate(
+            table_ratings,
+            headers=[
+                "Team",
+                "Pts",
+                *(f"#{i + 1}" for i in range(len(configs))),
+                "Ranks",
+            ],
+        )
+    )
+
+
+def func_backtest(
+    games: list[Game],
+    ledger: Ledger,
+    config: RatingConfig = RatingConfig(),
+    predictions_path: str | None = None,
+) -> None:
+    """
+    Backtest function used by backtest sub-parser: how well the ratings predicted
+    each game, before it was played.
+    """
+    result = backtest.backtest(games, ledger, config.home_ice, predictions_path)
+
+    print_title(f"Backtest — {result.overall.n_games} games ({config.label()})")
+
+    def scores_row(label: str, scores: backtest.Scores) -> tuple:
+        return (
+            label,
+            scores.n_games,
+            round(scores.log_loss, 4),
+            round(scores.brier, 4),
+            f"{round(100 * scores.accuracy, 1)}%",
+        )
+
+    table_scores = [
+        scores_row("Overall", result.overall),
+        *(scores_row(label, x) for label, x in result.by_venue.items()),
+        *(scores_row(month, x) for month, x in result.by_month.items()),
+    ]
+    print(
+        tabulate(table_scores, headers=["", "Games", "Log-loss", "Brier", "Accuracy"])
     )
-    standings.standings_by_wildcard(teams=target_list, output_type="projections")
+
+    # Calibration, predicted vs actual (for the favorite)
+    print_subtitle("Calibration (favorite's odds)")
+    table_calibration = [
+        (
+            f"{round(100 * low)}-{round(100 * (low + 0.5 / backtest.N_BUCKETS))}%",
+            f"{round(100 * predicted, 1)}%",
+            f"{round(100 * actual, 1)}%",
+            n,
+        )
+        for low, predicted, actual, n in result.overall.calibration()
+    ]
+    print(tabulate(table_calibration, headers=["Odds", "Predicted", "Won", "Games"]))
+
+    if predictions_path:
+        print()
+        print(f"Predictions written to: {predictions_path}")
+
+
+def func_tune(
+    surface: dict[RatingConfig, float],
+    base: RatingConfig,
+    n_games: int,
+    grids: dict[str, tuple[float, ...]] | None = None,
+    surface_path: str | None = None,
+) -> None:
+    """
+    Tune function used by tune sub-parser: best config, and the loss surface.
+    """
+    grids = grids or tune.PARAMETER_GRIDS
+    configs = sorted(surface, key=surface.__getitem__)
+    best = configs[0]
+
+    print_title(f"Tuning — {len(surface)} configs, on {n_games} games")
+    print(f"Best:     {best.label()} (log-loss {round(surface[best], 4)})")
+    print(f"Baseline: {base.label()} (log-loss {round(surface[base], 4)})")
+
+    # Top few candidates
+    print_subtitle("Lowest log-loss")
+    headers = ["Tau", "RD", "OTL factor", "Home ice", "Log-loss"]
+    table_best = [
+        (x.tau, x.phi, x.otl_factor, x.home_ice, round(surface[x], 4))
+        for x in configs[:10]
+    ]
+    print(tabulate(table_best, headers=headers, floatfmt="g"))
+
+    # Loss profile: the best log-loss at (or nearest to) each value of a parameter
+    for name, values in grids.items():
+        print_subtitle(f"Log-loss by {name}")
+        profile: dict[float, float] = {}
+        for config, loss in surface.items():
+            value = values[
+                int(np.argmin(np.abs(np.array(values) - getattr(config, name))))
+            ]
+            profile[value] = min(loss, profile.get(value, loss))
+        print(
+            tabulate(
+                [(x, round(profile[x], 4)) for x in values if x in profile],
+                headers=[name, "Best log-loss"],
+                floatfmt="g",
+            )
+        )
+
+    if surface_path:
+        with open(surface_path, "w", encoding="utf-8", newline="") as _file:
+            writer = csv.writer(_file)
+            writer.writerow([*RatingConfig._fields, "log_loss"])
+            writer.writerows([*config, surface[config]] for config in configs)
+        print()
+        print(f"Loss surface written to: {surface_path}")
 
 
 def sub_func_standings_team_details(
@@ -477,10 +854,22 @@ def sub_func_standings_team_details(
     teams: dict[str, Team],
     num_games_last: int,
     num_games_next: int,
+    ledger: Ledger,
+    schedule: ScheduleIndex | None = None,
+    game_first: GameOrDate | None = None,
+    game_last: GameOrDate | None = None,
+    num_games_rolling: int | None = None,
+    n_sims: int | None = None,
+    seed: int | None = None,
+    home_ice: float = 0.0,
 ) -> None:
     """
     Team details function used by rank sub-parser.
     Prints off stats and recent trends for a given team.
+    The rating trend is over the last N games, or a range of games (game numbers or
+    dates), optionally as an N-game rolling average.
+    The playoff odds are only simulated if asked for (n_sims), to keep the default
+    output fast & reproducible.
     """
 
     # Get team name if abbreviation is passed
@@ -508,27 +897,48 @@ def sub_func_standings_team_details(
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Simulate rest of season (for this team)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    games_remaining = [
-        game
-        for game in games
-        if not game.is_completed and team_name in {game.team_away, game.team_home}
-    ]
+    games_remaining = (schedule or ScheduleIndex(games)).games_upcoming(team.id)
+    odds = get_odds_matrix(teams, home_ice)
     wins = team.wins + 0.5 * team.losses_ot
     for game in games_remaining:
-        wins += game_odds(team, teams[game.opponent(team_name)])
+        wins += odds.odds_game(team.id, game)
     print(f"Projection: {round(wins)}-{round(82 - wins)} ({round(wins * 2, 1)} pts)")
 
-    # TODO: find prob of making playoffs using binomial distribution or expected wins
+    # Probability of making playoffs (Monte Carlo)
+    if n_sims:
+        simulation = simulate.simulate_season(
+            games, teams, n_sims=n_sims, seed=seed, home_ice=home_ice
+        )
+        print(
+            f"Playoffs: {round(100 * simulation.odds_playoffs[team.id], 1)}%"
+            f"    Division: {round(100 * simulation.odds_division[team.id], 1)}%"
+        )
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    # Rating trend (past {num_games_last} games)
+    # Rating trend (past {num_games_last} games, or a range of games)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # TODO: separate arguments for --next and --last (or --past), not 2 * num_games
-    print_subtitle(f"Rating trend (past {num_games_last} games)")
+    # Rating after each game (from the ledger)
+    ratings_mu = ledger.team_ratings(team.id)[:, Ledger.MU]
+    windows = WindowIndex(ledger)
+    if game_first is not None or game_last is not None:
+        start, stop = windows.bounds(team.id, game_first, game_last)
+        trend_str = window_str(game_first, game_last)
+    else:
+        start, stop = max(len(ratings_mu) - num_games_last, 0), len(ratings_mu)
+        trend_str = f"past {num_games_last} games"
+    if num_games_rolling:
+        trend_str += f", {num_games_rolling}-game rolling average"
+    print_subtitle(f"Rating trend ({trend_str})")
     if CLI_CONFIG.debug:
-        print(f"Ratings: {[round(x.mu) for x in team.ratings]}")
+        print(f"Ratings: {[round(x) for x in ratings_mu.tolist()]}")
+    trend = (
+        windows.rolling_rating(team.id, num_games_rolling, start, stop)
+        if num_games_rolling
+        else ratings_mu[start:stop]
+    )
     _graph = asciichartpy.plot(
-        [round(x.mu) for x in team.ratings[-num_games_last:]],
+        [round(x) for x in trend.tolist()],
         {"height": 12 if not CLI_CONFIG.debug else 20},
     )
     print(_graph)
@@ -546,8 +956,7 @@ def sub_func_standings_team_details(
         for game in games_remaining[:num_games_next]
     ) / len(games_remaining[:num_games_next])
     expected_score_next_n = sum(
-        game_odds(team, teams[game.opponent(team_name)])
-        for game in games_remaining[:num_games_next]
+        odds.odds_game(team.id, game) for game in games_remaining[:num_games_next]
     )
     print(f"Average opponent: {round(avg_opp_next_n)}", end="     ")
     print(
@@ -565,15 +974,15 @@ def sub_func_standings_team_details(
                 game.date,
                 teams[game.opponent(team_name)],
                 teams[game.opponent(team_name)].rating_str.split()[0],
-                "Home" if game.team_home == team_name else str(),
+                "Home" if game.id_home == team.id else str(),
                 "-".join(
                     str(x)
                     for x in mutual_record(
-                        team_name, teams[game.opponent(team_name)].name, games
+                        team_name, teams[game.opponent(team_name)].name, ledger
                     )
                 ),
-                game_odds(team, teams[game.opponent(team_name)]),
-                expected_outcome_str(game_odds(team, teams[game.opponent(team_name)])),
+                odds.odds_game(team.id, game),
+                expected_outcome_str(odds.odds_game(team.id, game)),
             )
             for game in games_remaining[:num_games_next]
         ],
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:03:22 2026
+
+@author: shane
+Per-game ledger of the ratings (and standings), filled in during the replay, so
+questions like "what was TOR's rating going into game 40", or "the standings as of
+Dec 31" are a lookup, not another replay.
+"""
+import bisect
+import math
+from datetime import date
+from typing import Sequence
+
+import numpy as np
+
+from nhlrank.models import TEAM_NAMES, Game, Outcome
+from nhlrank.rating import RATIO, RatingTuple
+
+
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
+class Ledger:
+    """
+    Columnar record of the completed games, one row per game (in the order rated).
+    Each row holds the (mu, phi) of both teams' overall and home/away ratings, from
+    before & after the game, the home team's pre-game odds, and both teams' running
+    standings totals (prefix sums, see TOTALS) after it.
+    Rows are indexed by game (its index in the CSV), by (team, game number), by pair
+    of teams (with running head-to-head totals), and by date (bisection, the rows
+    are in date order).
+    """
+
+    __slots__ = (
+        "_game_indexes",
+        "_dates",
+        "_ids",
+        "_pre",
+        "_post",
+        "_odds_home",
+        "_totals",
+        "_len",
+        "_rows_by_game",
+        "_rows_by_team",
+        "_rows_by_pair",
+        "_head_to_head",
+    )
+
+    # Ratings, in order: home & away team overall, home team's home, away team's away
+    HOME, AWAY, HOME_SPLIT, AWAY_SPLIT = range(4)
+    MU, PHI = range(2)
+
+    # Running standings totals, per team (as of each of its games)
+    RECORD = ("wins", "losses", "losses_ot")
+    TOTALS = (
+        *RECORD,
+        "goals_for",
+        "goals_against",
+        *(f"home_{x}" for x in RECORD),
+        *(f"away_{x}" for x in RECORD),
+        "shootout_wins",
+        "shootout_losses",
+        # Tiebreakers
+        "regulation_wins",
+        "regulation_overtime_wins",
+    )
+    # Head-to-head totals, per (team, opponent), the first of the TOTALS
+    HEAD_TO_HEAD = (*RECORD, "goals_for", "goals_against")
+
+    def __init__(self, capacity: int = 1400):
+        self._game_indexes = np.empty(capacity, dtype=np.int32)
+        self._dates = np.empty(capacity, dtype=np.int32)
+        self._ids = np.empty((capacity, 2), dtype=np.int8)
+        self._pre = np.empty((capacity, 4, 2), dtype=np.float64)
+        self._post = np.empty((capacity, 4, 2), dtype=np.float64)
+        self._odds_home = np.empty(capacity, dtype=np.float64)
+        self._totals = np.empty((capacity, 2, len(self.TOTALS)), dtype=np.int32)
+        self._len = 0
+
+        # Row of each game (by its index), or -1; and each team's rows, in order
+        self._rows_by_game = np.full(capacity, -1, dtype=np.int32)
+        self._rows_by_team: list[list[int]] = [[] for _ in TEAM_NAMES]
+        self._rows_by_pair: dict[tuple[int, int], list[int]] = {}
+        self._head_to_head = np.zeros(
+            (len(TEAM_NAMES), len(TEAM_NAMES), len(self.HEAD_TO_HEAD)), dtype=np.int32
+        )
+
+    def append(
+        self,
+        game: Game,
+        ratings_pre: Sequence[RatingTuple | np.ndarray],
+        ratings_post: Sequence[RatingTuple | np.ndarray],
+        odds_home: float,
+    ) -> None:
+        """
+        Adds a completed game, with its ratings (home, away, home split, away split)
+        from before & after it, and the home team's odds going in
+        """
+        if self._len == len(self._game_indexes):
+            # Amortized growth, like RatingHistory
+            size = 2 * self._len or 16
+            self._game_indexes = np.resize(self._game_indexes, size)
+            self._dates = np.resize(self._dates, size)
+            self._ids = np.resize(self._ids, (size, 2))
+            self._pre = np.resize(self._pre, (size, 4, 2))
+            self._post = np.resize(self._post, (size, 4, 2))
+            self._odds_home = np.resize(self._odds_home, size)
+            self._totals = np.resize(self._totals, (size, 2, len(self.TOTALS)))
+        if game.index >= len(self._rows_by_game):
+            self._rows_by_game = np.concatenate(
+                (
+                    self._rows_by_game,
+                    np.full(
+                        max(game.index + 1, 2 * len(self._rows_by_game))
+                        - len(self._rows_by_game),
+                        -1,
+                        dtype=np.int32,
+                    ),
+                )
+            )
+
+        i = self._len
+        self._game_indexes[i] = game.index
+        self._dates[i] = game.date.toordinal()
+        self._ids[i] = game.id_home, game.id_away
+        self._pre[i] = [x[:2] for x in ratings_pre]
+        self._post[i] = [x[:2] for x in ratings_post]
+        self._odds_home[i] = odds_home
+        for side, (team_id, opponent_id) in enumerate(
+            ((game.id_home, game.id_away), (game.id_away, game.id_home))
+        ):
+            rows = self._rows_by_team[team_id]
+            self._totals[i, side] = game_totals(game, side == 0)
+            self._head_to_head[team_id, opponent_id] += self._totals[
+                i, side, : len(self.HEAD_TO_HEAD)
+            ]
+            if rows:
+                self._totals[i, side] += self._totals[
+                    rows[-1], int(self._ids[rows[-1], 1] == team_id)
+                ]
+        self._len += 1
+
+        self._rows_by_game[game.index] = i
+        self._rows_by_team[game.id_home].append(i)
+        self._rows_by_team[game.id_away].append(i)
+        self._rows_by_pair.setdefault(pair_key(game.id_home, game.id_away), []).append(
+            i
+        )
+
+    def truncate(self, n_games: int) -> None:
+        """Drops the rows for games[n_games:], e.g. to resume from a checkpoint"""
+        n_rows = int(
+            np.searchsorted(self._game_indexes[: self._len], n_games, side="left")
+        )
+        self._rows_by_game[self._rows_by_game >= n_rows] = -1
+        for rows in self._rows_by_team:
+            while rows and rows[-1] >= n_rows:
+                rows.pop()
+        self._len = n_rows
+        self._index_head_to_head()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getstate__(self) -> tuple[np.ndarray, ...]:
+        # Don't pickle the unused capacity (the indexes are rebuilt from the ids)
+        return (
+            self.game_indexes,
+            self._dates[: self._len],
+            self.ids_home,
+            self.ids_away,
+            self.ratings_pre,
+            self.ratings_post,
+            self.odds_home,
+            self._totals[: self._len],
+        )
+
+    def __setstate__(self, state: tuple[np.ndarray, ...]) -> None:
+        (
+            game_indexes,
+            dates,
+            ids_home,
+            ids_away,
+            ratings_pre,
+            ratings_post,
+            odds_home,
+            totals,
+        ) = state
+        self._game_indexes = game_indexes.copy()
+        self._dates = dates.copy()
+        self._totals = totals.copy()
+        self._ids = np.column_stack((ids_home, ids_away)).astype(np.int8)
+        self._pre, self._post = ratings_pre.copy(), ratings_post.copy()
+        self._odds_home = odds_home.copy()
+        self._len = len(game_indexes)
+
+        self._rows_by_game = np.full(
+            int(game_indexes.max(initial=-1)) + 1, -1, dtype=np.int32
+        )
+        self._rows_by_game[game_indexes] = np.arange(self._len, dtype=np.int32)
+        self._rows_by_team = [[] for _ in TEAM_NAMES]
+        for i, (id_home, id_away) in enumerate(self._ids.tolist()):
+            self._rows_by_team[id_home].append(i)
+            self._rows_by_team[id_away].append(i)
+        self._index_head_to_head()
+
+    def _index_head_to_head(self) -> None:
+        """Rebuilds the head-to-head index, from the rows & running totals"""
+        self._rows_by_pair = {}
+        for i, (id_home, id_away) in enumerate(self._ids[: self._len].tolist()):
+            self._rows_by_pair.setdefault(pair_key(id_home, id_away), []).append(i)
+
+        n_totals = len(self.HEAD_TO_HEAD)
+        self._head_to_head = np.zeros(
+            (len(TEAM_NAMES), len(TEAM_NAMES), n_totals), dtype=np.int32
+        )
+        for team_id, rows in enumerate(self._rows_by_team):
+            if not rows:
+                continue
+            # Each game's totals, from the differences in the running totals
+            totals = np.diff(
+                self.team_totals_history(team_id)[:, :n_totals],
+                axis=0,
+                prepend=np.zeros((1, n_totals), dtype=np.int32),
+            )
+            ids_opponent = np.where(
+                self._ids[rows, 0] == team_id, self._ids[rows, 1], self._ids[rows, 0]
+            )
+            np.add.at(self._head_to_head[team_id], ids_opponent, totals)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Columns
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @property
+    def game_indexes(self) -> np.ndarray:
+        """Game index (in the CSV) of each row"""
+        return self._game_indexes[: self._len]
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Date of each row, as an ordinal (see date.toordinal())"""
+        return self._dates[: self._len]
+
+    @property
+    def ids_home(self) -> np.ndarray:
+        """Home team ID"""
+        return self._ids[: self._len, 0]
+
+    @property
+    def ids_away(self) -> np.ndarray:
+        """Away team ID"""
+        return self._ids[: self._len, 1]
+
+    @property
+    def ratings_pre(self) -> np.ndarray:
+        """(rows, 4, 2) pre-game (mu, phi), for HOME, AWAY, HOME_SPLIT, AWAY_SPLIT"""
+        return self._pre[: self._len]
+
+    @property
+    def ratings_post(self) -> np.ndarray:
+        """(rows, 4, 2) post-game (mu, phi), like ratings_pre"""
+        return self._post[: self._len]
+
+    @property
+    def odds_home(self) -> np.ndarray:
+        """Home team's pre-game odds of winning (same as game_odds(), unrounded)"""
+        return self._odds_home[: self._len]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Lookups
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def row_of_game(self, game_index: int) -> int | None:
+        """Row of a game (by its index in the CSV), None if it wasn't rated"""
+        if 0 <= game_index < len(self._rows_by_game):
+            row = int(self._rows_by_game[game_index])
+            return row if row >= 0 else None
+        return None
+
+    def row_of_team_game(self, team_id: int, game_number: int) -> int:
+        """Row of a team's N-th game (1 for its first), raises IndexError if unplayed"""
+        if game_number < 1:
+            raise IndexError(f"Game number must be at least 1, got: {game_number}")
+        return self._rows_by_team[team_id][game_number - 1]
+
+    def team_rows(self, team_id: int) -> np.ndarray:
+        """Rows of a team's games, in order"""
+        return np.array(self._rows_by_team[team_id], dtype=np.intp)
+
+    def team_ratings(
+        self,
+        team_id: int,
+        post: bool = True,
+        split: bool = False,
+        opponent: bool = False,
+    ) -> np.ndarray:
+        """
+        A team's (mu, phi) for each of its games, (games, 2), after the game (or
+        before it), and overall (or its home/away rating, whichever it played as).
+        With opponent, its opponent's instead.
+        """
+        rows = self.team_rows(team_id)
+        columns = np.where(
+            (self._ids[rows, 0] == team_id) != opponent, self.HOME, self.AWAY
+        )
+        if split:
+            columns += self.HOME_SPLIT
+        return (self._post if post else self._pre)[rows, columns]  # type: ignore
+
+    def team_odds(self, team_id: int) -> np.ndarray:
+        """A team's pre-game odds of winning, for each of its games"""
+        rows = self.team_rows(team_id)
+        return np.where(  # type: ignore
+            self._ids[rows, 0] == team_id,
+            self._odds_home[rows],
+            1 - self._odds_home[rows],
+        )
+
+    def team_totals_history(self, team_id: int) -> np.ndarray:
+        """A team's standings totals (see TOTALS) after each of its games"""
+        rows = self.team_rows(team_id)
+        return self._totals[  # type: ignore
+            rows, (self._ids[rows, 1] == team_id).astype(np.intp)
+        ]
+
+    @property
+    def head_to_head_totals(self) -> np.ndarray:
+        """
+        (teams, teams, len(HEAD_TO_HEAD)) head-to-head totals, [i, j] being team i's
+        (e.g. wins) against team j
+        """
+        return self._head_to_head
+
+    def head_to_head(self, team_id: int, opponent_id: int) -> dict[str, int]:
+        """A team's head-to-head totals (see HEAD_TO_HEAD) against an opponent, O(1)"""
+        return dict(
+            zip(self.HEAD_TO_HEAD, self._head_to_head[team_id, opponent_id].tolist())
+        )
+
+    def head_to_head_games(self, team_id: int, opponent_id: int) -> list[int]:
+        """Game indexes (in the CSV) of two teams' games against each other, in order"""
+        rows = self._rows_by_pair.get(pair_key(team_id, opponent_id), [])
+        return self._game_indexes[rows].tolist()  # type: ignore
+
+    def n_rows_as_of(self, date_at: date) -> int:
+        """Number of rows (games) played on or before a date"""
+        return int(
+            np.searchsorted(self._dates[: self._len], date_at.toordinal(), side="right")
+        )
+
+    def team_games_as_of(self, team_id: int, date_at: date) -> int:
+        """Number of games a team played on or before a date, O(log games)"""
+        return bisect.bisect_left(
+            self._rows_by_team[team_id], self.n_rows_as_of(date_at)
+        )
+
+    def team_totals(self, team_id: int, game_number: int) -> dict[str, int]:
+        """A team's standings totals (see TOTALS) after its N-th game (0 for none)"""
+        if game_number < 1:
+            return dict.fromkeys(self.TOTALS, 0)
+        row = self.row_of_team_game(team_id, game_number)
+        totals = self._totals[row, int(self._ids[row, 1] == team_id)].tolist()
+        return dict(zip(self.TOTALS, totals))
+
+    def predictions(self, home_ice: float = 0.0) -> np.ndarray:
+        """
+        Home team's pre-game odds for every row, with home_ice rating points added to
+        the home team (same as RatingEngine.expected_score())
+        """
+        if not home_ice:
+            return self.odds_home
+        pre = self.ratings_pre
+        impact = 1.0 / np.sqrt(
+            1 + (3 * (pre[:, self.AWAY, self.PHI] / RATIO) ** 2) / (math.pi**2)
+        )
+        return 1.0 / (  # type: ignore
+            1
+            + np.exp(
+                -impact
+                * (pre[:, self.HOME, self.MU] + home_ice - pre[:, self.AWAY, self.MU])
+                / RATIO
+            )
+        )
+
+
+def pair_key(team_id: int, opponent_id: int) -> tuple[int, int]:
+    """Key for an (unordered) pair of teams"""
+    return (team_id, opponent_id) if team_id < opponent_id else (opponent_id, team_id)
+
+
+def game_totals(game: Game, is_home: bool) -> list[int]:
+    """One game's contribution to a team's standings totals (see Ledger.TOTALS)"""
+    goals_for, goals_against = (
+        (game.score_home, game.score_away)
+        if is_home
+        else (game.score_away, game.score_home)
+    )
+    is_win = goals_for > goals_against
+    is_loss_ot = not is_win and game.is_overtime
+    is_loss = not is_win and not is_loss_ot
+    is_shootout = game.outcome_code is Outcome.SO
+    return [
+        is_win,
+        is_loss,
+        is_loss_ot,
+        goals_for,
+        goals_against,
+        is_home and is_win,
+        is_home and is_loss,
+        is_home and is_loss_ot,
+        not is_home and is_win,
+        not is_home and is_loss,
+        not is_home and is_loss_ot,
+        is_shootout and is_win,
+        is_shootout and not is_win,
+        is_win and game.outcome_code is Outcome.REGULATION,
+        is_win and not is_shootout,
+    ]
@@ -5,18 +5,75 @@ Created on Thu Dec 28 12:08:40 2023
 
 @author: shane
 """
+from collections import deque
 from datetime import date
+from enum import IntEnum
+from typing import Iterator, overload
 
+import numpy as np
 from tabulate import tabulate
 
 from nhlrank import DEVIATION_PROVISIONAL, constants
 from nhlrank.glicko2 import glicko2
 
+# Team IDs: small integers interned from the full names (alphabetical order)
+TEAM_NAMES: list[str] = sorted(constants.team_full_names_to_abbreviations)
+TEAM_IDS: dict[str, int] = {name: i for i, name in enumerate(TEAM_NAMES)}
+
+
+def team_id(name: str) -> int:
+    """Returns the integer ID for a team's full name"""
+    try:
+        return TEAM_IDS[name]
+    except KeyError as err:
+        raise ValueError(f"Unknown team: '{name}'") from err
+
+
+class Outcome(IntEnum):
+    """Game outcome, aka status in the CSV sheet"""
+
+    SCHEDULED = 0
+    REGULATION = 1
+    OT = 2
+    SO = 3
+
+    @classmethod
+    def from_status(cls, status: str) -> "Outcome":
+        """Parses the status column, e.g. Regulation, OT, SO, or Scheduled"""
+        _status = status.upper()
+        if _status == "OT":
+            return cls.OT
+        if _status == "SO":
+            return cls.SO
+        if _status == "SCHEDULED":
+            return cls.SCHEDULED
+        return cls.REGULATION
+
+
+# Labels as they appear in the CSV sheet
+OUTCOME_LABELS = {
+    Outcome.SCHEDULED: "Scheduled",
+    Outcome.REGULATION: "Regulation",
+    Outcome.OT: "OT",
+    Outcome.SO: "SO",
+}
+
 
 # pylint: disable=too-many-instance-attributes
 class Game:
     """Game class for storing game information"""
 
+    __slots__ = (
+        "index",
+        "date",
+        "time",
+        "id_away",
+        "id_home",
+        "score_away",
+        "score_home",
+        "outcome_code",
+    )
+
     OT_OUTCOMES = {"OT", "SO"}
     SO_OUTCOME = "SO"
     OUTCOME_NOT_PLAYED = "SCHEDULED"
@@ -30,44 +87,67 @@ class Game:
         score_away: int,
         score_home: int,
         outcome: str,
+        index: int = -1,
     ):
+        # Position in the season (row in the CSV sheet)
+        self.index = index
+
         # Date & time
         self.date = date_at
         self.time = time_at
 
-        # Teams
-        self.team_away = team_away
-        self.team_home = team_home
+        # Teams (interned to small integer IDs)
+        self.id_away = team_id(team_away)
+        self.id_home = team_id(team_home)
 
         # aka status in the CSV sheet (e.g. Regulation, OT, SO, or Scheduled)
-        self.outcome = outcome
-        self.is_completed = outcome.upper() != self.OUTCOME_NOT_PLAYED
+        self.outcome_code = Outcome.from_status(outcome)
 
         # Score (goals for, goals against)
         self.score_away = score_away
         self.score_home = score_home
 
-        # Only add stats if the game has been played
-        if self.is_completed:
-            # TODO: is this used anywhere?
-            # Score (score_away, score_home)
-            if score_home > score_away:
-                if outcome in self.OT_OUTCOMES:
-                    # self.score = (1 / 3, 2 / 3)
-                    self.score = (0.5, 1.0)
-                else:
-                    self.score = (0.0, 1.0)
-            elif score_away > score_home:
-                if outcome in self.OT_OUTCOMES:
-                    # self.score = (2 / 3, 1 / 3)
-                    self.score = (1.0, 0.5)
-                else:
-                    self.score = (1.0, 0.0)
-            else:
-                # NOTE: shouldn't happen, cannot have a tie score in hockey since 2005
-                # TODO: validate this elsewhere, raise error if this happens
-                print(self)
-                raise ValueError("Game cannot be a draw")
+        # Only validate the score if the game has been played
+        # NOTE: shouldn't happen, cannot have a tie score in hockey since 2005
+        # TODO: validate this elsewhere, raise error if this happens
+        if self.is_completed and score_home == score_away:
+            print(self)
+            raise ValueError("Game cannot be a draw")
+
+    @property
+    def team_away(self) -> str:
+        """Away team (full name)"""
+        return TEAM_NAMES[self.id_away]
+
+    @property
+    def team_home(self) -> str:
+        """Home team (full name)"""
+        return TEAM_NAMES[self.id_home]
+
+    @property
+    def outcome(self) -> str:
+        """Outcome, as it appears in the CSV sheet (e.g. Regulation, OT, SO)"""
+        return OUTCOME_LABELS[self.outcome_code]
+
+    @property
+    def is_completed(self) -> bool:
+        """Has the game been played"""
+        return self.outcome_code is not Outcome.SCHEDULED
+
+    @property
+    def is_overtime(self) -> bool:
+        """Was the game decided in overtime (or a shootout)"""
+        return self.outcome_code >= Outcome.OT
+
+    @property
+    def score(self) -> tuple[float, float]:
+        """Score (score_away, score_home), e.g. (1.0, 0.5) for an away OT win"""
+        # TODO: is this used anywhere?
+        if self.score_home > self.score_away:
+            # self.score = (1 / 3, 2 / 3)
+            return (0.5, 1.0) if self.is_overtime else (0.0, 1.0)
+        # self.score = (2 / 3, 1 / 3)
+        return (1.0, 0.5) if self.is_overtime else (1.0, 0.0)
 
     def __str__(self) -> str:
         if self.is_completed:
@@ -77,19 +157,216 @@ class Game:
             )
         return f"{self.date} {self.time} (ET) {self.team_away} @ {self.team_home}"
 
+    def has_team(self, _team_id: int) -> bool:
+        """Is the team (by ID) playing in this game"""
+        return _team_id in (self.id_away, self.id_home)
+
     def opponent(self, team: str) -> str:
         """Opponent in the game (given a team)"""
-        if team == self.team_home:
-            return self.team_away
-        if team == self.team_away:
-            return self.team_home
-        raise ValueError(f"Team {team} is not in this game")
+        return TEAM_NAMES[self.opponent_id(team_id(team))]
+
+    def opponent_id(self, _team_id: int) -> int:
+        """Opponent in the game (given a team ID)"""
+        if _team_id == self.id_home:
+            return self.id_away
+        if _team_id == self.id_away:
+            return self.id_home
+        raise ValueError(f"Team {TEAM_NAMES[_team_id]} is not in this game")
+
+
+class RatingHistory:
+    """
+    Growing history of Glicko 2 ratings, stored as one contiguous (n, 3) float array
+    of (mu, phi, sigma), with a parallel array of the game index for each entry.
+    Indexing returns glicko2.Rating objects; aggregates should use the arrays, or
+    the running sum & non-provisional count/sum/max, kept up to date on append.
+    """
+
+    __slots__ = (
+        "_ratings",
+        "_game_indexes",
+        "_len",
+        "_mu_sum",
+        "_n_non_provisional",
+        "_mu_sum_non_provisional",
+        "_mu_max_non_provisional",
+    )
+
+    MU, PHI, SIGMA = range(3)
+
+    def __init__(self, initial: glicko2.Rating | None = None, capacity: int = 16):
+        self._ratings = np.empty((capacity, 3), dtype=np.float64)
+        self._game_indexes = np.empty(capacity, dtype=np.int32)
+        self._len = 0
+        self._mu_sum = 0.0
+        self._n_non_provisional = 0
+        self._mu_sum_non_provisional = 0.0
+        self._mu_max_non_provisional = float("-inf")
+
+        if initial is not None:
+            self.append(initial)
+
+    def append(self, rating: glicko2.Rating, game_index: int = -1) -> None:
+        """Adds a rating (after a given game, or -1 for the initial rating)"""
+        self.append_values((rating.mu, rating.phi, rating.sigma), game_index)
+
+    def append_values(
+        self, rating: tuple[float, float, float] | np.ndarray, game_index: int = -1
+    ) -> None:
+        """Adds a rating, given as (mu, phi, sigma)"""
+        if self._len == len(self._ratings):
+            # Amortized growth, views handed out earlier still see the old buffer
+            self._ratings = np.resize(self._ratings, (2 * self._len or 16, 3))
+            self._game_indexes = np.resize(self._game_indexes, 2 * self._len or 16)
+
+        self._ratings[self._len] = rating
+        self._game_indexes[self._len] = game_index
+        self._len += 1
+
+        mu, phi = float(rating[self.MU]), float(rating[self.PHI])
+        self._mu_sum += mu
+        if phi < DEVIATION_PROVISIONAL:
+            self._n_non_provisional += 1
+            self._mu_sum_non_provisional += mu
+            self._mu_max_non_provisional = max(self._mu_max_non_provisional, mu)
+
+    def _aggregate(self) -> None:
+        """Recomputes the running aggregates, from the arrays"""
+        mu = self.mu_non_provisional()
+        self._mu_sum = float(self.mu.sum())
+        self._n_non_provisional = len(mu)
+        self._mu_sum_non_provisional = float(mu.sum())
+        self._mu_max_non_provisional = float(mu.max()) if len(mu) else float("-inf")
+
+    def last(self) -> tuple[float, float, float]:
+        """Latest rating as (mu, phi, sigma), without building a Rating object"""
+        mu, phi, sigma = self._ratings[self._len - 1].tolist()
+        return mu, phi, sigma
+
+    def __len__(self) -> int:
+        return self._len
+
+    @overload
+    def __getitem__(self, key: int) -> glicko2.Rating:
+        ...
+
+    @overload
+    def __getitem__(self, key: slice) -> list[glicko2.Rating]:
+        ...
+
+    def __getitem__(self, key: int | slice) -> glicko2.Rating | list[glicko2.Rating]:
+        if isinstance(key, slice):
+            return [
+                glicko2.Rating(mu=mu, phi=phi, sigma=sigma)
+                for mu, phi, sigma in self._ratings[: self._len][key].tolist()
+            ]
+        mu, phi, sigma = self._ratings[: self._len][key].tolist()
+        return glicko2.Rating(mu=mu, phi=phi, sigma=sigma)
+
+    def __iter__(self) -> Iterator[glicko2.Rating]:
+        return iter(self[:])
+
+    def __getstate__(self) -> tuple[np.ndarray, np.ndarray]:
+        # Don't pickle the unused capacity
+        return self.ratings_array, self.game_indexes
+
+    def __setstate__(self, state: tuple[np.ndarray, np.ndarray]) -> None:
+        self._ratings, self._game_indexes = (x.copy() for x in state)
+        self._len = len(self._ratings)
+        self._aggregate()
+
+    @property
+    def ratings_array(self) -> np.ndarray:
+        """(n, 3) array of (mu, phi, sigma)"""
+        return self._ratings[: self._len]
+
+    @property
+    def mu(self) -> np.ndarray:
+        """Ratings (mu)"""
+        return self._ratings[: self._len, self.MU]
+
+    @property
+    def phi(self) -> np.ndarray:
+        """Rating deviations (phi)"""
+        return self._ratings[: self._len, self.PHI]
+
+    @property
+    def game_indexes(self) -> np.ndarray:
+        """Game index for each rating (-1 for the initial rating)"""
+        return self._game_indexes[: self._len]
+
+    def until(self, game_index: int) -> "RatingHistory":
+        """Copy of the history, up to (and including) the rating after a given game"""
+        history = RatingHistory(capacity=0)
+        n = int(np.searchsorted(self.game_indexes, game_index, side="right"))
+        history.__setstate__((self._ratings[:n], self._game_indexes[:n]))
+        return history
 
+    def mu_non_provisional(self) -> np.ndarray:
+        """Ratings (mu) with a deviation below the provisional threshold"""
+        return self.mu[self.phi < DEVIATION_PROVISIONAL]
 
+    @property
+    def mu_sum(self) -> float:
+        """Sum of the ratings (mu), O(1)"""
+        return self._mu_sum
+
+    @property
+    def mu_mean(self) -> float:
+        """Average rating (mu), or 0 if empty, O(1)"""
+        return self._mu_sum / self._len if self._len else 0.0
+
+    @property
+    def n_non_provisional(self) -> int:
+        """Number of non-provisional ratings, O(1)"""
+        return self._n_non_provisional
+
+    @property
+    def mu_mean_non_provisional(self) -> float:
+        """Average non-provisional rating (mu), or 0 if none, O(1)"""
+        if self._n_non_provisional:
+            return self._mu_sum_non_provisional / self._n_non_provisional
+        return 0.0
+
+    @property
+    def mu_max_non_provisional(self) -> float:
+        """Highest non-provisional rating (mu), or 0 if none, O(1)"""
+        return self._mu_max_non_provisional if self._n_non_provisional else 0.0
+
+
+# pylint: disable=too-many-instance-attributes
 class Team:
     """Team class for storing team information and ratings"""
 
-    def __init__(self, name: str):
+    __slots__ = (
+        "id",
+        "name",
+        "abbrev",
+        "games_played",
+        "wins",
+        "losses",
+        "losses_ot",
+        "regulation_wins",
+        "regulation_overtime_wins",
+        "goals_for",
+        "goals_against",
+        "record_away",
+        "record_home",
+        "shootout",
+        "last_n_str_list",
+        "game_outcomes",
+        "outcomes_last_10",
+        "streak_length",
+        "ratings",
+        "ratings_home",
+        "ratings_away",
+        "opponent_ratings",
+        "opponent_ratings_by_outcome",
+        "simulated_record",
+    )
+
+    def __init__(self, name: str, rating_initial: glicko2.Rating | None = None):
+        self.id = team_id(name)
         self.name = name
         self.abbrev = constants.team_full_names_to_abbreviations[name]
 
@@ -98,6 +375,10 @@ class Team:
         self.losses = 0
         self.losses_ot = 0
 
+        # Tiebreakers: wins in regulation (RW), and in regulation or overtime (ROW)
+        self.regulation_wins = 0
+        self.regulation_overtime_wins = 0
+
         self.goals_for = 0
         self.goals_against = 0
 
@@ -108,16 +389,21 @@ class Team:
         self.last_n_str_list: list[str] = []
         self.game_outcomes: list[str] = []  # longer list than just last 10
 
+        # Kept up to date on each game, for the last 10 & the streak in O(1)
+        self.outcomes_last_10: deque[str] = deque(maxlen=10)
+        self.streak_length = 0
+
         # Glicko 2 ratings
-        self.ratings = [glicko2.Rating()]
-        self.ratings_home = [glicko2.Rating()]
-        self.ratings_away = [glicko2.Rating()]
-
-        self.opponent_ratings: list[glicko2.Rating] = []
-        self.opponent_ratings_by_outcome: dict[str, list[glicko2.Rating]] = {
-            "W": [],
-            "L": [],
-            "OTL": [],
+        rating_initial = rating_initial or glicko2.Rating()
+        self.ratings = RatingHistory(rating_initial)
+        self.ratings_home = RatingHistory(rating_initial)
+        self.ratings_away = RatingHistory(rating_initial)
+
+        self.opponent_ratings = RatingHistory()
+        self.opponent_ratings_by_outcome: dict[str, RatingHistory] = {
+            "W": RatingHistory(),
+            "L": RatingHistory(),
+            "OTL": RatingHistory(),
         }
 
         # Simulated record
@@ -139,9 +425,9 @@ class Team:
     def last_10(self) -> tuple[int, int, int]:
         """Last 10 game outcomes"""
         return (
-            self.last_n_str_list[-10:].count("W"),
-            self.last_n_str_list[-10:].count("L"),
-            self.last_n_str_list[-10:].count("OTL"),
+            self.outcomes_last_10.count("W"),
+            self.outcomes_last_10.count("L"),
+            self.outcomes_last_10.count("OTL"),
         )
 
     def last_n(self, num: int) -> tuple[int, int, int]:
@@ -160,17 +446,23 @@ class Team:
     def streak(self) -> str:
         """Streak, e.g. W2, L1, OTL3"""
         if self.games_played > 0:
-            _result = self.last_n_str_list[-1]
-            _counts = 0
-            while (
-                _counts < len(self.last_n_str_list)
-                and self.last_n_str_list[-1 - _counts] == _result
-            ):
-                _counts += 1
-            return f"{_result}{_counts}"
+            return f"{self.last_n_str_list[-1]}{self.streak_length}"
 
         return str()
 
+    def set_outcomes(self, outcomes: list[str]) -> None:
+        """Sets the game outcomes (e.g. up to a past date), with the last 10 & streak"""
+        self.last_n_str_list = list(outcomes)
+        self.game_outcomes = list(outcomes)
+        self.outcomes_last_10 = deque(outcomes[-10:], maxlen=10)
+
+        self.streak_length = 0
+        while (
+            self.streak_length < len(outcomes)
+            and outcomes[-1 - self.streak_length] == outcomes[-1]
+        ):
+            self.streak_length += 1
+
     @property
     def rating(self) -> glicko2.Rating:
         """Rating"""
@@ -179,25 +471,24 @@ class Team:
     @property
     def ratings_non_provisional(self) -> list[float]:
         """Ratings (non-provisional)"""
-        return [x.mu for x in self.ratings if x.phi < DEVIATION_PROVISIONAL] or [0.0]
+        return self.ratings.mu_non_provisional().tolist() or [0.0]
 
     @property
     def rating_max(self) -> float:
         """Max rating (for provisional players)"""
-        return round(max(x for x in self.ratings_non_provisional))
+        if self.ratings.n_non_provisional:
+            return round(self.ratings.mu_max_non_provisional)
+        return 0
 
     # TODO: include best win, best overtime loss, worst defeat
 
     @property
     def rating_avg(self) -> float:
         """Average rating"""
-        # TODO: option to filter by range of games/dates, or last N games
-        if len(self.ratings_non_provisional) == 0:
-            return 0.0
-        return round(
-            sum(x for x in self.ratings_non_provisional)
-            / len(self.ratings_non_provisional)
-        )
+        # NOTE: over a range of games (or dates), see WindowIndex.rating_avg()
+        if self.ratings.n_non_provisional:
+            return round(self.ratings.mu_mean_non_provisional)
+        return 0
 
     @property
     def rating_str(self) -> str:
@@ -229,26 +520,21 @@ class Team:
     def avg_opp(self) -> float:
         """Average opponent rating"""
         if self.games_played > 0:
-            return round(sum(x.mu for x in self.opponent_ratings) / self.games_played)
+            return round(self.opponent_ratings.mu_sum / self.games_played)
         return 0.0
 
     @property
     def best_win(self) -> float:
         """Best win"""
-        non_provisional_wins = [
-            x.mu
-            for x in self.opponent_ratings_by_outcome["W"]
-            if x.phi < DEVIATION_PROVISIONAL
-        ] or [0.0]
-        return round(max(x for x in non_provisional_wins))
+        opponent_ratings_wins = self.opponent_ratings_by_outcome["W"]
+        if opponent_ratings_wins.n_non_provisional:
+            return round(opponent_ratings_wins.mu_max_non_provisional)
+        return 0
 
     def avg_opp_by_outcome(self, outcome: str) -> float:
         """Average opponent rating by outcome"""
         if len(self.opponent_ratings_by_outcome[outcome]) > 0:
-            return round(
-                sum(x.mu for x in self.opponent_ratings_by_outcome[outcome])
-                / len(self.opponent_ratings_by_outcome[outcome])
-            )
+            return round(self.opponent_ratings_by_outcome[outcome].mu_mean)
         return 0.0
 
     def add_game(self, game: Game) -> None:
@@ -256,7 +542,7 @@ class Team:
 
         self.games_played += 1
 
-        is_at_home = game.team_home == self.name
+        is_at_home = game.id_home == self.id
 
         # Outcome (W, L, or OTL)
         # TODO: support counting of overtime wins (OTWs)
@@ -264,7 +550,7 @@ class Team:
             if game.score_home > game.score_away:
                 outcome = "W"
             else:
-                if game.outcome in Game.OT_OUTCOMES:
+                if game.is_overtime:
                     outcome = "OTL"
                 else:
                     outcome = "L"
@@ -272,7 +558,7 @@ class Team:
             if game.score_home < game.score_away:
                 outcome = "W"
             else:
-                if game.outcome in Game.OT_OUTCOMES:
+                if game.is_overtime:
                     outcome = "OTL"
                 else:
                     outcome = "L"
@@ -285,7 +571,7 @@ class Team:
                 self.wins += 1
                 self.record_home[0] += 1
             else:
-                if game.outcome in Game.OT_OUTCOMES:
+                if game.is_overtime:
                     self.losses_ot += 1
                     self.record_away[2] += 1
                 else:
@@ -293,7 +579,7 @@ class Team:
                     self.record_away[1] += 1
         else:
             if is_at_home:
-                if game.outcome in Game.OT_OUTCOMES:
+                if game.is_overtime:
                     self.losses_ot += 1
                     self.record_home[2] += 1
                 else:
@@ -303,15 +589,25 @@ class Team:
                 self.wins += 1
                 self.record_away[0] += 1
 
+        # Regulation wins (RW), and regulation & overtime wins (ROW)
+        if outcome == "W":
+            self.regulation_wins += game.outcome_code is Outcome.REGULATION
+            self.regulation_overtime_wins += game.outcome_code is not Outcome.SO
+
         # Shoutout [W, L]
-        if game.outcome == Game.SO_OUTCOME:
+        if game.outcome_code is Outcome.SO:
             if outcome == "W":
                 self.shootout[0] += 1
             else:
                 self.shootout[1] += 1
 
-        # Last n (e.g. last 10, last 25)
+        # Last n (e.g. last 10, last 25), and the streak
+        if self.last_n_str_list and self.last_n_str_list[-1] == outcome:
+            self.streak_length += 1
+        else:
+            self.streak_length = 1
         self.last_n_str_list.append(outcome)
+        self.outcomes_last_10.append(outcome)
 
         # Running tally of record
         self.game_outcomes.append(outcome)
@@ -7,7 +7,8 @@ Created on Fri Dec 29 18:45:25 2023
 """
 from nhlrank import CLI_CONFIG, constants
 from nhlrank.glicko2 import glicko2
-from nhlrank.models import Game, Team
+from nhlrank.ledger import Ledger
+from nhlrank.models import TEAM_IDS, Team
 
 
 def get_team_name(team_str: str) -> str:
@@ -19,9 +20,16 @@ def get_team_name(team_str: str) -> str:
     )
 
 
+# Only used for its scaling (no state is updated), so one engine is enough
+RATING_ENGINE = glicko2.Glicko2()
+
+
 def game_odds(team: Team, opponent: Team) -> float:
-    """Odds of winning against another team"""
-    rating_engine = glicko2.Glicko2()
+    """
+    Odds of winning against another team.
+    NOTE: for many lookups, use odds.get_odds_matrix() instead (computed once)
+    """
+    rating_engine = RATING_ENGINE
 
     return round(
         rating_engine.expect_score(
@@ -47,60 +55,39 @@ def expected_outcome_str(odds: float) -> str:
     return str()
 
 
-def mutual_record(team: str, opponent: str, games: list[Game]) -> tuple[int, int, int]:
+def mutual_record(team: str, opponent: str, ledger: Ledger) -> tuple[int, int, int]:
     """
     Returns the mutual record between two teams, for wins, losses, and overtime losses
+    (looked up in the ledger's head-to-head index)
     """
-    wins = 0
-    losses = 0
-    ot_losses = 0
-    if CLI_CONFIG.debug:
-        print(f"Calculating mutual record between {team} and {opponent}")
-        print(team)
-        print(opponent)
-
-    for game in games:
-        # Don't try to compare games that haven't been played yet
-        if not game.is_completed:
-            continue
-
-        if game.team_home == team and game.team_away == opponent:
-            if CLI_CONFIG.debug:
-                print(game)
-            if game.score_home > game.score_away:
-                wins += 1
-            elif game.score_home < game.score_away:
-                if game.outcome in Game.OT_OUTCOMES:
-                    ot_losses += 1
-                else:
-                    losses += 1
-        elif game.team_home == opponent and game.team_away == team:
-            if CLI_CONFIG.debug:
-                print(game)
-            if game.score_home > game.score_away:
-                if game.outcome in Game.OT_OUTCOMES:
-                    ot_losses += 1
-                else:
-                    losses += 1
-            else:
-                wins += 1
+    team_id = TEAM_IDS[team]
+    opponent_id = TEAM_IDS[opponent]
 
     if CLI_CONFIG.debug:
+        print(f"Calculating mutual record between {team} and {opponent}")
+        print(f"Games: {ledger.head_to_head_games(team_id, opponent_id)}")
         print()
-    return wins, losses, ot_losses
+
+    record = ledger.head_to_head(team_id, opponent_id)
+    return record["wins"], record["losses"], record["losses_ot"]
 
 
 def playoff_contenders(teams: list[Team]) -> dict[str, dict[str, list[Team]]]:
-    """Returns a list of teams that are in playoff contention"""
-    return {
-        "Eastern": {
-            "Atlantic": teams[0:3],
-            "Metro": teams[4:7],
-            "Wildcard": teams[8:15],
-        },
-        "Western": {
-            "Central": teams[16:19],
-            "Pacific": teams[20:23],
-            "Wildcard": teams[24:31],
-        },
-    }
+    """
+    Returns the teams in playoff contention, per conference: the top 3 teams in each
+    division, then the rest of the conference (the first 2 are the wildcards).
+    Expects the teams sorted by standings.
+    """
+    contenders: dict[str, dict[str, list[Team]]] = {}
+    for conf, divs in constants.conference_and_division_organization.items():
+        contenders[conf] = {
+            div: [team for team in teams if team.abbrev in team_abbrevs_div][:3]
+            for div, team_abbrevs_div in divs.items()
+        }
+        qualifiers = [team for _teams in contenders[conf].values() for team in _teams]
+        contenders[conf]["Wildcard"] = [
+            team
+            for team in teams
+            if any(team.abbrev in x for x in divs.values()) and team not in qualifiers
+        ]
+    return contenders
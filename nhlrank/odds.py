@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:02:51 2026
+
+@author: shane
+Pairwise win probabilities (expected scores) for every team against every other team,
+computed once per set of ratings and shared by all the odds consumers.
+"""
+import math
+
+import numpy as np
+
+from nhlrank.glicko2 import glicko2
+from nhlrank.models import TEAM_NAMES, Game, Team
+from nhlrank.models.helpers import RATING_ENGINE
+from nhlrank.rating import RATIO
+
+
+def expected_score_matrix(
+    ratings: list[glicko2.Rating],
+    ratings_opponent: list[glicko2.Rating] | None = None,
+    home_ice: float = 0.0,
+) -> np.ndarray:
+    """
+    Returns the N×N matrix E, where E[i, j] is the expected score of ratings[i]
+    against ratings_opponent[j] (same as Glicko2.expect_score(), but vectorized),
+    optionally with home_ice rating points added to ratings[i] (negative: taken off
+    it, i.e. added to the opponent), same as RatingEngine.expected_score()
+    """
+    if ratings_opponent is None:
+        ratings_opponent = ratings
+
+    scaled = [RATING_ENGINE.scale_down(x) for x in ratings]
+    scaled_opponent = [RATING_ENGINE.scale_down(x) for x in ratings_opponent]
+
+    mu = np.array([x.mu for x in scaled])
+    mu_opponent = np.array([x.mu for x in scaled_opponent])
+    impact_opponent = np.array(
+        [RATING_ENGINE.reduce_impact(x) for x in scaled_opponent]
+    )
+
+    return 1.0 / (  # type: ignore
+        1
+        + np.exp(
+            -impact_opponent[None, :]
+            * (mu[:, None] + home_ice / RATIO - mu_opponent[None, :])
+        )
+    )
+
+
+def series_odds_matrix(odds_home: np.ndarray, n_games: int = 7) -> np.ndarray:
+    """
+    Closed form odds of winning a best-of-N series (2-2-1-1-1 for N = 7), for all
+    pairs: S[i, j] is team i's chance against team j, with i holding home ice.
+    Given odds_home[i, j] (team i at home against team j on the road).
+
+    Playing out all N games never changes who wins the series (first to a majority),
+    so it's the chance of winning a majority of the (N + 1) // 2 home games plus
+    N // 2 road games, each a sum of binomial terms.
+    """
+    n_home, n_road = (n_games + 1) // 2, n_games // 2
+    odds_at_home = odds_home
+    odds_on_road = 1 - odds_home.T
+
+    def binomial(odds: np.ndarray, n: int) -> list[np.ndarray]:
+        """Chance of exactly k wins in n games, for k = 0..n"""
+        return [
+            math.comb(n, k) * odds**k * (1 - odds) ** (n - k) for k in range(n + 1)
+        ]
+
+    wins_at_home = binomial(odds_at_home, n_home)
+    wins_on_road = binomial(odds_on_road, n_road)
+    return sum(  # type: ignore
+        wins_at_home[k] * wins_on_road[j]
+        for k in range(n_home + 1)
+        for j in range(n_road + 1)
+        if k + j > n_games // 2
+    )
+
+
+class OddsMatrix:
+    """
+    Expected scores for all pairs of teams, indexed by team ID.
+      overall[i, j]: team i against team j (overall ratings)
+      at_home[i, j]: team i at home against team j, with home_ice rating points added
+                     to team i (overall ratings)
+      on_road[i, j]: team i on the road against team j, with home_ice added to team j
+      home[i, j]:    team i at home against team j on the road (home/away ratings)
+      series[i, j]:  team i winning a best-of-7 series against team j, with home ice
+    Without home_ice, at_home & on_road are just the overall odds.
+    """
+
+    __slots__ = ("overall", "at_home", "on_road", "home", "series", "home_ice", "_key")
+
+    def __init__(self, teams: dict[str, Team], home_ice: float = 0.0):
+        # Teams missing from the dict (shouldn't happen) keep the default rating
+        ratings = [glicko2.Rating()] * len(TEAM_NAMES)
+        ratings_home = list(ratings)
+        ratings_away = list(ratings)
+        for team in teams.values():
+            ratings[team.id] = team.rating
+            ratings_home[team.id] = team.rating_home
+            ratings_away[team.id] = team.rating_away
+
+        self.overall = expected_score_matrix(ratings)
+        self.home_ice = home_ice
+        self.at_home, self.on_road = (
+            (
+                expected_score_matrix(ratings, home_ice=home_ice),
+                expected_score_matrix(ratings, home_ice=-home_ice),
+            )
+            if home_ice
+            else (self.overall, self.overall)
+        )
+        self.home = expected_score_matrix(ratings_home, ratings_away)
+        self.series = series_odds_matrix(self.home)
+
+        self._key = self.ratings_key(teams)
+
+    @staticmethod
+    def ratings_key(teams: dict[str, Team]) -> tuple[tuple[Team, int, int, int], ...]:
+        """Changes whenever any team is rated (histories only ever grow)"""
+        return tuple(
+            (team, len(team.ratings), len(team.ratings_home), len(team.ratings_away))
+            for team in teams.values()
+        )
+
+    def is_current(self, teams: dict[str, Team]) -> bool:
+        """Are these still the odds for the teams' latest ratings"""
+        key = self.ratings_key(teams)
+        return len(key) == len(self._key) and all(
+            x[0] is y[0] and x[1:] == y[1:] for x, y in zip(key, self._key)
+        )
+
+    def odds(self, team_id: int, opponent_id: int) -> float:
+        """Odds of winning against another team (same as helpers.game_odds)"""
+        return round(float(self.overall[team_id, opponent_id]), 2)
+
+    def odds_game(self, team_id: int, game: Game) -> float:
+        """Odds of winning a game, at home or on the road (with home ice, if any)"""
+        odds = self.at_home if game.id_home == team_id else self.on_road
+        return round(float(odds[team_id, game.opponent_id(team_id)]), 2)
+
+    def odds_home(self, team_id_home: int, team_id_away: int) -> float:
+        """Odds of the home team winning, based on the home/away ratings"""
+        return round(float(self.home[team_id_home, team_id_away]), 2)
+
+
+# Most recent matrix, rebuilt only after the ratings change
+_ODDS_MATRIX: list[OddsMatrix] = []
+
+
+def get_odds_matrix(teams: dict[str, Team], home_ice: float = 0.0) -> OddsMatrix:
+    """Returns the (cached) odds matrix for the teams' current ratings & home ice"""
+    if (
+        not _ODDS_MATRIX
+        or _ODDS_MATRIX[0].home_ice != home_ice
+        or not _ODDS_MATRIX[0].is_current(teams)
+    ):
+        _ODDS_MATRIX[:] = [OddsMatrix(teams, home_ice)]
+    return _ODDS_MATRIX[0]
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:41:09 2026
+
+@author: shane
+Replays the games through the ratings (one by one, or by rating period), building
+the teams' stats & rating histories along the way.
+"""
+import numpy as np
+
+from nhlrank import CLI_CONFIG, snapshot
+from nhlrank.ledger import Ledger
+from nhlrank.models import TEAM_NAMES, Game, Team
+from nhlrank.rating import RatingEngine, get_rating_engine, rating_period_key
+from nhlrank.utils import get_or_create_team_by_name
+
+
+def replay_games(
+    games: list[Game],
+    teams: dict[str, Team],
+    start: int = 0,
+    checkpoints: list[tuple[int, bytes]] | None = None,
+    engine: RatingEngine | None = None,
+    ledger: Ledger | None = None,
+) -> None:
+    """
+    Replays games[start:] through the ratings, on top of teams (as of games[:start]).
+    Optionally appends checkpoints: every CHECKPOINT_INTERVAL completed games, and
+    after the last completed game (where tomorrow's incremental run will resume).
+    Optionally records each completed game's ratings in the ledger.
+    """
+
+    engine = engine or get_rating_engine()
+    idx_last_completed = max(
+        (i for i, game in enumerate(games) if game.is_completed), default=-1
+    )
+    n_completed = sum(1 for game in games[:start] if game.is_completed)
+
+    # Build teams
+    for i, game in enumerate(games[start:], start=start):
+        # Create team if it doesn't exist
+        # NOTE: 117
+        if game.team_home not in teams:
+            teams[game.team_home] = Team(game.team_home, engine.create_rating())
+        if game.team_away not in teams:
+            teams[game.team_away] = Team(game.team_away, engine.create_rating())
+
+        # Update players stats and ratings
+        update_team_ratings(teams, game, engine, ledger)
+
+        if checkpoints is not None and game.is_completed:
+            n_completed += 1
+            if (
+                n_completed % snapshot.CHECKPOINT_INTERVAL == 0
+                or i == idx_last_completed
+            ):
+                checkpoints.append(snapshot.make_checkpoint(i + 1, teams))
+
+    # Check n_teams is 32
+    if len(teams) != 32:
+        for team in sorted(teams.keys()):
+            print(team)
+        raise ValueError(f"Do we still expect 32 teams?  We got: {len(teams)}.")
+
+
+def replay_periods(
+    games: list[Game],
+    teams: dict[str, Team],
+    rating_period: str,
+    start: int = 0,
+    checkpoints: list[tuple[int, bytes]] | None = None,
+    engine: RatingEngine | None = None,
+    ledger: Ledger | None = None,
+) -> None:
+    """
+    Like replay_games(), but rates once per rating period (a day, or a week): all of
+    a period's games are rated together, against the ratings from before it, see
+    rating.rate_period(). Each team's histories get one entry per period played,
+    tagged with its last game of the period.
+    Checkpoints are only made between periods, so a resume never splits one.
+    """
+
+    engine = engine or get_rating_engine()
+    idx_last_completed = max(
+        (i for i, game in enumerate(games) if game.is_completed), default=-1
+    )
+    n_completed = sum(1 for game in games[:start] if game.is_completed)
+
+    # Consecutive games in the same period (the CSV is in date order)
+    i = start
+    while i < len(games):
+        key = rating_period_key(rating_period, games[i].date)
+        end = i + 1
+        while end < len(games) and (
+            rating_period_key(rating_period, games[end].date) == key
+        ):
+            end += 1
+        period_games = games[i:end]
+
+        for game in period_games:
+            for name in (game.team_home, game.team_away):
+                if name not in teams:
+                    teams[name] = Team(name, engine.create_rating())
+        rate_period_games(
+            teams,
+            [game for game in period_games if game.is_completed],
+            engine,
+            ledger,
+        )
+
+        n_completed_period = sum(1 for game in period_games if game.is_completed)
+        if checkpoints is not None and n_completed_period:
+            n_completed += n_completed_period
+            if (
+                n_completed // snapshot.CHECKPOINT_INTERVAL
+                > (n_completed - n_completed_period) // snapshot.CHECKPOINT_INTERVAL
+                or i <= idx_last_completed < end
+            ):
+                checkpoints.append(snapshot.make_checkpoint(end, teams))
+        i = end
+
+    # Check n_teams is 32
+    if len(teams) != 32:
+        for team in sorted(teams.keys()):
+            print(team)
+        raise ValueError(f"Do we still expect 32 teams?  We got: {len(teams)}.")
+
+
+def rate_period_games(
+    teams: dict[str, Team],
+    games: list[Game],
+    engine: RatingEngine,
+    ledger: Ledger | None = None,
+) -> None:
+    """
+    Updates the teams' stats & ratings, for one rating period's completed games.
+    In the ledger, every game of the period gets the ratings from before & after it.
+    """
+    if not games:
+        return
+    teams_by_id = {team.id: team for team in teams.values()}
+
+    def ratings_array(attr: str) -> np.ndarray:
+        """Current ratings (by team ID), as an array of (mu, phi, sigma)"""
+        rating = engine.create_rating()
+        _ratings = np.tile((rating.mu, rating.phi, rating.sigma), (len(TEAM_NAMES), 1))
+        for team in teams.values():
+            _ratings[team.id] = getattr(team, attr).last()
+        return _ratings
+
+    ratings, ratings_home, ratings_away = (
+        ratings_array("ratings"),
+        ratings_array("ratings_home"),
+        ratings_array("ratings_away"),
+    )
+
+    # One (team, opponent, score) result per team per game, in game order
+    ids_home = np.array([game.id_home for game in games], dtype=np.intp)
+    ids_away = np.array([game.id_away for game in games], dtype=np.intp)
+    scores_home, scores_away = np.empty(len(games)), np.empty(len(games))
+    for j, game in enumerate(games):
+        score_winner, score_loser = (
+            engine.scores_overtime if game.is_overtime else engine.scores_regulation
+        )
+        if game.score_home > game.score_away:
+            scores_home[j], scores_away[j] = score_winner, score_loser
+        else:
+            scores_home[j], scores_away[j] = score_loser, score_winner
+
+    # The overall, home & away ratings are stacked, to rate them all in one pass
+    n_teams = len(TEAM_NAMES)
+    ratings_new = engine.rate_period(
+        np.concatenate((ratings, ratings_home, ratings_away)),
+        np.column_stack(
+            (ids_home, ids_away, n_teams + ids_home, 2 * n_teams + ids_away)
+        ).ravel(),
+        np.column_stack(
+            (ids_away, ids_home, 2 * n_teams + ids_away, n_teams + ids_home)
+        ).ravel(),
+        np.column_stack((scores_home, scores_away, scores_home, scores_away)).ravel(),
+    )
+
+    # Stats, and the opponents' (pre-period) ratings, game by game
+    last_game: dict[tuple[int, str], int] = {}
+    for game in games:
+        if ledger is not None:
+            rows = (
+                game.id_home,
+                game.id_away,
+                n_teams + game.id_home,
+                2 * n_teams + game.id_away,
+            )
+            ratings_pre = [ratings[game.id_home], ratings[game.id_away]]
+            ledger.append(
+                game,
+                [*ratings_pre, ratings_home[game.id_home], ratings_away[game.id_away]],
+                [ratings_new[x] for x in rows],
+                engine.expected_score(tuple(ratings_pre[0]), tuple(ratings_pre[1])),
+            )
+
+        team_home, team_away = teams_by_id[game.id_home], teams_by_id[game.id_away]
+        team_winner, team_loser = (
+            (team_home, team_away)
+            if game.score_home > game.score_away
+            else (team_away, team_home)
+        )
+        team_winner.add_game(game)
+        team_loser.add_game(game)
+
+        rating_winner, rating_loser = ratings[team_winner.id], ratings[team_loser.id]
+        team_winner.opponent_ratings.append_values(rating_loser, game.index)
+        team_winner.opponent_ratings_by_outcome["W"].append_values(
+            rating_loser, game.index
+        )
+        team_loser.opponent_ratings.append_values(rating_winner, game.index)
+        team_loser.opponent_ratings_by_outcome[
+            "OTL" if game.is_overtime else "L"
+        ].append_values(rating_winner, game.index)
+
+        for team_id, attr in (
+            (game.id_home, "ratings"),
+            (game.id_away, "ratings"),
+            (game.id_home, "ratings_home"),
+            (game.id_away, "ratings_away"),
+        ):
+            last_game[(team_id, attr)] = game.index
+
+    # New ratings, one entry per team (and history) rated in this period
+    offsets = {"ratings": 0, "ratings_home": n_teams, "ratings_away": 2 * n_teams}
+    for (team_id, attr), game_index in last_game.items():
+        getattr(teams_by_id[team_id], attr).append_values(
+            ratings_new[offsets[attr] + team_id], game_index
+        )
+
+
+def update_team_ratings(
+    teams: dict[str, Team],
+    game: Game,
+    engine: RatingEngine | None = None,
+    ledger: Ledger | None = None,
+) -> None:
+    """
+    Update two teams' stats, based on a game outcome (and record it in the ledger)
+    """
+
+    def rate_game(team_winner: Team, team_loser: Team) -> None:
+        """
+        Helper method for updating two teams' Glicko ratings, based on a game outcome
+        """
+        # Update wins, losses, OT losses; Goals for, against; Other basic standings
+        team_winner.add_game(game)
+        team_loser.add_game(game)
+
+        if CLI_CONFIG.debug:
+            print(
+                f"{team_winner.name} ({team_winner.rating_str})"
+                f" vs {team_loser.name} ({team_loser.rating_str}) — [{game.outcome}]"
+            )
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Update ratings
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # NOTE: the OTL model & factor are set by the engine's config
+        # TODO: weight overtime wins lower for teams in conference, or division
+        is_winner_home = game.id_home == team_winner.id
+        ratings_winner_split, ratings_loser_split = (
+            (team_winner.ratings_home, team_loser.ratings_away)
+            if is_winner_home
+            else (team_winner.ratings_away, team_loser.ratings_home)
+        )
+        rating_winner, rating_loser = (
+            team_winner.ratings.last(),
+            team_loser.ratings.last(),
+        )
+        rating_winner_split, rating_loser_split = (
+            ratings_winner_split.last(),
+            ratings_loser_split.last(),
+        )
+        (
+            (_new_rating_team_winner, _new_rating_winner_split),
+            (_new_rating_team_loser, _new_rating_loser_split),
+        ) = _engine.rate_game(
+            (rating_winner, rating_winner_split),
+            (rating_loser, rating_loser_split),
+            overtime=game.is_overtime,
+        )
+
+        if CLI_CONFIG.debug:
+            # Show the rating changes
+            print(
+                f"{team_winner.name} {round(rating_winner[0])} ->"
+                f" {round(_new_rating_team_winner[0])}"
+                f" vs {team_loser.name} {round(rating_loser[0])} ->"
+                f" {round(_new_rating_team_loser[0])} ({game.outcome})"
+            )
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Add new ratings to lists
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # TODO: take average of before and after opponent ratings?  Group by W/L/OTL?
+        team_winner.opponent_ratings.append_values(rating_loser, game.index)
+        team_winner.opponent_ratings_by_outcome["W"].append_values(
+            rating_loser, game.index
+        )
+        team_loser.opponent_ratings.append_values(rating_winner, game.index)
+        team_loser.opponent_ratings_by_outcome[
+            "OTL" if game.is_overtime else "L"
+        ].append_values(rating_winner, game.index)
+        # ~~~~~~~~~~~~
+        # Main ratings
+        # ~~~~~~~~~~~~
+        team_winner.ratings.append_values(_new_rating_team_winner, game.index)
+        team_loser.ratings.append_values(_new_rating_team_loser, game.index)
+        # Home/away ratings
+        ratings_winner_split.append_values(_new_rating_winner_split, game.index)
+        ratings_loser_split.append_values(_new_rating_loser_split, game.index)
+
+        # ~~~~~~~~~~~~
+        # Ledger (home team first)
+        # ~~~~~~~~~~~~
+        if ledger is not None:
+            ratings_pre = (
+                rating_winner,
+                rating_loser,
+                rating_winner_split,
+                rating_loser_split,
+            )
+            ratings_post = (
+                _new_rating_team_winner,
+                _new_rating_team_loser,
+                _new_rating_winner_split,
+                _new_rating_loser_split,
+            )
+            order = (0, 1, 2, 3) if is_winner_home else (1, 0, 3, 2)
+            ledger.append(
+                game,
+                [ratings_pre[x] for x in order],
+                [ratings_post[x] for x in order],
+                _engine.expected_score(ratings_pre[order[0]], ratings_pre[order[1]]),
+            )
+
+    # The rating engine (built once per config, and shared)
+    _engine = engine or get_rating_engine()
+
+    # Get teams, or create them if they don't exist
+    # TODO: is this already done in the process_csv() function?  Where should this be?
+    #  see "NOTE: 117" above
+    team_away = get_or_create_team_by_name(
+        teams, game.team_away, _engine.create_rating()
+    )
+    team_home = get_or_create_team_by_name(
+        teams, game.team_home, _engine.create_rating()
+    )
+
+    # Run the nested helper method
+    if game.is_completed:
+        if game.score_away > game.score_home:
+            rate_game(team_winner=team_away, team_loser=team_home)
+        else:
+            rate_game(team_winner=team_home, team_loser=team_away)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:02:44 2026
+
+@author: shane
+Per-team index of the schedule: each team's completed & upcoming games, with
+running goals for & against, so the team views slice them instead of scanning.
+"""
+import numpy as np
+
+from nhlrank.models import TEAM_NAMES, Game
+
+
+class ScheduleIndex:
+    """
+    Each team's completed & upcoming games (indexes in the CSV, in order), built in
+    one pass over the games.  Goals for & against are prefix sums over a team's
+    completed games, so the totals over any window of them are O(1).
+    """
+
+    __slots__ = ("games", "_completed", "_upcoming", "_goals_for", "_goals_against")
+
+    def __init__(self, games: list[Game]):
+        self.games = games
+
+        completed: list[list[int]] = [[] for _ in TEAM_NAMES]
+        upcoming: list[list[int]] = [[] for _ in TEAM_NAMES]
+        goals_for: list[list[int]] = [[0] for _ in TEAM_NAMES]
+        goals_against: list[list[int]] = [[0] for _ in TEAM_NAMES]
+        for game in games:
+            if not game.is_completed:
+                upcoming[game.id_home].append(game.index)
+                upcoming[game.id_away].append(game.index)
+                continue
+            for team_id, score_for, score_against in (
+                (game.id_home, game.score_home, game.score_away),
+                (game.id_away, game.score_away, game.score_home),
+            ):
+                completed[team_id].append(game.index)
+                goals_for[team_id].append(goals_for[team_id][-1] + score_for)
+                goals_against[team_id].append(
+                    goals_against[team_id][-1] + score_against
+                )
+
+        self._completed = [np.array(x, dtype=np.intp) for x in completed]
+        self._upcoming = [np.array(x, dtype=np.intp) for x in upcoming]
+        self._goals_for = [np.array(x, dtype=np.int64) for x in goals_for]
+        self._goals_against = [np.array(x, dtype=np.int64) for x in goals_against]
+
+    def completed(self, team_id: int) -> np.ndarray:
+        """Indexes of a team's completed games"""
+        return self._completed[team_id]
+
+    def upcoming(self, team_id: int) -> np.ndarray:
+        """Indexes of a team's upcoming (scheduled) games"""
+        return self._upcoming[team_id]
+
+    def games_completed(self, team_id: int, last: int | None = None) -> list[Game]:
+        """A team's completed games (or the last N), O(N)"""
+        indexes = self._completed[team_id]
+        if last is not None:
+            start = len(indexes) - min(last, len(indexes))
+            indexes = indexes[start:]
+        return [self.games[i] for i in indexes.tolist()]
+
+    def games_upcoming(self, team_id: int, n: int | None = None) -> list[Game]:
+        """A team's upcoming games (or the next N), O(N)"""
+        return [self.games[i] for i in self._upcoming[team_id][:n].tolist()]
+
+    def goals(
+        self, team_id: int, start: int = 0, stop: int | None = None
+    ) -> tuple[int, int]:
+        """
+        Goals for & against, over a team's completed games [start:stop] (by game
+        number, 0 for its first, with the same meaning as slicing a list), O(1)
+        """
+        start, stop, _ = slice(start, stop).indices(len(self._completed[team_id]))
+        stop = max(start, stop)
+        goals_for, goals_against = (
+            self._goals_for[team_id],
+            self._goals_against[team_id],
+        )
+        return (
+            int(goals_for[stop] - goals_for[start]),
+            int(goals_against[stop] - goals_against[start]),
+        )
+
+    def goals_last_n(self, team_id: int, n: int) -> tuple[int, int]:
+        """Goals for & against, over a team's last N completed games, O(1)"""
+        n_games = len(self._completed[team_id])
+        return self.goals(team_id, n_games - min(n, n_games))
@@ -5,10 +5,15 @@ Created on Wed Feb  8 15:23:06 2023
 @author: shane
 """
 import csv
+import hashlib
+import json
+import os
+import tempfile
 
 import requests
 
 from nhlrank import (
+    CACHE_DIR,
     CLI_CONFIG,
     CSV_GAMES_FILE_PATH,
     REQUEST_CONNECT_TIMEOUT,
@@ -17,36 +22,143 @@ from nhlrank import (
     __version__,
 )
 from nhlrank.env import CSV_GAMES_URL
+from nhlrank.snapshot import csv_file_hash
 
 
-def get_google_sheet(url: str = CSV_GAMES_URL) -> bytes:
+def validators_path(file_path: str = CSV_GAMES_FILE_PATH) -> str:
+    """Location on disk of the HTTP cache validators (ETag, Last-Modified)"""
+    _name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(CACHE_DIR, f"{_name}.validators.json")
+
+
+def load_validators(file_path: str = CSV_GAMES_FILE_PATH) -> dict[str, str]:
+    """
+    Returns the conditional request headers for the cached CSV file.
+    Empty if we never fetched it, or it was changed locally since.
+    """
+    try:
+        with open(validators_path(file_path), "r", encoding="utf-8") as _file:
+            validators = json.load(_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not os.path.isfile(file_path) or validators.get("sha256") != csv_file_hash(
+        file_path
+    ):
+        return {}
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def save_validators(
+    response: requests.Response,
+    sha256: str,
+    file_path: str = CSV_GAMES_FILE_PATH,
+) -> None:
+    """Stores the response's validators, for the next conditional request"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(validators_path(file_path), "w", encoding="utf-8") as _file:
+        json.dump(
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": sha256,
+            },
+            _file,
+        )
+
+
+def get_google_sheet(
+    url: str = CSV_GAMES_URL,
+    file_path: str = CSV_GAMES_FILE_PATH,
+) -> tuple[str, str] | None:
     """
-    Returns a byte array (string) of the Google Sheet in CSV format
+    Streams the Google Sheet (in CSV format) to a temporary file, next to file_path.
+    Returns the temporary file's path & its SHA-256 content hash (found while it was
+    streamed), or None if the server says it's unchanged.
     """
     print(f"GET '{url}'\\")
 
-    response = requests.get(
+    headers = {"User-Agent": f"{__title__} v{__version__}"}
+    headers.update(load_validators(file_path))
+    if CLI_CONFIG.debug:
+        print(f"Request headers: {headers}")
+
+    with requests.get(
         url,
-        headers={"User-Agent": f"{__title__} v{__version__}"},
+        headers=headers,
         timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
-    )
+        stream=True,
+    ) as response:
+        if response.status_code == 304:
+            print(" 304 Not Modified")
+            return None
+        response.raise_for_status()
+
+        _hash = hashlib.sha256()
+        # pylint: disable=consider-using-with
+        _file = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(file_path), suffix=".tmp", delete=False
+        )
+        try:
+            with _file:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    _hash.update(chunk)
+                    _file.write(chunk)
+        except BaseException:
+            os.remove(_file.name)
+            raise
 
-    response.raise_for_status()
-    return bytes(response.content)
+        sha256 = _hash.hexdigest()
+        save_validators(response, sha256, file_path)
+
+    return _file.name, sha256
 
 
 def cache_csv_games_file(
-    _csv_bytes_output: bytes,
+    _csv_tmp_file: tuple[str, str] | None,
     _file_path: str = CSV_GAMES_FILE_PATH,
-) -> None:
+) -> bool:
     """
     Persists the CSV file into the git commit history.
     Fall back calculation in case sheets.google.com is unreachable.
     (Manually) verify no nefarious edits are made.
+
+    The downloaded file is atomically renamed into place, only if its contents differ
+    (so the mtime, and anything keyed on it, is left alone otherwise).
+    Returns True if the CSV file changed.
+    Takes the downloaded file's path & content hash, see get_google_sheet().
     """
+    if _csv_tmp_file is None:
+        return False
+
+    _csv_tmp_file_path, sha256 = _csv_tmp_file
+    if os.path.isfile(_file_path) and sha256 == csv_file_hash(_file_path):
+        os.remove(_csv_tmp_file_path)
+        print(f" ='{_file_path}' (unchanged)")
+        return False
+
     print(f" >'{_file_path}'")
-    with open(_file_path, "wb") as _file:
-        _file.write(_csv_bytes_output)
+    # Temporary files are created private (0600), keep the usual permissions instead
+    os.chmod(
+        _csv_tmp_file_path,
+        os.stat(_file_path).st_mode & 0o777 if os.path.isfile(_file_path) else 0o644,
+    )
+    os.replace(_csv_tmp_file_path, _file_path)
+    return True
+
+
+def fetch_csv_games_file(
+    url: str = CSV_GAMES_URL,
+    file_path: str = CSV_GAMES_FILE_PATH,
+) -> bool:
+    """Downloads the CSV file (if modified), returns True if its contents changed"""
+    return cache_csv_games_file(get_google_sheet(url, file_path), file_path)
 
 
 def build_csv_reader(csv_file_path: str = CSV_GAMES_FILE_PATH) -> csv.DictReader:
@@ -0,0 +1,847 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 18:40:09 2026
+
+@author: shane
+Monte Carlo simulation of the remaining schedule, vectorized over many seasons at once.
+Produces odds to make the playoffs, win the division, win the Presidents' Trophy,
+and finish at each playoff seed (division top 3 + 2 wildcards, per conference).
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from nhlrank import constants
+from nhlrank.models import TEAM_IDS, TEAM_NAMES, Game, Outcome, Team
+from nhlrank.odds import get_odds_matrix
+from nhlrank.tiebreak import (
+    HeadToHeadTable,
+    tiebreak_keys,
+    tied_pairs,
+    with_head_to_head,
+)
+
+N_TEAMS = len(TEAM_NAMES)
+
+# Playoff seeds within each conference (1-6 division qualifiers, 7-8 wildcards)
+N_SEEDS = 8
+
+# Playoff rounds: first round, second round, conference final, Stanley Cup final
+N_ROUNDS = 4
+
+# Used if no games have been played yet (roughly the NHL average)
+DEFAULT_OVERTIME_RATE = 0.23
+DEFAULT_SHOOTOUT_RATE = 0.09
+
+# Points, wins & overtime wins are packed into one number (see packed_weights)
+PACKED_POINTS = 2**14
+PACKED_WINS = 2**7
+
+# Bits for the current goal differential rank, the last tiebreaker in the sort keys
+GOAL_DIFFERENTIAL_BITS = (N_TEAMS - 1).bit_length()
+
+# Normal quantile for the 95% confidence intervals (error bars) on the odds
+Z_95 = 1.959964
+
+# Team IDs, grouped by conference and division
+DIVISIONS: dict[str, dict[str, np.ndarray]] = {
+    conf: {
+        div: np.array(
+            [
+                TEAM_IDS[" ".join(constants.team_abbreviations_to_full_names[x])]
+                for x in team_abbrevs
+            ],
+            dtype=np.intp,
+        )
+        for div, team_abbrevs in divs.items()
+    }
+    for conf, divs in constants.conference_and_division_organization.items()
+}
+
+
+def overtime_rate(games: list[Game]) -> float:
+    """Chance a game goes past regulation (the loser still earns a point)"""
+    n_completed = sum(1 for game in games if game.is_completed)
+    n_overtime = sum(1 for game in games if game.is_completed and game.is_overtime)
+    return n_overtime / n_completed if n_completed else DEFAULT_OVERTIME_RATE
+
+
+def shootout_rate(games: list[Game]) -> float:
+    """Chance a game goes to a shootout (part of the overtime rate)"""
+    n_completed = sum(1 for game in games if game.is_completed)
+    n_shootout = sum(
+        1 for game in games if game.is_completed and game.outcome_code is Outcome.SO
+    )
+    return n_shootout / n_completed if n_completed else DEFAULT_SHOOTOUT_RATE
+
+
+# pylint: disable=too-many-instance-attributes
+class Schedule:
+    """
+    Remaining games and current standings, as arrays (indexed by team ID).
+    Built once, then shared by every simulated season.
+    The away team's odds have home_ice rating points added to the home team.
+    """
+
+    def __init__(
+        self, games: list[Game], teams: dict[str, Team], home_ice: float = 0.0
+    ):
+        odds = get_odds_matrix(teams, home_ice)
+        games_remaining = [game for game in games if not game.is_completed]
+
+        self.ids_away = np.array([x.id_away for x in games_remaining], dtype=np.intp)
+        self.ids_home = np.array([x.id_home for x in games_remaining], dtype=np.intp)
+        self.odds_away = odds.on_road[self.ids_away, self.ids_home]
+        self.series = odds.series
+
+        self.overtime_rate = overtime_rate(games)
+        self.shootout_rate = min(shootout_rate(games), self.overtime_rate)
+
+        # Current standings (games played: by the end of the season)
+        self.points = np.zeros(N_TEAMS, dtype=np.int64)
+        self.wins = np.zeros(N_TEAMS, dtype=np.int64)
+        self.regulation_wins = np.zeros(N_TEAMS, dtype=np.int64)
+        self.regulation_overtime_wins = np.zeros(N_TEAMS, dtype=np.int64)
+        self.games_played = np.bincount(
+            np.concatenate((self.ids_away, self.ids_home)), minlength=N_TEAMS
+        )
+        goal_differential = np.zeros(N_TEAMS)
+        for team in teams.values():
+            self.points[team.id] = team.points
+            self.wins[team.id] = team.wins
+            self.regulation_wins[team.id] = team.regulation_wins
+            self.regulation_overtime_wins[team.id] = team.regulation_overtime_wins
+            self.games_played[team.id] += team.games_played
+            goal_differential[team.id] = team.goals_for - team.goals_against
+
+        # Goal differential isn't simulated, so rank teams by their current one
+        self.goal_differential_rank = np.argsort(np.argsort(goal_differential))
+
+        # Probabilities as 16-bit thresholds (16-bit draws are ~2x cheaper than floats)
+        self.threshold_away = probability_threshold(self.odds_away)
+        self.threshold_overtime = probability_threshold(np.array(self.overtime_rate))
+        self.threshold_shootout = probability_threshold(np.array(self.shootout_rate))
+
+        # Points & wins are totaled with a single matrix product (see simulate_points)
+        self.weights, self.packed_base = packed_weights(self.ids_away, self.ids_home)
+        self.team_positions = team_positions(self.ids_away, self.ids_home)
+
+        # Head-to-head points (the games that count), completed & remaining by pair
+        head_to_head = HeadToHeadTable(games)
+        self.head_to_head_points = head_to_head.points
+        self.head_to_head_games = head_to_head.games_total
+        self.head_to_head_positions = pair_positions(
+            self.ids_away,
+            self.ids_home,
+            head_to_head.is_counted[[x.index for x in games_remaining]],
+        )
+
+    # Everything simulate_points() and tally_standings() need
+    ARRAYS = (
+        "ids_away",
+        "points",
+        "wins",
+        "regulation_wins",
+        "regulation_overtime_wins",
+        "games_played",
+        "goal_differential_rank",
+        "threshold_away",
+        "threshold_overtime",
+        "threshold_shootout",
+        "weights",
+        "packed_base",
+        "team_positions",
+        "head_to_head_points",
+        "head_to_head_games",
+        "head_to_head_positions",
+        "series",
+    )
+
+    def __len__(self) -> int:
+        return len(self.ids_away)
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """The arrays needed to simulate, e.g. to hand off to another process"""
+        return {x: getattr(self, x) for x in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> "Schedule":
+        """Rebuilds a schedule (for simulating only) around the arrays, no copies"""
+        schedule = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(schedule, name, arrays[name])
+        return schedule
+
+
+class SeasonSimulation:
+    """
+    Counters (per team ID) tallied over all simulated seasons.
+    They're all views into one flat int64 array, so a set of counters can live in a
+    shared memory buffer (written to by a worker process, see simulate_parallel).
+    """
+
+    # n_sims, then (per team) points, playoffs, division, presidents, seeds, rounds
+    SIZE = 1 + 4 * N_TEAMS + N_TEAMS * (N_SEEDS + 1) + N_TEAMS * N_ROUNDS
+
+    def __init__(self, counters: np.ndarray | None = None) -> None:
+        if counters is None:
+            counters = np.zeros(self.SIZE, dtype=np.int64)
+        self.counters = counters
+
+        # NOTE: np.split() returns views, so the counters all share the one array
+        # pylint: disable=unbalanced-tuple-unpacking
+        (
+            self._n_sims,
+            self.points,
+            self.playoffs,
+            self.division,
+            self.presidents,
+            seeds,
+            rounds,
+        ) = np.split(
+            counters, np.cumsum([1] + [N_TEAMS] * 4 + [N_TEAMS * (N_SEEDS + 1)])
+        )
+        # Column 0 is missing the playoffs, columns 1-8 are the conference seeds
+        self.seeds = seeds.reshape(N_TEAMS, N_SEEDS + 1)
+        # Playoff series won, in each round (the last one is winning the Cup)
+        self.rounds = rounds.reshape(N_TEAMS, N_ROUNDS)
+
+    @property
+    def n_sims(self) -> int:
+        """Number of seasons simulated"""
+        return int(self._n_sims[0])
+
+    @n_sims.setter
+    def n_sims(self, value: int) -> None:
+        self._n_sims[0] = value
+
+    def merge(self, other: "SeasonSimulation") -> None:
+        """Adds another (independent) set of simulations to this one"""
+        self.counters += other.counters
+
+    @property
+    def odds_playoffs(self) -> np.ndarray:
+        """Probability of making the playoffs"""
+        return self.playoffs / max(self.n_sims, 1)
+
+    @property
+    def odds_division(self) -> np.ndarray:
+        """Probability of winning the division"""
+        return self.division / max(self.n_sims, 1)
+
+    @property
+    def odds_presidents(self) -> np.ndarray:
+        """Probability of winning the Presidents' Trophy"""
+        return self.presidents / max(self.n_sims, 1)
+
+    @property
+    def odds_seeds(self) -> np.ndarray:
+        """Probability of each seed, (teams, 9) with column 0 for missing out"""
+        return self.seeds / max(self.n_sims, 1)
+
+    @property
+    def odds_rounds(self) -> np.ndarray:
+        """Probability of winning each playoff round, (teams, 4), the last is the Cup"""
+        return self.rounds / max(self.n_sims, 1)
+
+    @property
+    def points_avg(self) -> np.ndarray:
+        """Average final points"""
+        return self.points / max(self.n_sims, 1)
+
+    def error(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Half-width of the 95% (Wilson score) confidence interval, for the odds of
+        each count. Unlike the textbook p ± z·sqrt(p(1-p)/n), it isn't 0 for teams
+        which always (or never) made it in the simulations so far.
+        """
+        n_sims = max(self.n_sims, 1)
+        odds = counts / n_sims
+        return (
+            Z_95
+            / (1 + Z_95**2 / n_sims)
+            * np.sqrt(odds * (1 - odds) / n_sims + Z_95**2 / (4 * n_sims**2))
+        )
+
+    @property
+    def error_playoffs(self) -> np.ndarray:
+        """Error bars (95%) on the odds of making the playoffs"""
+        return self.error(self.playoffs)
+
+    @property
+    def error_division(self) -> np.ndarray:
+        """Error bars (95%) on the odds of winning the division"""
+        return self.error(self.division)
+
+    @property
+    def error_presidents(self) -> np.ndarray:
+        """Error bars (95%) on the odds of winning the Presidents' Trophy"""
+        return self.error(self.presidents)
+
+
+def probability_threshold(odds: np.ndarray) -> np.ndarray:
+    """Probabilities, scaled to compare against uniform 16-bit random integers"""
+    return np.minimum(np.round(odds * 2**16), 2**16 - 1).astype(np.uint16)
+
+
+def packed_weights(
+    ids_away: np.ndarray, ids_home: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weights (3 * games, teams) to total up each team's points, wins & overtime wins
+    (incl. shootouts), packed into one number (2^14 * points + 2^7 * wins + ot_wins),
+    from the concatenated per-game indicators:
+    [away team won, went to overtime, away team won in overtime].
+      away team: (2^15 + 2^7) * won + 2^14 * overtime - (2^14 - 1) * won_ot
+      home team: (2^15 + 2^7) * (1 - won) + overtime + (2^14 - 1) * won_ot
+    The constant (2^15 + 2^7) per home game is returned separately (per team).
+    """
+    n_games = len(ids_away)
+    incidence_away = np.zeros((n_games, N_TEAMS), np.float32)
+    incidence_home = np.zeros((n_games, N_TEAMS), np.float32)
+    incidence_away[np.arange(n_games), ids_away] = 1
+    incidence_home[np.arange(n_games), ids_home] = 1
+    win = 2 * PACKED_POINTS + PACKED_WINS
+
+    weights = np.concatenate(
+        (
+            win * (incidence_away - incidence_home),
+            PACKED_POINTS * incidence_away + incidence_home,
+            (PACKED_POINTS - 1) * (incidence_home - incidence_away),
+        )
+    )
+    return weights, win * incidence_home.sum(axis=0).astype(np.int64)
+
+
+def team_positions(ids_away: np.ndarray, ids_home: np.ndarray) -> np.ndarray:
+    """
+    Positions (in the remaining games) of each team's games, (teams, most games
+    left for a team), -1 padded
+    """
+    positions: list[list[int]] = [[] for _ in range(N_TEAMS)]
+    for i, (id_away, id_home) in enumerate(zip(ids_away.tolist(), ids_home.tolist())):
+        positions[id_away].append(i)
+        positions[id_home].append(i)
+
+    table = np.full((N_TEAMS, max(map(len, positions))), -1, dtype=np.intp)
+    for team_id, positions_team in enumerate(positions):
+        table[team_id, : len(positions_team)] = positions_team
+    return table
+
+
+def pair_positions(
+    ids_away: np.ndarray, ids_home: np.ndarray, is_counted: np.ndarray
+) -> np.ndarray:
+    """
+    Positions (in the remaining games) of the head-to-head games that count between
+    each pair of teams, (teams, teams, most games left between a pair), -1 padded
+    """
+    positions: dict[tuple[int, int], list[int]] = {}
+    for i in np.flatnonzero(is_counted).tolist():
+        id_away, id_home = int(ids_away[i]), int(ids_home[i])
+        positions.setdefault((id_away, id_home), []).append(i)
+        positions.setdefault((id_home, id_away), []).append(i)
+
+    table = np.full(
+        (N_TEAMS, N_TEAMS, max(map(len, positions.values()), default=0)),
+        -1,
+        dtype=np.intp,
+    )
+    for (team_id, opponent_id), positions_pair in positions.items():
+        table[team_id, opponent_id, : len(positions_pair)] = positions_pair
+    return table
+
+
+class SimulatedStandings(NamedTuple):
+    """Final standings (sims, teams) of the simulated seasons, and their results"""
+
+    points: np.ndarray
+    wins: np.ndarray
+    regulation_wins: np.ndarray
+    # (sims, 3, games): away team won, went to overtime, away team won in overtime
+    results: np.ndarray
+    # (sims, games): the draws deciding overtimes & shootouts (see simulate_points)
+    draws_overtime: np.ndarray
+
+
+def simulate_points(
+    schedule: Schedule, n_sims: int, rng: np.random.Generator
+) -> SimulatedStandings:
+    """
+    Plays out the remaining games n_sims times.
+    Returns the final standings, each shaped (n_sims, teams).
+    Shootouts are the (less likely) part of overtimes, on the same draws, only
+    looked up when needed (see regulation_overtime_wins).
+    """
+    n_games = len(schedule)
+    if not n_games:
+        return SimulatedStandings(
+            points=np.tile(schedule.points, (n_sims, 1)),
+            wins=np.tile(schedule.wins, (n_sims, 1)),
+            regulation_wins=np.tile(schedule.regulation_wins, (n_sims, 1)),
+            results=np.zeros((n_sims, 3, 0), dtype=np.float32),
+            draws_overtime=np.zeros((n_sims, 0), dtype=np.uint16),
+        )
+
+    # Winner gets 2 points, the loser 1 point if it went to overtime (or a shootout)
+    # NOTE: all the sums are small integers, so float32 products are exact
+    away_wins = (
+        rng.integers(0, 2**16, (n_sims, n_games), dtype=np.uint16)
+        < schedule.threshold_away
+    )
+    draws_overtime = rng.integers(0, 2**16, (n_sims, n_games), dtype=np.uint16)
+    overtime = draws_overtime < schedule.threshold_overtime
+    indicators = np.empty((n_sims, 3, n_games), dtype=np.float32)
+    indicators[:, 0] = away_wins
+    indicators[:, 1] = overtime
+    indicators[:, 2] = away_wins & overtime
+
+    packed = (indicators.reshape(n_sims, -1) @ schedule.weights).astype(
+        np.int64
+    ) + schedule.packed_base
+    wins = (packed % PACKED_POINTS) // PACKED_WINS
+    return SimulatedStandings(
+        points=schedule.points + packed // PACKED_POINTS,
+        wins=schedule.wins + wins,
+        regulation_wins=schedule.regulation_wins + wins - packed % PACKED_WINS,
+        results=indicators,
+        draws_overtime=draws_overtime,
+    )
+
+
+def regulation_overtime_wins(
+    schedule: Schedule, standings: SimulatedStandings, sims: np.ndarray, ids: np.ndarray
+) -> np.ndarray:
+    """
+    Final regulation & overtime wins (ROW) of some teams in some of the simulated
+    seasons: wins, minus the shootouts won among the remaining games
+    """
+    positions = schedule.team_positions[ids]
+    if not positions.size:
+        return schedule.regulation_overtime_wins[ids]  # type: ignore
+
+    # NOTE: indexes into the flattened arrays, much cheaper than fancy indexing
+    n_games = standings.draws_overtime.shape[1]
+    cells = sims[:, None] * n_games + positions
+    shootout = standings.draws_overtime.ravel()[cells] < schedule.threshold_shootout
+    won_away = standings.results.ravel()[cells + 2 * sims[:, None] * n_games] > 0
+    won = won_away == (schedule.ids_away[positions] == ids[:, None])
+    wins_shootout = (won & shootout & (positions >= 0)).sum(axis=1)
+    return (  # type: ignore
+        schedule.regulation_overtime_wins[ids]
+        + standings.wins[sims, ids]
+        - schedule.wins[ids]
+        - wins_shootout
+    )
+
+
+def head_to_head_points(
+    schedule: Schedule,
+    results: np.ndarray,
+    tied: tuple[np.ndarray, np.ndarray, np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Head-to-head points earned & games counted, over the season, between each of the
+    tied pairs (see tied_pairs), from the completed & simulated results
+    """
+    sims, ids, ids_opponent = tied
+    points = schedule.head_to_head_points[ids, ids_opponent]
+    games = schedule.head_to_head_games[ids, ids_opponent]
+
+    positions = schedule.head_to_head_positions[ids, ids_opponent]
+    if positions.size:
+        is_game = positions >= 0
+        won, overtime, won_ot = (
+            results[sims[:, None], i, positions].astype(np.int64) for i in range(3)
+        )
+        points = points + (
+            np.where(
+                schedule.ids_away[positions] == ids[:, None],
+                2 * won + overtime - won_ot,
+                2 - 2 * won + won_ot,
+            )
+            * is_game
+        ).sum(axis=1)
+    return points, games
+
+
+def tally_standings(
+    result: SeasonSimulation,
+    standings: SimulatedStandings,
+    schedule: Schedule,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks each simulated season like `standings.standings_by_wildcard()`, and adds
+    its playoff, division, Presidents' Trophy, and seed outcomes to the counters.
+    Returns the sort keys (sims, teams) and the playoff brackets (sims, 16).
+    """
+    n_sims = len(standings.points)
+
+    # Sort key: points & the tiebreakers (see tiebreak), head-to-head only looked up
+    # for the tied teams, then goal differential (current, also unique)
+    # NOTE: ROW is only needed (so only counted) for the teams tied on the fields
+    # above it, for the others it's left at 0, which can't change their order
+    games_played = np.broadcast_to(schedule.games_played, standings.points.shape)
+    row = np.zeros_like(standings.points)
+    is_tied = np.zeros(row.shape, dtype=bool)
+    is_tied[
+        tied_pairs(
+            tiebreak_keys(
+                standings.points, games_played, standings.regulation_wins, row, row
+            )
+        )[:2]
+    ] = True
+    sims, ids = np.nonzero(is_tied)
+    row[sims, ids] = regulation_overtime_wins(schedule, standings, sims, ids)
+
+    keys = tiebreak_keys(
+        standings.points, games_played, standings.regulation_wins, row, standings.wins
+    )
+    tied = tied_pairs(keys)
+    keys = (
+        with_head_to_head(
+            keys, tied, *head_to_head_points(schedule, standings.results, tied)
+        )
+        << GOAL_DIFFERENTIAL_BITS
+    ) + schedule.goal_differential_rank
+    seeds = np.zeros((n_sims, N_TEAMS), dtype=np.intp)
+    brackets = []
+
+    for divs in DIVISIONS.values():
+        ids_conf = np.concatenate(list(divs.values()))
+
+        # Top 3 teams from each division
+        qualifiers = []
+        for ids_div in divs.values():
+            order = np.argsort(-keys[:, ids_div], axis=1)
+            qualifiers.append(ids_div[order[:, :3]])
+            result.division += np.bincount(ids_div[order[:, 0]], minlength=N_TEAMS)
+        ids_top = np.concatenate(qualifiers, axis=1)
+
+        # Seeds 1-6 for the division qualifiers, by their overall standing
+        order = np.argsort(-np.take_along_axis(keys, ids_top, axis=1), axis=1)
+        np.put_along_axis(
+            seeds, np.take_along_axis(ids_top, order, axis=1), np.arange(1, 7), axis=1
+        )
+
+        # Wildcards (seeds 7 and 8) are the conference's top 2 remaining teams
+        keys_conf = np.where(seeds[:, ids_conf] > 0, -1, keys[:, ids_conf])
+        ids_wildcard = ids_conf[np.argsort(-keys_conf, axis=1)[:, :2]]
+        np.put_along_axis(seeds, ids_wildcard, np.arange(7, 9), axis=1)
+
+        # First round: the better division winner plays the 2nd wildcard, the other
+        # plays the 1st, and 2nd plays 3rd in each division
+        top_a, top_b = qualifiers[0], qualifiers[1]
+        is_a_better = keys[np.arange(n_sims), top_a[:, 0]] > (
+            keys[np.arange(n_sims), top_b[:, 0]]
+        )
+        wildcard_a = np.where(is_a_better, ids_wildcard[:, 1], ids_wildcard[:, 0])
+        wildcard_b = np.where(is_a_better, ids_wildcard[:, 0], ids_wildcard[:, 1])
+        brackets.append(
+            np.column_stack(
+                (top_a[:, 0], wildcard_a, top_a[:, 1], top_a[:, 2])
+                + (top_b[:, 0], wildcard_b, top_b[:, 1], top_b[:, 2])
+            )
+        )
+
+    result.n_sims += n_sims
+    result.points += standings.points.sum(axis=0)
+    result.playoffs += (seeds > 0).sum(axis=0)
+    result.presidents += np.bincount(keys.argmax(axis=1), minlength=N_TEAMS)
+    result.seeds += (
+        np.bincount(
+            (np.arange(N_TEAMS) * (N_SEEDS + 1) + seeds).ravel(),
+            minlength=N_TEAMS * (N_SEEDS + 1),
+        )
+        .reshape(N_TEAMS, N_SEEDS + 1)
+        .astype(np.int64)
+    )
+    return keys, np.concatenate(brackets, axis=1)
+
+
+def tally_playoffs(
+    result: SeasonSimulation,
+    keys: np.ndarray,
+    brackets: np.ndarray,
+    series: np.ndarray,
+    rng: np.random.Generator,
+) -> None:
+    """
+    Plays out each simulated bracket, one draw per series against its closed form
+    odds (see odds.series_odds_matrix), and adds the rounds won to the counters.
+    Adjacent slots meet, so after each round the winners' bracket halves in size.
+    The team with the better regular season has home ice.
+    """
+    alive = brackets
+    for i in range(N_ROUNDS):
+        ids_a, ids_b = alive[:, 0::2], alive[:, 1::2]
+        is_a_home = np.take_along_axis(keys, ids_a, axis=1) > np.take_along_axis(
+            keys, ids_b, axis=1
+        )
+        ids_home = np.where(is_a_home, ids_a, ids_b)
+        ids_road = np.where(is_a_home, ids_b, ids_a)
+
+        is_home_winner = rng.random(ids_home.shape) < series[ids_home, ids_road]
+        alive = np.where(is_home_winner, ids_home, ids_road)
+        result.rounds[:, i] += np.bincount(alive.ravel(), minlength=N_TEAMS)
+
+
+def simulate_batch(
+    schedule: Schedule, n_sims: int, rng: np.random.Generator
+) -> SeasonSimulation:
+    """Simulates n_sims seasons, returns their tallied outcomes"""
+    result = SeasonSimulation()
+    keys, brackets = tally_standings(
+        result, simulate_points(schedule, n_sims, rng), schedule
+    )
+    tally_playoffs(result, keys, brackets, schedule.series, rng)
+    return result
+
+
+def simulate_into(
+    result: SeasonSimulation,
+    schedule: Schedule,
+    n_sims: int,
+    rng: np.random.Generator,
+    batch_size: int = 5000,
+) -> None:
+    """Simulates n_sims seasons (in batches, to cap memory), adds them to result"""
+    n_done = 0
+    while n_done < n_sims:
+        batch = simulate_batch(schedule, min(batch_size, n_sims - n_done), rng)
+        result.merge(batch)
+        n_done += batch.n_sims
+
+
+class StoppingRule:
+    """
+    Decides when enough seasons were simulated: after n_sims at most, or sooner once
+    every team's playoff odds are within ± precision (95% confidence), or once the
+    time budget (seconds) is used up.
+    """
+
+    def __init__(
+        self,
+        n_sims: int,
+        precision: float | None = None,
+        time_budget: float | None = None,
+    ):
+        self.n_sims = n_sims
+        self.precision = precision
+        self.time_budget = time_budget
+        self.time_start = time.perf_counter()
+
+    def is_done(self, result: SeasonSimulation) -> bool:
+        """Checked between rounds (of batches) of simulations"""
+        if result.n_sims >= self.n_sims:
+            return True
+        if not result.n_sims:
+            return False
+        if self.precision is not None and (
+            result.error_playoffs.max() <= self.precision
+        ):
+            return True
+        return (
+            self.time_budget is not None
+            and time.perf_counter() - self.time_start >= self.time_budget
+        )
+
+
+class LocalRunner:
+    """Runs the simulations in this process"""
+
+    def __init__(self, schedule: Schedule, seed: int | None, batch_size: int):
+        self.schedule = schedule
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.result = SeasonSimulation()
+        self.round_size = batch_size
+
+    def __enter__(self) -> "LocalRunner":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def run(self, n_sims: int) -> None:
+        """Simulates another n_sims seasons"""
+        simulate_into(self.result, self.schedule, n_sims, self.rng, self.batch_size)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Multi-core
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# name -> (byte offset, shape, dtype)
+SharedLayout = dict[str, tuple[int, tuple[int, ...], str]]
+
+
+def share_arrays(arrays: dict[str, np.ndarray]) -> tuple[SharedMemory, SharedLayout]:
+    """
+    Copies the arrays into one new block of shared memory.
+    Returns the block and the layout needed to attach to them (see attach_arrays).
+    """
+    layout: SharedLayout = {}
+    size = 0
+    for name, array in arrays.items():
+        layout[name] = (size, array.shape, array.dtype.str)
+        size += -(-array.nbytes // 8) * 8  # keep every array 8-byte aligned
+
+    shm = SharedMemory(create=True, size=max(size, 1))
+    for name, array in attach_arrays(shm, layout).items():
+        array[...] = arrays[name]
+    return shm, layout
+
+
+def attach_arrays(shm: SharedMemory, layout: SharedLayout) -> dict[str, np.ndarray]:
+    """Views onto the arrays in a shared memory block (nothing is copied)"""
+    return {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for name, (offset, shape, dtype) in layout.items()
+    }
+
+
+def release_shared_memory(blocks: list[SharedMemory]) -> None:
+    """Closes & frees (unlinks) blocks of shared memory created by this process"""
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+def shard_counters(shm: SharedMemory, n_shards: int) -> np.ndarray:
+    """The (shards, SeasonSimulation.SIZE) counters in the shared results block"""
+    return np.ndarray((n_shards, SeasonSimulation.SIZE), dtype=np.int64, buffer=shm.buf)
+
+
+def simulate_shard(
+    schedule_name: str,
+    layout: SharedLayout,
+    results_name: str,
+    n_shards: int,
+    shard: int,
+    n_sims: int,
+    rng: np.random.Generator,
+    batch_size: int,
+) -> np.random.Generator:
+    """
+    Worker process: simulates more seasons for one shard, reading the schedule from
+    (and tallying into its own row of counters in) shared memory.
+    Returns the shard's random generator, to continue its stream in the next round.
+    """
+    shm_schedule = SharedMemory(name=schedule_name)
+    shm_results = SharedMemory(name=results_name)
+    try:
+        # NOTE: no views may outlive this statement, or the blocks can't be closed
+        simulate_into(
+            SeasonSimulation(shard_counters(shm_results, n_shards)[shard]),
+            Schedule.from_arrays(attach_arrays(shm_schedule, layout)),
+            n_sims,
+            rng,
+            batch_size,
+        )
+    finally:
+        shm_schedule.close()
+        shm_results.close()
+    return rng
+
+
+class PoolRunner:
+    """
+    Shards the simulations across a pool of worker processes.
+    Each shard has its own random stream, spawned from the seed, so the results are
+    reproducible for a given seed and number of workers.
+    """
+
+    def __init__(
+        self, schedule: Schedule, seed: int | None, batch_size: int, workers: int
+    ):
+        self.schedule = schedule
+        self.batch_size = batch_size
+        self.n_shards = workers
+        self.round_size = batch_size * workers
+        self.rngs = [
+            np.random.default_rng(x)
+            for x in np.random.SeedSequence(seed).spawn(self.n_shards)
+        ]
+        self.result = SeasonSimulation()
+
+        # The shared memory first, then the workers, releasing whatever was set up
+        # if any of it fails (e.g. out of shared memory)
+        blocks: list[SharedMemory] = []
+        try:
+            self.shm_schedule, self.layout = share_arrays(schedule.arrays())
+            blocks.append(self.shm_schedule)
+            self.shm_results = SharedMemory(
+                create=True, size=self.n_shards * SeasonSimulation.SIZE * 8
+            )
+            blocks.append(self.shm_results)
+            shard_counters(self.shm_results, self.n_shards)[:] = 0
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        except BaseException:
+            release_shared_memory(blocks)
+            raise
+
+    def __enter__(self) -> "PoolRunner":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.executor.shutdown()
+        release_shared_memory([self.shm_schedule, self.shm_results])
+
+    def run(self, n_sims: int) -> None:
+        """Simulates another n_sims seasons, split evenly across the shards"""
+        futures = [
+            self.executor.submit(
+                simulate_shard,
+                self.shm_schedule.name,
+                self.layout,
+                self.shm_results.name,
+                self.n_shards,
+                shard,
+                n_sims // self.n_shards + (shard < n_sims % self.n_shards),
+                self.rngs[shard],
+                self.batch_size,
+            )
+            for shard in range(self.n_shards)
+        ]
+        self.rngs = [future.result() for future in futures]
+
+        # Reduce the shards' counters (sum() copies them out of shared memory)
+        self.result = SeasonSimulation(
+            shard_counters(self.shm_results, self.n_shards).sum(axis=0)
+        )
+
+
+def simulate_season(
+    games: list[Game],
+    teams: dict[str, Team],
+    n_sims: int = 100000,
+    seed: int | None = None,
+    batch_size: int = 5000,
+    workers: int = 1,
+    precision: float | None = None,
+    time_budget: float | None = None,
+    home_ice: float = 0.0,
+) -> SeasonSimulation:
+    """
+    Monte Carlo simulation of the rest of the season, in rounds of batches until the
+    stopping rule is met (see StoppingRule, n_sims is the maximum).
+    With more than one worker, the simulations are split across processes.
+    The regular season games' odds include home_ice (see Schedule).
+    """
+    schedule = Schedule(games, teams, home_ice)
+    stopping_rule = StoppingRule(n_sims, precision, time_budget)
+
+    workers = min(workers, -(-n_sims // batch_size))
+    runner: LocalRunner | PoolRunner = (
+        PoolRunner(schedule, seed, batch_size, workers)
+        if workers > 1
+        else LocalRunner(schedule, seed, batch_size)
+    )
+    with runner:
+        while not stopping_rule.is_done(runner.result):
+            runner.run(min(runner.round_size, n_sims - runner.result.n_sims))
+
+    return runner.result
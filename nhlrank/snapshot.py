@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:12:44 2026
+
+@author: shane
+Persists the processed state (games, rated teams) to disk, so repeated runs against
+the same CSV skip re-parsing and re-rating the whole season.
+"""
+import hashlib
+import os
+import pickle  # nosec: B403
+import tempfile
+from itertools import accumulate
+from typing import Any
+
+from nhlrank import CACHE_DIR, CLI_CONFIG, CSV_GAMES_FILE_PATH, __version__
+from nhlrank.ledger import Ledger
+from nhlrank.models import Game, Team
+from nhlrank.rating import RatingConfig
+
+# Bump this whenever the pickled layout of Game/Team (or the header) changes
+SNAPSHOT_FORMAT = 9
+
+# Store a rating checkpoint every N completed games (and at the last completed game)
+CHECKPOINT_INTERVAL = 128
+
+
+class Snapshot:
+    """
+    Processed state for one CSV file.
+    Besides the final games, teams & ledger, it keeps the raw rows that were ingested
+    and periodic checkpoints of the teams (pickled), so a changed CSV can resume
+    rating from the last checkpoint before its first added or corrected row.
+    """
+
+    def __init__(
+        self,
+        csv_hash: str,
+        rows: list[list[str]],
+        games: list[Game],
+        teams: dict[str, Team],
+        checkpoints: list[tuple[int, bytes]],
+        rating_key: str = str(),
+        ledger: Ledger | None = None,
+    ):
+        self.csv_hash = csv_hash
+        # Ratings depend on the rating config & period, see make_rating_key()
+        self.rating_key = rating_key
+        self.rows = rows
+        self.games = games
+        self.teams = teams
+        self.ledger = ledger if ledger is not None else Ledger()
+
+        # (number of rows already replayed, pickled teams at that point)
+        self.checkpoints = prune_checkpoints(checkpoints, games)
+
+    def first_changed_row(self, rows: list[list[str]]) -> int:
+        """Index of the first row which was added, removed, or corrected"""
+        for i, (row_old, row_new) in enumerate(zip(self.rows, rows)):
+            if row_old != row_new:
+                return i
+        return min(len(self.rows), len(rows))
+
+    def resume_point(
+        self, rows: list[list[str]]
+    ) -> tuple[int, dict[str, Team], list[tuple[int, bytes]], Ledger]:
+        """
+        Returns the row to resume rating from, the teams & ledger as of that row, and
+        the checkpoints which are still valid for the new rows.
+        """
+        first_changed = self.first_changed_row(rows)
+        checkpoints = [x for x in self.checkpoints if x[0] <= first_changed]
+        if not checkpoints:
+            return 0, {}, [], Ledger()
+
+        start, teams_pickled = checkpoints[-1]
+        teams = pickle.loads(teams_pickled)  # nosec: B301
+        # The ledger is in game order, so rows past the checkpoint are simply dropped
+        self.ledger.truncate(start)
+        return start, teams, checkpoints, self.ledger
+
+
+def prune_checkpoints(
+    checkpoints: list[tuple[int, bytes]], games: list[Game]
+) -> list[tuple[int, bytes]]:
+    """
+    Keeps the first checkpoint past each CHECKPOINT_INTERVAL completed games, and the
+    newest one (the last completed game's), dropping those left after the last
+    completed game by earlier runs, which would otherwise pile up one per run
+    """
+    n_completed = list(accumulate((game.is_completed for game in games), initial=0))
+    kept: list[tuple[int, bytes]] = []
+    interval_last = 0
+    for checkpoint in checkpoints[:-1]:
+        interval = n_completed[checkpoint[0]] // CHECKPOINT_INTERVAL
+        if interval > interval_last:
+            kept.append(checkpoint)
+            interval_last = interval
+    return kept + checkpoints[-1:]
+
+
+def csv_file_hash(csv_file_path: str = CSV_GAMES_FILE_PATH) -> str:
+    """Returns the SHA-256 content hash of the CSV file"""
+    _hash = hashlib.sha256()
+    with open(csv_file_path, "rb") as _file:
+        for chunk in iter(lambda: _file.read(1 << 16), b""):
+            _hash.update(chunk)
+    return _hash.hexdigest()
+
+
+def make_rating_key(config: RatingConfig, rating_period: str | None = None) -> str:
+    """Short key for a rating config & period (empty for the defaults)"""
+    # Home ice only applies to predictions, the ratings are the same without it
+    config = config._replace(home_ice=RatingConfig().home_ice)
+    if config == RatingConfig() and not rating_period:
+        return str()
+    return hashlib.sha256(repr((tuple(config), rating_period)).encode()).hexdigest()[
+        :12
+    ]
+
+
+def snapshot_path(
+    csv_file_path: str = CSV_GAMES_FILE_PATH, rating_key: str = str()
+) -> str:
+    """
+    Location on disk of the snapshot for a given CSV file (and rating config, so
+    switching between configs doesn't evict the default snapshot)
+    """
+    _name = os.path.splitext(os.path.basename(csv_file_path))[0]
+    if rating_key:
+        _name = f"{_name}-{rating_key}"
+    return os.path.join(CACHE_DIR, f"{_name}.pickle")
+
+
+def snapshot_header(csv_hash: str, rating_key: str = str()) -> dict[str, Any]:
+    """Key used to decide if a snapshot is still valid"""
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": __version__,
+        "csv_hash": csv_hash,
+        "rating_key": rating_key,
+    }
+
+
+def make_checkpoint(rows_replayed: int, teams: dict[str, Team]) -> tuple[int, bytes]:
+    """Freezes a copy of the teams, after replaying the first N rows"""
+    return rows_replayed, pickle.dumps(teams, pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(
+    csv_hash: str,
+    csv_file_path: str = CSV_GAMES_FILE_PATH,
+    allow_stale: bool = False,
+    rating_key: str = str(),
+) -> Snapshot | None:
+    """
+    Returns the snapshot if it matches the CSV hash and the package version,
+    otherwise None (the caller is expected to rebuild it).
+    With `allow_stale`, a snapshot for an older copy of the CSV is returned too
+    (e.g. to resume rating from one of its checkpoints).
+    """
+    _path = snapshot_path(csv_file_path, rating_key)
+    if not os.path.isfile(_path):
+        return None
+
+    try:
+        with open(_path, "rb") as _file:
+            # The header is stored first, so a stale snapshot is never fully loaded
+            header = pickle.load(_file)  # nosec: B301
+            expected_header = snapshot_header(csv_hash, rating_key)
+            if allow_stale:
+                header.pop("csv_hash", None)
+                expected_header.pop("csv_hash")
+            if header != expected_header:
+                if CLI_CONFIG.debug:
+                    print(f"Snapshot is stale, rebuilding: '{_path}'")
+                return None
+            _snapshot = pickle.load(_file)  # nosec: B301
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        if CLI_CONFIG.debug:
+            print(f"Snapshot is unreadable, rebuilding: '{_path}'")
+        return None
+
+    if CLI_CONFIG.debug:
+        print(f"Loaded snapshot: '{_path}'")
+    return _snapshot  # type: ignore
+
+
+def save_snapshot(
+    _snapshot: Snapshot,
+    csv_file_path: str = CSV_GAMES_FILE_PATH,
+) -> None:
+    """Writes the snapshot atomically (readers never see a half-written file)"""
+    _path = snapshot_path(csv_file_path, _snapshot.rating_key)
+    os.makedirs(os.path.dirname(_path), exist_ok=True)
+
+    _fd, _tmp_path = tempfile.mkstemp(dir=os.path.dirname(_path), suffix=".tmp")
+    try:
+        with os.fdopen(_fd, "wb") as _file:
+            pickle.dump(
+                snapshot_header(_snapshot.csv_hash, _snapshot.rating_key),
+                _file,
+                pickle.HIGHEST_PROTOCOL,
+            )
+            pickle.dump(_snapshot, _file, pickle.HIGHEST_PROTOCOL)
+        os.replace(_tmp_path, _path)
+    except OSError:
+        # Snapshots are only an optimization, don't fail the command over one
+        if os.path.exists(_tmp_path):
+            os.remove(_tmp_path)
+        if CLI_CONFIG.debug:
+            print(f"Failed to write snapshot: '{_path}'")
+        return
+
+    if CLI_CONFIG.debug:
+        print(f"Saved snapshot: '{_path}'")
@@ -5,15 +5,16 @@ Created on Mon Jan  1 13:23:14 2024
 
 @author: shane
 """
+import numpy as np
 from tabulate import tabulate
 
-from nhlrank import constants
-from nhlrank.models import Team
+from nhlrank.simulate import N_SEEDS, SeasonSimulation
+from nhlrank.stats import StatsTable
 from nhlrank.utils import print_subtitle, print_title
 
 
 def standings_all(
-    teams: list[Team],
+    table: StatsTable,
     rankings: list[int] | None = None,
 ) -> None:
     """Prints the standings"""
@@ -21,30 +22,31 @@ def standings_all(
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Create the table
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    columns = {name: column.tolist() for name, column in table.columns.items()}
     table_series_standings = [
         (
             rankings[i] if rankings else i + 1,
-            team.name,
-            team.games_played,
-            team.wins,
-            team.losses,
-            team.losses_ot,
-            team.points,
-            team.points_percentage,
-            team.rating_str.split()[0],
-            team.avg_opp or str(),
-            team.rating_max or str(),
-            team.rating_avg or str(),
-            team.best_win or str(),
-            team.goals_for,
-            team.goals_against,
-            "-".join(str(x) for x in team.record_home),
-            "-".join(str(x) for x in team.record_away),
-            "-".join(str(x) for x in team.shootout),
-            "-".join(str(x) for x in team.last_10),
-            team.streak,
+            columns["name"][i],
+            columns["games_played"][i],
+            columns["wins"][i],
+            columns["losses"][i],
+            columns["losses_ot"][i],
+            columns["points"][i],
+            columns["points_percentage"][i],
+            str(round(columns["rating"][i])),
+            columns["avg_opp"][i] or str(),
+            columns["rating_max"][i] or str(),
+            columns["rating_avg"][i] or str(),
+            columns["best_win"][i] or str(),
+            columns["goals_for"][i],
+            columns["goals_against"][i],
+            "-".join(str(x) for x in columns["record_home"][i]),
+            "-".join(str(x) for x in columns["record_away"][i]),
+            "-".join(str(x) for x in columns["shootout"][i]),
+            "-".join(str(x) for x in columns["last_10"][i]),
+            columns["streak"][i],
         )
-        for i, team in enumerate(teams)
+        for i in range(len(table))
     ]
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -79,114 +81,118 @@ def standings_all(
 
 
 def standings_by_conference(
-    teams: list[Team],
+    table: StatsTable,
 ) -> None:
     """Prints the standings by conference"""
 
-    for conf, divs in constants.conference_and_division_organization.items():
+    for conf, table_conf in table.groups("conference").items():
         print_title(conf)
-
-        teams_conf = [
-            team
-            for team in teams
-            # see: https://datagy.io/python-flatten-list-of-lists/
-            if team.abbrev in [t for div in divs.values() for t in div]
-        ]
-
-        standings_all(teams_conf)
+        standings_all(table_conf)
 
 
 def standings_by_division(
-    teams: list[Team],
+    table: StatsTable,
 ) -> None:
     """Prints the standings by division"""
 
-    for conf, divs in constants.conference_and_division_organization.items():
+    for conf, table_conf in table.groups("conference").items():
         print_title(conf)
 
         # Print the division standings
-        for div, team_abbrevs_div in divs.items():
+        for div, table_div in table_conf.groups("division").items():
             print_subtitle(div)
-            teams_div = [team for team in teams if team.abbrev in team_abbrevs_div]
-
-            standings_all(teams_div)
+            standings_all(table_div)
 
 
 def standings_by_wildcard(
-    teams: list[Team],
+    table: StatsTable,
     output_type: str = "standings",
+    simulation: SeasonSimulation | None = None,
 ) -> None:
     """Prints the standings by wildcard"""
 
-    for conf, divs in constants.conference_and_division_organization.items():
-        print_title(conf)
+    ratings_avg = table.group_mean("rating", "conference")
 
-        teams_conf = [
-            team
-            for team in teams
-            # see: https://datagy.io/python-flatten-list-of-lists/
-            if team.abbrev in [t for div in divs.values() for t in div]
-        ]
-        non_wildcard_teams = []
+    for conf, table_conf in table.groups("conference").items():
+        print_title(conf)
+        if output_type == "projections":
+            print(f"Average rating: {round(ratings_avg[conf])}")
 
-        # Pre-process the teams to get their rankings
-        for div, team_abbrevs_div in divs.items():
-            # Take the top 3 teams from each division
-            teams_div = [team for team in teams if team.abbrev in team_abbrevs_div][:3]
-            non_wildcard_teams.extend(teams_div)
+        # Take the top 3 teams from each division, ranked 1-6 by their standing
+        is_top = np.zeros(len(table_conf), dtype=bool)
+        for div in table_conf.groups("division"):
+            is_top[np.flatnonzero(table_conf["division"] == div)[:3]] = True
+        rankings_top = np.cumsum(is_top)
 
         # Print the non-wildcard teams
-        for div, team_abbrevs_div in divs.items():
+        for div in table_conf.groups("division"):
             print_subtitle(div)
-            teams_div = [team for team in teams if team.abbrev in team_abbrevs_div][:3]
-            teams_div_rankings = [
-                [x for x in teams_conf if x in non_wildcard_teams].index(_team) + 1
-                for _team in teams_div
-            ]
+            rows_div = np.flatnonzero(is_top & (table_conf["division"] == div))
+            table_div = table_conf.take(rows_div)
+            teams_div_rankings = rankings_top[rows_div].tolist()
 
             # Print the non-wildcard teams
             if output_type == "projections":
-                projections_all(teams_div, rankings=teams_div_rankings)
+                projections_all(
+                    table_div, rankings=teams_div_rankings, simulation=simulation
+                )
             elif output_type == "standings":
-                standings_all(teams_div, rankings=teams_div_rankings)
+                standings_all(table_div, rankings=teams_div_rankings)
 
         # Wildcards are the conference's top 2 remaining teams (7th and 8th place)
         print_subtitle("Wildcard")
-        wildcard_teams = [team for team in teams_conf if team not in non_wildcard_teams]
+        table_wildcard = table_conf.where(~is_top)
 
         # Print the wildcard teams
-        _rankings = list(range(7, len(wildcard_teams) + 7))
+        _rankings = list(range(7, len(table_wildcard) + 7))
         if output_type == "projections":
-            # TODO: show average rating in each conference (and other info) in this loop
-            projections_all(wildcard_teams, rankings=_rankings)
+            projections_all(table_wildcard, rankings=_rankings, simulation=simulation)
         elif output_type == "standings":
-            standings_all(wildcard_teams, rankings=_rankings)
+            standings_all(table_wildcard, rankings=_rankings)
 
 
 def projections_all(
-    teams: list[Team],
+    table: StatsTable,
     rankings: list[int] | None = None,
+    simulation: SeasonSimulation | None = None,
 ) -> None:
-    """Prints the projections"""
+    """Prints the projections (and playoff odds, if the season was simulated)"""
+
+    def odds_str(odds: float, error: float) -> str:
+        """Probability as a percentage, with its error bars (95% confidence)"""
+        return f"{round(100 * odds, 1)}% ±{round(100 * error, 1)}"
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Create the table
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    names = table["name"].tolist()
+    simulated_records = table["simulated_record"].tolist()
+    ratings = table["rating"].tolist()
+    # Odds & their error bars, for making the playoffs, the division & Presidents'
+    odds = [
+        (
+            getattr(simulation, f"odds_{x}")[table["id"]].tolist(),
+            getattr(simulation, f"error_{x}")[table["id"]].tolist(),
+        )
+        for x in ("playoffs", "division", "presidents")
+        if simulation
+    ]
     table_series_projections = [
         (
             rankings[i] if rankings else i + 1,
-            team.name,
-            round(team.simulated_record),
-            round(82 - team.simulated_record),
-            round(2 * team.simulated_record, 1),
-            round(team.simulated_record / 82, 3),
-            team.rating_str.split()[0],
+            names[i],
+            round(simulated_records[i]),
+            round(82 - simulated_records[i]),
+            round(2 * simulated_records[i], 1),
+            round(simulated_records[i] / 82, 3),
+            str(round(ratings[i])),
             # team.goals_for,
             # team.goals_against,
             # "-".join(str(x) for x in team.record_home),
             # "-".join(str(x) for x in team.record_away),
         )
-        for i, team in enumerate(teams)
+        + tuple(odds_str(x[i], error[i]) for x, error in odds)
+        for i in range(len(table))
     ]
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -206,6 +212,59 @@ def projections_all(
             # "GA",
             # "Home",
             # "Away",
-        ],
+        ]
+        + (["Playoffs", "Div", "Pres"] if simulation else []),
+    )
+    print(_table)
+
+
+def projections_seeds(
+    table: StatsTable,
+    simulation: SeasonSimulation,
+) -> None:
+    """Prints the odds of finishing at each playoff seed (within the conference)"""
+
+    odds_seeds = simulation.odds_seeds[table["id"]]
+    table_series_seeds = [
+        (i + 1, name)
+        + tuple(round(100 * x, 1) or str() for x in odds[1:])
+        + (round(100 * odds[0], 1) or str(),)
+        for i, (name, odds) in enumerate(zip(table["name"].tolist(), odds_seeds))
+    ]
+    _table = tabulate(
+        table_series_seeds,
+        headers=["#", "Team"] + [str(x) for x in range(1, N_SEEDS + 1)] + ["Out"],
     )
     print(_table)
+
+
+def playoffs_rounds(
+    table: StatsTable,
+    simulation: SeasonSimulation,
+) -> None:
+    """Prints the odds of making the playoffs, and winning each round (by conference)"""
+
+    for conf, table_conf in table.groups("conference").items():
+        print_subtitle(conf)
+        # Furthest round won most often first, then the next furthest, ...
+        ids = table_conf["id"]
+        table_conf = table_conf.sorted_by(
+            np.column_stack((simulation.rounds[ids, ::-1], simulation.playoffs[ids]))
+        )
+
+        table_series_rounds = [
+            (
+                i + 1,
+                name,
+                round(100 * simulation.odds_playoffs[team_id], 1) or str(),
+            )
+            + tuple(round(100 * x, 1) or str() for x in simulation.odds_rounds[team_id])
+            for i, (name, team_id) in enumerate(
+                zip(table_conf["name"].tolist(), table_conf["id"].tolist())
+            )
+        ]
+        _table = tabulate(
+            table_series_rounds,
+            headers=["#", "Team", "Playoffs", "Round 2", "Conf Final", "Final", "Cup"],
+        )
+        print(_table)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:03:51 2026
+
+@author: shane
+Columnar table of the league's stats, one row per team, built once from the teams
+(each property computed once), then sorted, filtered & grouped as array operations.
+"""
+from operator import attrgetter
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from nhlrank import constants
+from nhlrank.ledger import Ledger
+from nhlrank.models import Team
+from nhlrank.window import GameOrDate, WindowIndex
+
+# Conference & division of each team (by abbreviation), in the league's order
+CONFERENCE_OF = {
+    abbrev: conf
+    for conf, divs in constants.conference_and_division_organization.items()
+    for abbrevs in divs.values()
+    for abbrev in abbrevs
+}
+DIVISION_OF = {
+    abbrev: div
+    for divs in constants.conference_and_division_organization.values()
+    for div, abbrevs in divs.items()
+    for abbrev in abbrevs
+}
+GROUPS = {
+    "conference": list(constants.conference_and_division_organization),
+    "division": [
+        div
+        for divs in constants.conference_and_division_organization.values()
+        for div in divs
+    ],
+}
+
+
+def integer_getter(name: str) -> Callable[[Team], int]:
+    """Reads a stat off a team as an integer (e.g. ratings already rounded, or 0)"""
+    return lambda team: int(getattr(team, name))
+
+
+class StatsTable:
+    """
+    The teams' stats as columns (arrays, one row per team, in the teams' order).
+    Multi-valued stats, e.g. the home record (W-L-OTL), are 2-D columns.
+    """
+
+    __slots__ = ("teams", "columns")
+
+    # Columns, and how each is read off a team
+    COLUMNS: dict[str, Callable[[Team], Any]] = {
+        **{
+            x: attrgetter(x)
+            for x in (
+                "id",
+                "name",
+                "abbrev",
+                "games_played",
+                *Ledger.RECORD,
+                "points",
+                "points_percentage",
+                "regulation_wins",
+                "regulation_overtime_wins",
+                "goals_for",
+                "goals_against",
+                "record_home",
+                "record_away",
+                "shootout",
+                "last_10",
+                "streak",
+                "simulated_record",
+            )
+        },
+        "rating": lambda x: x.rating.mu,
+        "rating_home": lambda x: x.rating_home.mu,
+        "rating_away": lambda x: x.rating_away.mu,
+        **{
+            x: integer_getter(x)
+            for x in ("rating_max", "rating_avg", "avg_opp", "best_win")
+        },
+        "conference": lambda x: CONFERENCE_OF[x.abbrev],
+        "division": lambda x: DIVISION_OF[x.abbrev],
+    }
+
+    # Columns to sort by (e.g. stand -s COLUMN)
+    SORT_COLUMNS = [x for x in COLUMNS if x not in {"id", "name", *GROUPS}]
+
+    def __init__(
+        self, teams: Iterable[Team], columns: dict[str, np.ndarray] | None = None
+    ):
+        self.teams = list(teams)
+        self.columns = (
+            columns
+            if columns is not None
+            else {
+                name: np.array([get(team) for team in self.teams])
+                for name, get in self.COLUMNS.items()
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def take(self, rows: np.ndarray) -> "StatsTable":
+        """The table, with just the given rows (in that order)"""
+        return StatsTable(
+            [self.teams[i] for i in rows.tolist()],
+            {name: column[rows] for name, column in self.columns.items()},
+        )
+
+    def where(self, mask: np.ndarray) -> "StatsTable":
+        """The rows where the mask is true"""
+        return self.take(np.flatnonzero(mask))
+
+    def sorted_by(self, key: str | np.ndarray) -> "StatsTable":
+        """
+        The rows sorted by a column (or any array of keys, one per row), highest
+        first, with ties keeping their order (same as sorted(..., reverse=True)),
+        2-D columns sort lexicographically
+        """
+        # NOTE: a stable sort of the reversed rows, reversed, keeps the ties' order
+        column = (self.columns[key] if isinstance(key, str) else key)[::-1]
+        order = (
+            np.lexsort(column.T[::-1])
+            if column.ndim > 1
+            else np.argsort(column, kind="stable")
+        )
+        return self.take(len(self) - 1 - order[::-1])
+
+    def over_window(
+        self,
+        windows: WindowIndex,
+        first: GameOrDate | None = None,
+        last: GameOrDate | None = None,
+    ) -> "StatsTable":
+        """
+        The table, with the standings & average ratings over a range of each team's
+        games (game numbers or dates, see WindowIndex.bounds), the rest as is
+        """
+        totals, rating_avg, avg_opp = [], [], []
+        for team_id in self.columns["id"].tolist():
+            start, stop = windows.bounds(team_id, first, last)
+            totals.append(
+                [stop - start, *windows.totals(team_id, start, stop).values()]
+            )
+            rating_avg.append(windows.rating_avg(team_id, start, stop))
+            avg_opp.append(windows.avg_opp(team_id, start, stop))
+
+        columns = dict(
+            zip(("games_played", *Ledger.TOTALS), np.array(totals, dtype=int).T)
+        )
+        points = 2 * columns["wins"] + columns["losses_ot"]
+        games_played = columns["games_played"]
+        return StatsTable(
+            self.teams,
+            {
+                **self.columns,
+                **{
+                    x: columns[x]
+                    for x in (
+                        "games_played",
+                        *Ledger.RECORD,
+                        "regulation_wins",
+                        "regulation_overtime_wins",
+                        "goals_for",
+                        "goals_against",
+                    )
+                },
+                "points": points,
+                "points_percentage": np.round(
+                    np.divide(
+                        points,
+                        2 * games_played,
+                        out=np.zeros(len(self)),
+                        where=games_played > 0,
+                    ),
+                    3,
+                ),
+                "record_home": np.column_stack(
+                    [columns[f"home_{x}"] for x in Ledger.RECORD]
+                ),
+                "record_away": np.column_stack(
+                    [columns[f"away_{x}"] for x in Ledger.RECORD]
+                ),
+                "shootout": np.column_stack(
+                    (columns["shootout_wins"], columns["shootout_losses"])
+                ),
+                "rating_avg": np.array(rating_avg, dtype=int),
+                "avg_opp": np.array(avg_opp, dtype=int),
+            },
+        )
+
+    def groups(self, by: str) -> dict[str, "StatsTable"]:
+        """The rows by conference or division (in the league's order, if any)"""
+        return {
+            name: self.where(self.columns[by] == name)
+            for name in GROUPS[by]
+            if (self.columns[by] == name).any()
+        }
+
+    def group_mean(self, name: str, by: str) -> dict[str, float]:
+        """Average of a column, by conference or division"""
+        groups, codes = np.unique(self.columns[by], return_inverse=True)
+        means = np.bincount(codes, weights=self.columns[name]) / np.bincount(codes)
+        return dict(zip(groups.tolist(), means.tolist()))
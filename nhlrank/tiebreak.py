@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:14:27 2026
+
+@author: shane
+NHL standings order: points, then the tiebreakers, in order
+  1. points percentage (fewer games played)
+  2. regulation wins (RW)
+  3. regulation & overtime wins (ROW)
+  4. wins
+  5. head-to-head points among the tied teams (not counting the "odd" games)
+  6. goal differential
+  7. goals for
+https://www.espn.com/nhl/news/story?page=nhl/tiebreakers
+
+Points and the first four are packed into one integer key per team, so ordering is
+a single sort (also vectorized over many simulated seasons at once), and the
+head-to-head table only comes into play for the teams still tied on it.
+"""
+from typing import Iterable
+
+import numpy as np
+
+from nhlrank.ledger import pair_key
+from nhlrank.models import TEAM_NAMES, Game, Team
+
+N_TEAMS = len(TEAM_NAMES)
+
+# Bits per packed tiebreaker (up to 127, e.g. wins), points get the rest
+FIELD_BITS = 7
+MAX_GAMES = 2**FIELD_BITS - 1
+
+# Stats packed into the keys, in order (see tiebreak_keys)
+KEY_STATS = (
+    "points",
+    "games_played",
+    "regulation_wins",
+    "regulation_overtime_wins",
+    "wins",
+)
+
+# Head-to-head points percentage, quantized to pack below the keys (simulations)
+HEAD_TO_HEAD_BITS = 12
+
+
+def tiebreak_keys(
+    points: np.ndarray,
+    games_played: np.ndarray,
+    regulation_wins: np.ndarray,
+    regulation_overtime_wins: np.ndarray,
+    wins: np.ndarray,
+) -> np.ndarray:
+    """
+    Packs points & the tiebreakers 1-4 into one int64 key per team (arrays of any
+    shape, e.g. (sims, teams)), the higher key is ahead in the standings
+    """
+    keys = np.asarray(points, dtype=np.int64)
+    for field in (
+        MAX_GAMES - np.asarray(games_played),
+        regulation_wins,
+        regulation_overtime_wins,
+        wins,
+    ):
+        keys = (keys << FIELD_BITS) + np.asarray(field, dtype=np.int64)
+    return keys
+
+
+def team_keys(teams: list[Team]) -> np.ndarray:
+    """Packed keys (see tiebreak_keys) for the teams' current standings"""
+    return tiebreak_keys(
+        *(np.array([getattr(team, x) for team in teams]) for x in KEY_STATS)
+    )
+
+
+def game_points(game: Game) -> tuple[int, int]:
+    """Standings points (home, away) earned in a completed game"""
+    points_loser = 1 if game.is_overtime else 0
+    if game.score_home > game.score_away:
+        return 2, points_loser
+    return points_loser, 2
+
+
+class HeadToHeadTable:
+    """
+    Head-to-head points between every pair of teams, indexed by (team ID, opponent
+    ID), over the games that count: if two teams don't host each other equally
+    often, the first game in the city with the extra home game is left out.
+      points[i, j]:      points team i earned against team j, in completed games
+      games[i, j]:       completed games (that count) between them
+      games_total[i, j]: games (that count) between them, over the whole season
+    Built in one pass over the season's games (completed & scheduled).
+    """
+
+    __slots__ = ("points", "games", "games_total", "is_counted")
+
+    def __init__(self, games: list[Game]):
+        self.points = np.zeros((N_TEAMS, N_TEAMS), dtype=np.int64)
+        self.games = np.zeros((N_TEAMS, N_TEAMS), dtype=np.int64)
+        self.games_total = np.zeros((N_TEAMS, N_TEAMS), dtype=np.int64)
+        # By game index (in the CSV), is the game counted
+        self.is_counted = np.ones(
+            max((game.index for game in games), default=-1) + 1, dtype=bool
+        )
+
+        games_by_pair: dict[tuple[int, int], list[Game]] = {}
+        for game in games:
+            games_by_pair.setdefault(pair_key(game.id_home, game.id_away), []).append(
+                game
+            )
+
+        for (id_a, id_b), games_pair in games_by_pair.items():
+            # The "odd" game
+            n_home_a = sum(1 for game in games_pair if game.id_home == id_a)
+            if 2 * n_home_a != len(games_pair):
+                id_extra = id_a if 2 * n_home_a > len(games_pair) else id_b
+                game_odd = next(x for x in games_pair if x.id_home == id_extra)
+                self.is_counted[game_odd.index] = False
+
+            for game in games_pair:
+                if not self.is_counted[game.index]:
+                    continue
+                self.games_total[[id_a, id_b], [id_b, id_a]] += 1
+                if game.is_completed:
+                    self.games[[id_a, id_b], [id_b, id_a]] += 1
+                    points_home, points_away = game_points(game)
+                    self.points[game.id_home, game.id_away] += points_home
+                    self.points[game.id_away, game.id_home] += points_away
+
+    def points_percentage(self, team_id: int, ids_tied: list[int]) -> float:
+        """Share of the points available a team earned against the other tied teams"""
+        games = int(self.games[team_id, ids_tied].sum())
+        if not games:
+            return 0.0
+        return int(self.points[team_id, ids_tied].sum()) / (2 * games)
+
+
+def standings_order(
+    teams: Iterable[Team], head_to_head: HeadToHeadTable | None = None
+) -> list[Team]:
+    """
+    The teams, in NHL standings order (see the tiebreakers above).
+    Without a head-to-head table that tiebreaker is skipped, and teams still tied
+    after goals for keep their order.
+    """
+    teams = list(teams)
+
+    def resolve(teams_tied: list[Team]) -> list[Team]:
+        """Orders teams tied on the packed key, by tiebreakers 5-7"""
+        ids_tied = [team.id for team in teams_tied]
+        return sorted(
+            teams_tied,
+            key=lambda x: (
+                head_to_head.points_percentage(x.id, ids_tied) if head_to_head else 0,
+                x.goals_for - x.goals_against,
+                x.goals_for,
+            ),
+            reverse=True,
+        )
+
+    teams_by_key: dict[int, list[Team]] = {}
+    for team, key in zip(teams, team_keys(teams).tolist()):
+        teams_by_key.setdefault(key, []).append(team)
+
+    return [
+        team
+        for key in sorted(teams_by_key, reverse=True)
+        for team in (
+            resolve(teams_by_key[key])
+            if len(teams_by_key[key]) > 1
+            else teams_by_key[key]
+        )
+    ]
+
+
+def tied_pairs(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (sim, team ID, opponent ID) indexes of every (ordered) pair of teams tied on
+    their keys, (sims, teams), e.g. to look up their head-to-head points.
+    Tied teams are adjacent once sorted, so only a few offsets are compared, and
+    only in the sims with a tie.
+    """
+    keys_sorted = np.sort(keys, axis=1)
+    sims_tied = np.flatnonzero((keys_sorted[:, 1:] == keys_sorted[:, :-1]).any(axis=1))
+    order = np.argsort(keys[sims_tied], axis=1)
+    keys_sorted = np.take_along_axis(keys[sims_tied], order, axis=1)
+
+    pairs = [(np.empty(0, dtype=np.intp),) * 3]
+    for offset in range(1, keys.shape[1]):
+        rows, positions = np.nonzero(
+            keys_sorted[:, offset:] == keys_sorted[:, :-offset]
+        )
+        if not rows.size:
+            break
+        ids, ids_opponent = order[rows, positions], order[rows, positions + offset]
+        pairs += [
+            (sims_tied[rows], ids, ids_opponent),
+            (sims_tied[rows], ids_opponent, ids),
+        ]
+    return tuple(np.concatenate(x) for x in zip(*pairs))  # type: ignore
+
+
+def with_head_to_head(
+    keys: np.ndarray,
+    tied: tuple[np.ndarray, np.ndarray, np.ndarray],
+    points: np.ndarray,
+    games: np.ndarray,
+) -> np.ndarray:
+    """
+    The keys (sims, teams), with each team's head-to-head points percentage against
+    the teams it's tied with packed below them (quantized, 0 if untied), from the
+    points earned & games counted between each of the tied pairs (see tied_pairs)
+    """
+    sims, ids, _ = tied
+    cells = sims * keys.shape[1] + ids
+    points_tied = np.bincount(cells, weights=points, minlength=keys.size)
+    games_tied = np.bincount(cells, weights=games, minlength=keys.size)
+    percentage = np.divide(
+        points_tied,
+        2 * games_tied,
+        out=np.zeros(keys.size),
+        where=games_tied > 0,
+    )
+    return (keys << HEAD_TO_HEAD_BITS) + np.round(  # type: ignore
+        percentage * (2**HEAD_TO_HEAD_BITS - 1)
+    ).astype(np.int64).reshape(keys.shape)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:18 2026
+
+@author: shane
+Every team's standings, rating & division rank at the end of each game day, built
+in one sweep over the ledger's running totals (for charts, e.g. a points race).
+"""
+import contextlib
+import csv
+import json
+import sys
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+from nhlrank.ledger import Ledger
+from nhlrank.models import Team
+from nhlrank.simulate import DIVISIONS
+from nhlrank.tiebreak import tiebreak_keys
+
+SERIES_FORMATS = ("csv", "ndjson")
+
+SERIES_HEADERS = [
+    "date",
+    "team",
+    "games_played",
+    "wins",
+    "losses",
+    "losses_ot",
+    "points",
+    "points_percentage",
+    "goal_differential",
+    "rating",
+    "division_rank",
+]
+
+
+class StandingsSeries(NamedTuple):
+    """(days, teams) arrays, for each game day (and team, in the teams' order)"""
+
+    dates: list[date]
+    teams: list[Team]
+    totals: np.ndarray  # (days, teams, len(Ledger.TOTALS)), running totals
+    ratings: np.ndarray  # (days, teams), mu
+    division_ranks: np.ndarray  # (days, teams), 1 for the division leader
+
+    def column(self, name: str) -> np.ndarray:
+        """(days, teams) array of one of the running totals, see Ledger.TOTALS"""
+        return self.totals[..., Ledger.TOTALS.index(name)]
+
+    @property
+    def games_played(self) -> np.ndarray:
+        """Games played"""
+        return (  # type: ignore
+            self.column("wins") + self.column("losses") + self.column("losses_ot")
+        )
+
+    @property
+    def points(self) -> np.ndarray:
+        """Points"""
+        return 2 * self.column("wins") + self.column("losses_ot")  # type: ignore
+
+    @property
+    def goal_differential(self) -> np.ndarray:
+        """Goals for, minus goals against"""
+        return self.column("goals_for") - self.column("goals_against")  # type: ignore
+
+
+def division_ranks(
+    team_ids: np.ndarray,
+    keys: np.ndarray,
+    goal_differential: np.ndarray,
+    goals_for: np.ndarray,
+) -> np.ndarray:
+    """
+    Rank within the division, on each day, (days, teams), on the same tiebreakers as
+    func_standings() (packed keys, see tiebreak_keys), except head-to-head points
+    (ties after goals for keep the teams' order, same as its stable sort)
+    """
+    ranks = np.zeros(keys.shape, dtype=np.intp)
+    for divs in DIVISIONS.values():
+        for ids_div in divs.values():
+            columns = np.flatnonzero(np.isin(team_ids, ids_div))
+            # Last key is the primary key, all ascending (so most points first)
+            order = np.lexsort(
+                (
+                    -goals_for[:, columns],
+                    -goal_differential[:, columns],
+                    -keys[:, columns],
+                ),
+                axis=-1,
+            )
+            ranks_div = np.empty_like(order)
+            np.put_along_axis(
+                ranks_div,
+                order,
+                np.broadcast_to(np.arange(1, len(columns) + 1), order.shape),
+                axis=1,
+            )
+            ranks[:, columns] = ranks_div
+    return ranks
+
+
+def standings_series(teams: dict[str, Team], ledger: Ledger) -> StandingsSeries:
+    """
+    The standings as of each game day, O(days × teams): each team's running totals
+    & ratings are looked up by its number of games played by then (bisection).
+    """
+    days = np.unique(ledger.dates)
+    team_list = list(teams.values())
+
+    totals = np.zeros((len(days), len(team_list), len(Ledger.TOTALS)), dtype=np.int32)
+    ratings = np.empty((len(days), len(team_list)))
+    for j, team in enumerate(team_list):
+        n_games = np.searchsorted(
+            ledger.dates[ledger.team_rows(team.id)], days, side="right"
+        )
+        # Prepended with the totals & rating from before the team's first game
+        history = ledger.team_totals_history(team.id)
+        totals[:, j] = np.concatenate((np.zeros((1, len(Ledger.TOTALS))), history))[
+            n_games
+        ]
+        mu = ledger.team_ratings(team.id)[:, Ledger.MU]
+        ratings[:, j] = np.concatenate((team.ratings.mu[:1], mu))[n_games]
+
+    series = StandingsSeries(
+        dates=[date.fromordinal(x) for x in days.tolist()],
+        teams=team_list,
+        totals=totals,
+        ratings=ratings,
+        division_ranks=np.empty(0),
+    )
+    return series._replace(
+        division_ranks=division_ranks(
+            np.array([team.id for team in team_list]),
+            tiebreak_keys(
+                series.points,
+                series.games_played,
+                series.column("regulation_wins"),
+                series.column("regulation_overtime_wins"),
+                series.column("wins"),
+            ),
+            series.goal_differential,
+            series.column("goals_for"),
+        )
+    )
+
+
+def series_rows(series: StandingsSeries) -> list[list]:
+    """One row per day & team (teams sorted by name), see SERIES_HEADERS"""
+    games_played, points = series.games_played.tolist(), series.points.tolist()
+    wins, losses, losses_ot = (
+        series.column(x).tolist() for x in ("wins", "losses", "losses_ot")
+    )
+    goal_differential = series.goal_differential.tolist()
+    ratings = np.round(series.ratings, 1).tolist()
+    ranks = series.division_ranks.tolist()
+
+    columns = sorted(range(len(series.teams)), key=lambda j: series.teams[j].name)
+    return [
+        [
+            date_at.isoformat(),
+            series.teams[j].abbrev,
+            games_played[i][j],
+            wins[i][j],
+            losses[i][j],
+            losses_ot[i][j],
+            points[i][j],
+            round(points[i][j] / (2 * games_played[i][j]), 3)
+            if games_played[i][j]
+            else 0.0,
+            goal_differential[i][j],
+            ratings[i][j],
+            ranks[i][j],
+        ]
+        for i, date_at in enumerate(series.dates)
+        for j in columns
+    ]
+
+
+def write_series(
+    series: StandingsSeries,
+    output_path: str | None = None,
+    output_format: str = "csv",
+) -> int:
+    """Writes the series as CSV or NDJSON (to stdout, without a path), returns rows"""
+    rows = series_rows(series)
+
+    with contextlib.ExitStack() as stack:
+        file = (
+            stack.enter_context(open(output_path, "w", encoding="utf-8", newline=""))
+            if output_path
+            else sys.stdout
+        )
+        if output_format == "ndjson":
+            file.writelines(
+                json.dumps(dict(zip(SERIES_HEADERS, row))) + "\n" for row in rows
+            )
+        else:
+            writer = csv.writer(file)
+            writer.writerow(SERIES_HEADERS)
+            writer.writerows(rows)
+
+    return len(rows)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:12:35 2026
+
+@author: shane
+Searches the rating parameters for the lowest walk-forward log-loss (the backtest's
+predictions), over one or more seasons. Candidates are scored in batches, each a
+single vectorized replay (see rating.replay_configs), spread over a process pool.
+"""
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator
+
+import numpy as np
+
+from nhlrank.backtest import ODDS_EPSILON
+from nhlrank.rating import GameArrays, RatingConfig, replay_configs
+
+# Values tried for each parameter (grid & coordinate search), random search samples
+# uniformly between the smallest & largest
+PARAMETER_GRIDS: dict[str, tuple[float, ...]] = {
+    "tau": (0.2, 0.4, 0.6, 0.8, 1.0, 1.2),
+    "phi": (150.0, 200.0, 250.0, 300.0, 350.0, 400.0),
+    "otl_factor": (0.1, 0.25, 0.5, 0.75, 1.0),
+    "home_ice": (0.0, 10.0, 20.0, 30.0, 40.0),
+}
+
+SEARCHES = ("grid", "random", "coordinate")
+
+# Candidates scored together, in one replay (memory grows with it)
+BATCH_SIZE = 100
+
+# Coordinate search gives up after this many passes over the parameters
+MAX_ROUNDS = 10
+
+
+def log_loss(seasons: list[GameArrays], configs: list[RatingConfig]) -> np.ndarray:
+    """Walk-forward log-loss for each config, averaged over all the seasons' games"""
+    loss_sum = np.zeros(len(configs))
+    n_games = 0
+    for games in seasons:
+        odds_home = np.empty((len(configs), len(games)))
+        replay_configs(games, configs, odds_home)
+        odds_home = np.clip(odds_home, ODDS_EPSILON, 1 - ODDS_EPSILON)
+        loss_sum -= np.where(
+            games.is_home_win, np.log(odds_home), np.log(1 - odds_home)
+        ).sum(axis=1)
+        n_games += len(games)
+    return loss_sum / max(n_games, 1)
+
+
+# A worker's seasons, sent once (as the pool starts) and reused by every batch
+_SEASONS: list[GameArrays] = []
+
+
+def init_worker(seasons: list[GameArrays]) -> None:
+    """Process pool initializer"""
+    _SEASONS[:] = seasons
+
+
+def log_loss_worker(configs: list[RatingConfig]) -> np.ndarray:
+    """log_loss(), on the worker's seasons"""
+    return log_loss(_SEASONS, configs)
+
+
+class Evaluator:
+    """
+    Scores candidate configs, each only once, in batches (over a process pool, with
+    multiple workers). The scores so far make up the loss surface.
+    """
+
+    def __init__(self, seasons: list[GameArrays], workers: int = 1):
+        self.seasons = seasons
+        self.workers = workers
+        self.losses: dict[RatingConfig, float] = {}
+        self.executor = (
+            ProcessPoolExecutor(workers, initializer=init_worker, initargs=(seasons,))
+            if workers > 1
+            else None
+        )
+
+    def __enter__(self) -> "Evaluator":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self.executor:
+            self.executor.shutdown()
+
+    def evaluate(self, configs: list[RatingConfig]) -> list[float]:
+        """Log-loss for each config"""
+        configs_new = [x for x in dict.fromkeys(configs) if x not in self.losses]
+        if configs_new:
+            # At least one batch per worker
+            n_batches = max(
+                min(self.workers, len(configs_new)),
+                math.ceil(len(configs_new) / BATCH_SIZE),
+            )
+            batches = [configs_new[i::n_batches] for i in range(n_batches)]
+            results: Iterator[np.ndarray] = (
+                self.executor.map(log_loss_worker, batches)
+                if self.executor
+                else (log_loss(self.seasons, x) for x in batches)
+            )
+            for batch, losses in zip(batches, results):
+                self.losses.update(zip(batch, losses.tolist()))
+
+        return [self.losses[x] for x in configs]
+
+
+def with_parameters(base: RatingConfig, parameters: dict[str, Any]) -> RatingConfig:
+    """A candidate, the base config with some parameters replaced"""
+    return base._replace(**parameters)
+
+
+def search_grid(
+    evaluator: Evaluator, base: RatingConfig, grids: dict[str, tuple[float, ...]]
+) -> None:
+    """Every combination of the parameters' values"""
+    evaluator.evaluate(
+        [
+            with_parameters(base, dict(zip(grids, values)))
+            for values in itertools.product(*grids.values())
+        ]
+    )
+
+
+def search_random(
+    evaluator: Evaluator,
+    base: RatingConfig,
+    grids: dict[str, tuple[float, ...]],
+    n_candidates: int,
+    seed: int | None = None,
+) -> None:
+    """Candidates sampled uniformly, between each parameter's lowest & highest value"""
+    rng = np.random.default_rng(seed)
+    evaluator.evaluate(
+        [
+            with_parameters(
+                base,
+                {
+                    name: float(rng.uniform(min(values), max(values)))
+                    for name, values in grids.items()
+                },
+            )
+            for _ in range(n_candidates)
+        ]
+    )
+
+
+def search_coordinate(
+    evaluator: Evaluator, base: RatingConfig, grids: dict[str, tuple[float, ...]]
+) -> None:
+    """
+    Tries each value of one parameter at a time (the others held at the best so
+    far), and moves to the best, until a whole pass over the parameters doesn't help
+    """
+    best, loss_best = base, evaluator.evaluate([base])[0]
+    for _ in range(MAX_ROUNDS):
+        improved = False
+        for name, values in grids.items():
+            candidates = [with_parameters(best, {name: x}) for x in values]
+            losses = evaluator.evaluate(candidates)
+            i = int(np.argmin(losses))
+            if losses[i] < loss_best:
+                best, loss_best = candidates[i], losses[i]
+                improved = True
+        if not improved:
+            break
+
+
+def tune(
+    seasons: list[GameArrays],
+    base: RatingConfig = RatingConfig(),
+    search: str = "grid",
+    grids: dict[str, tuple[float, ...]] | None = None,
+    n_candidates: int = 100,
+    seed: int | None = None,
+    workers: int = 1,
+) -> dict[RatingConfig, float]:
+    """
+    Searches the parameters (grids, default: PARAMETER_GRIDS) around a base config.
+    Returns the loss surface, the log-loss of every config tried (base included).
+    """
+    grids = grids or PARAMETER_GRIDS
+    with Evaluator(seasons, workers) as evaluator:
+        evaluator.evaluate([base])
+        if search == "grid":
+            search_grid(evaluator, base, grids)
+        elif search == "random":
+            search_random(evaluator, base, grids, n_candidates, seed)
+        elif search == "coordinate":
+            search_coordinate(evaluator, base, grids)
+        else:
+            raise ValueError(f"Unknown search: '{search}', see: {SEARCHES}")
+        return evaluator.losses
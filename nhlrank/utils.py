@@ -6,15 +6,18 @@ Created on Wed Feb  8 15:22:46 2023
 """
 import os
 
+from nhlrank.glicko2 import glicko2
 from nhlrank.models import Team
 
 
-def get_or_create_team_by_name(teams: dict[str, Team], name: str) -> Team:
+def get_or_create_team_by_name(
+    teams: dict[str, Team], name: str, rating_initial: glicko2.Rating | None = None
+) -> Team:
     """Adds a player"""
     if name in teams:
         return teams[name]
 
-    _team = Team(name)
+    _team = Team(name, rating_initial)
     teams[name] = _team
     return _team
 
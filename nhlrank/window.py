@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:41:08 2026
+
+@author: shane
+Per-team prefix sums over each team's games (built from the ledger): standings
+totals, ratings & opponents' ratings, so the record, goals or average rating over
+any range of games (e.g. games 10-20, or since Dec 1) is O(1), as are rolling
+averages (e.g. a 10-game rolling rating) per game.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from nhlrank import DEVIATION_PROVISIONAL
+from nhlrank.ledger import Ledger
+from nhlrank.models import TEAM_NAMES
+
+# A game, by number (1 for a team's first) or by date
+GameOrDate = int | date
+
+
+class WindowIndex:
+    """
+    Each team's running totals (see Ledger.TOTALS) and running sums of its rating
+    after each game, its non-provisional ratings (& their count), and its opponents'
+    ratings going in, one row per game (row 0 is before its first game).
+    Windows are [start:stop] over a team's games (0 for its first), like slicing.
+    """
+
+    __slots__ = ("ledger", "_totals", "_ratings")
+
+    # Running sums of the ratings, in order
+    MU, MU_NON_PROVISIONAL, N_NON_PROVISIONAL, MU_OPPONENT = range(4)
+
+    def __init__(self, ledger: Ledger):
+        self.ledger = ledger
+        self._totals: list[np.ndarray] = []
+        self._ratings: list[np.ndarray] = []
+
+        for team_id in range(len(TEAM_NAMES)):
+            totals = ledger.team_totals_history(team_id).astype(np.int64)
+            mu, phi = ledger.team_ratings(team_id).T
+            is_non_provisional = phi < DEVIATION_PROVISIONAL
+            ratings = np.column_stack(
+                (
+                    mu,
+                    np.where(is_non_provisional, mu, 0.0),
+                    is_non_provisional,
+                    ledger.team_ratings(team_id, post=False, opponent=True)[
+                        :, Ledger.MU
+                    ],
+                )
+            )
+            # NOTE: the totals are already running (prefix) sums
+            self._totals.append(
+                np.vstack((np.zeros((1, len(Ledger.TOTALS)), dtype=np.int64), totals))
+            )
+            self._ratings.append(
+                np.vstack((np.zeros((1, 4)), np.cumsum(ratings, axis=0)))
+            )
+
+    def n_games(self, team_id: int) -> int:
+        """Number of games a team played"""
+        return len(self._totals[team_id]) - 1
+
+    def bounds(
+        self,
+        team_id: int,
+        first: GameOrDate | None = None,
+        last: GameOrDate | None = None,
+    ) -> tuple[int, int]:
+        """
+        [start:stop] of a team's games, from the first to the last (both included),
+        each a game number or a date (None for the start or end of the season)
+        """
+        if isinstance(first, date):
+            start = self.ledger.team_games_as_of(team_id, first - timedelta(days=1))
+        else:
+            start = first - 1 if first is not None else 0
+        if isinstance(last, date):
+            stop = self.ledger.team_games_as_of(team_id, last)
+        else:
+            stop = last if last is not None else self.n_games(team_id)
+        return self._slice(team_id, start, stop)
+
+    def _slice(self, team_id: int, start: int, stop: int | None) -> tuple[int, int]:
+        """A window, clipped to the games played (same as slicing a list)"""
+        start, stop, _ = slice(start, stop).indices(self.n_games(team_id))
+        return start, max(start, stop)
+
+    def totals(
+        self, team_id: int, start: int = 0, stop: int | None = None
+    ) -> dict[str, int]:
+        """A team's standings totals (see Ledger.TOTALS) over a window, O(1)"""
+        start, stop = self._slice(team_id, start, stop)
+        totals = self._totals[team_id]
+        return dict(zip(Ledger.TOTALS, (totals[stop] - totals[start]).tolist()))
+
+    def record(
+        self, team_id: int, start: int = 0, stop: int | None = None
+    ) -> tuple[int, int, int]:
+        """A team's record (W-L-OTL) over a window, O(1)"""
+        totals = self.totals(team_id, start, stop)
+        wins, losses, losses_ot = (totals[x] for x in Ledger.RECORD)
+        return wins, losses, losses_ot
+
+    def goals(
+        self, team_id: int, start: int = 0, stop: int | None = None
+    ) -> tuple[int, int]:
+        """A team's goals for & against over a window, O(1)"""
+        totals = self.totals(team_id, start, stop)
+        return totals["goals_for"], totals["goals_against"]
+
+    def rating_avg(self, team_id: int, start: int = 0, stop: int | None = None) -> int:
+        """
+        A team's average (non-provisional) rating after its games in a window, or 0
+        if none (same as Team.rating_avg, over the window), O(1)
+        """
+        start, stop = self._slice(team_id, start, stop)
+        sums = self._ratings[team_id][stop] - self._ratings[team_id][start]
+        if sums[self.N_NON_PROVISIONAL] < 1:
+            return 0
+        return round(
+            float(sums[self.MU_NON_PROVISIONAL] / sums[self.N_NON_PROVISIONAL])
+        )
+
+    def avg_opp(self, team_id: int, start: int = 0, stop: int | None = None) -> int:
+        """
+        A team's average opponent rating (going into the games) in a window, or 0 if
+        none, O(1)
+        """
+        start, stop = self._slice(team_id, start, stop)
+        if stop == start:
+            return 0
+        sums = self._ratings[team_id][stop] - self._ratings[team_id][start]
+        return round(float(sums[self.MU_OPPONENT]) / (stop - start))
+
+    def rolling_rating(
+        self, team_id: int, n: int, start: int = 0, stop: int | None = None
+    ) -> np.ndarray:
+        """
+        A team's N-game rolling average rating, after each of its games in a window
+        (the first games of the season average over the games so far), O(1) each
+        """
+        start, stop = self._slice(team_id, start, stop)
+        sums = self._ratings[team_id][:, self.MU]
+        ends = np.arange(start + 1, stop + 1)
+        begins = np.maximum(ends - n, 0)
+        return (sums[ends] - sums[begins]) / (ends - begins)  # type: ignore
+
+
+def window_str(first: GameOrDate | None, last: GameOrDate | None) -> str:
+    """A range of games, e.g. "games 10 to 20", or "2023-12-01 to end" """
+    text = f"{first or 'start'} to {last or 'end'}"
+    return f"games {text}" if isinstance(first, int) or isinstance(last, int) else text